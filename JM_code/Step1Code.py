@@ -11,6 +11,7 @@ This is Step 1 in the 12 steps to CFD code
 import numpy                       #here we load numpy
 from matplotlib import pyplot      #here we load matplotlib
 import time, sys                   #and load some utilities
+from solver1d import Solver1D      #the shared 1D stencil engine
 
 nx = 41  # try changing this number from 41 to 81 and Run All ... what happens?
 dx = 2.0 / (nx-1)
@@ -26,17 +27,9 @@ print(u)
 #Plotting initial conditions
 pyplot.plot(numpy.linspace(0, 2, nx), u);
 
-           
-un = numpy.ones(nx) #initialize a temporary array
-
-               
-#Solution procedure               
-for n in range(nt):  #loop for values of n from 0 to nt, so it will run nt times
-    un = u.copy() ##copy the existing values of u into un
-    for i in range(1, nx): ## you can try commenting this line and...
-    #for i in range(nx): ## ... uncommenting this line and see what happens!
-        u[i] = un[i] - c * dt / dx * (un[i] - un[i-1])
-    
-pyplot.plot(numpy.linspace(0, 2, nx), u);          
-           
-           
\ No newline at end of file
+
+#Solution procedure: the time loop lives in solver1d, which swaps two
+#preallocated buffers instead of copying u every step
+u = Solver1D(u, dt, dx, 'linear', c=c).step(nt)
+
+pyplot.plot(numpy.linspace(0, 2, nx), u);
@@ -2,6 +2,7 @@
 
 import numpy                 #numpy is a library for array operations akin to MATLAB
 from matplotlib import pyplot    #matplotlib is 2D plotting library
+from solver1d import Solver1D    #the shared 1D stencil engine
 
 
 def linearconv(nx):
@@ -13,12 +14,7 @@ def linearconv(nx):
     u = numpy.ones(nx)      #defining a numpy array which is nx elements long with every value equal to 1.
     u[int(.5/dx):int(1 / dx + 1)] = 2  #setting u = 2 between 0.5 and 1 as per our I.C.s
 
-    un = numpy.ones(nx) #initializing our placeholder array, un, to hold the values we calculate for the n+1 timestep
-
-    for n in range(nt):  #iterate through time
-        un = u.copy() ##copy the existing values of u into un
-        for i in range(1, nx):
-            u[i] = un[i] - c * dt / dx * (un[i] - un[i-1])
+    u = Solver1D(u, dt, dx, 'linear', c=c).step(nt)  #iterate through time
     pyplot.figure()    
     pyplot.plot(numpy.linspace(0, 2, nx), u);
 
@@ -48,13 +44,8 @@ def linearconv(nx):
     u = numpy.ones(nx) 
     u[int(.5/dx):int(1 / dx + 1)] = 2
 
-    un = numpy.ones(nx)
+    u = Solver1D(u, dt, dx, 'linear', c=c).step(nt)  #iterate through time
 
-    for n in range(nt):  #iterate through time
-        un = u.copy() ##copy the existing values of u into un
-        for i in range(1, nx):
-            u[i] = un[i] - c * dt / dx * (un[i] - un[i-1])
-            
     pyplot.figure()   
     pyplot.plot(numpy.linspace(0, 2, nx), u)
 
@@ -79,3 +70,36 @@ linearconv(121)
 
 
 
+
+
+
+
+
+
+
+
+# ### Refining only the fronts
+#
+# linearconv(121) refines the whole grid to sharpen two fronts.  amr.AMR
+# keeps the 41-point grid and adds patches twice and four times finer where
+# the hat is steep, moving them with the fronts; each level takes two
+# steps of half the size for each step of the level below it.
+
+from amr import AMR
+
+nx = 41
+dx = 2.0 / (nx - 1)
+dt = .5 * dx
+
+def hat(x):
+    return numpy.where((x >= .5) & (x <= 1), 2.0, 1.0)
+
+amr = AMR(Solver1D(hat(numpy.linspace(0, 2, nx)), dt, dx, 'linear', c=1),
+          threshold=1, max_level=2, block=4, regrid=2, initial=hat)
+amr.step(20)
+(x,), (u,) = amr.sample()
+print('%d points on the finest level instead of %d'
+      % (sum(p.shape[0] for p in amr.levels[-1]), len(x)))
+
+pyplot.figure()
+pyplot.plot(x, u);
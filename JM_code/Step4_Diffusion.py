@@ -4,6 +4,7 @@
 
 import numpy                 #loading our favorite library
 from matplotlib import pyplot    #and the useful plotting library
+from solver1d import Solver1D    #the shared 1D stencil engine
 
 
 nx = 41
@@ -17,14 +18,22 @@ dt = sigma * dx**2 / nu #dt is defined using sigma ... more later!
 u = numpy.ones(nx)      #a numpy array with nx elements all equal to 1.
 u[int(.5 / dx):int(1 / dx + 1)] = 2  #setting u = 2 between 0.5 and 1 as per our I.C.s
 
-un = numpy.ones(nx) #our placeholder array, un, to advance the solution in time
-            
-for n in range(nt):  #iterate through time
-    un = u.copy() ##copy the existing values of u into un
-    for i in range(1, nx - 1):
-        u[i] = un[i] + nu * dt / dx**2 * (un[i+1] - 2 * un[i] + un[i-1])
-        
+u = Solver1D(u, dt, dx, 'diffusion', nu=nu).step(nt)  #iterate through time
+
 pyplot.plot(numpy.linspace(0, 2, nx), u);
 
 
 
+
+
+# The explicit update needs sigma = nu * dt / dx**2 <= 1/2, so halving dx
+# quadruples the number of steps.  The implicit schemes of implicit.py are
+# stable for any dt: here Crank-Nicolson covers the same time in 4 steps.
+
+from implicit import Implicit1D
+
+u = numpy.ones(nx)
+u[int(.5 / dx):int(1 / dx + 1)] = 2
+u = Implicit1D(u, nt * dt / 4, dx, nu, 'crank-nicolson').step(4)
+
+pyplot.plot(numpy.linspace(0, 2, nx), u);
@@ -1,61 +1,29 @@
 
 
 import numpy
-import sympy
+from analytic import burgers   #the analytical saw-tooth solution
 
 
+# The initial condition comes from the Cole-Hopf solution
+#
+# $$u = -\frac{2 \nu}{\phi} \frac{\partial \phi}{\partial x} + 4, \qquad
+# \phi = e^{\frac{-(x-4t)^2}{4 \nu (t+1)}} + e^{\frac{-(x-4t -2 \pi)^2}{4 \nu(t+1)}}$$
+#
+# analytic.py differentiates phi with SymPy and lambdifies u into a numpy
+# function the first time it is needed, then caches the generated code, so
+# later runs neither import SymPy nor redo the derivation.
 
-from sympy import init_printing
-init_printing(use_latex=True)
-
-x, nu, t = sympy.symbols('x nu t')
-phi = (sympy.exp(-(x - 4 * t)**2 / (4 * nu * (t + 1))) +
-       sympy.exp(-(x - 4 * t - 2 * numpy.pi)**2 / (4 * nu * (t + 1))))
-phi
-
-
-# It's maybe a little small, but that looks right.  Now to evaluate our partial derivative $\frac{\partial \phi}{\partial x}$ is a trivial task.  
-
-phiprime = phi.diff(x)
-phiprime
-
-
-# If you want to see the unrendered version, just use the Python print command.
-
-# In[48]:
-
-print(phiprime)
-
-
-
-# 
-# Now that we have the Pythonic version of our derivative, we can finish writing out the full initial condition equation and then translate it into a usable Python expression.  For this, we'll use the *lambdify* function, which takes a SymPy symbolic equation and turns it into a callable function.  
-
-# In[49]:
-
-from sympy.utilities.lambdify import lambdify
-
-u = -2 * nu * (phiprime / phi) + 4
-print(u)
-
-
-# ### Lambdify
-# 
-# To lambdify this expression into a useable function, we tell lambdify which variables to request and the function we want to plug them in to.
-
-
-
-ufunc = lambdify((t, x, nu), u)
-print(ufunc(1, 4, 3))
+print(burgers(1, 4, 3))
 
 
 # ### Back to Burgers' Equation
 # 
-# Now that we have the initial conditions set up, we can proceed and finish setting up the problem.  We can generate the plot of the initial condition using our lambdify-ed function.
+# Now that we have the initial conditions set up, we can proceed and finish setting up the problem.  We can generate the plot of the initial condition using the analytical function.
 
 # In[51]:
 
 from matplotlib import pyplot
+from solver1d import Solver1D
 
 
 ###variable declarations
@@ -66,10 +34,9 @@ nu = .07
 dt = dx * nu
 
 x = numpy.linspace(0, 2 * numpy.pi, nx)
-un = numpy.empty(nx)
 t = 0
 
-u = numpy.asarray([ufunc(t, x0, nu) for x0 in x])
+u = burgers(t, x, nu)
 u
 
 
@@ -101,14 +68,9 @@ pyplot.ylim([0, 10]);
 
 
 
-for n in range(nt): # looping over time
-    un = u.copy()   # creating a copy to use for the iteration
-    for i in range(1, nx-1): # looping over space
-        u[i] = un[i] - un[i] * dt / dx *(un[i] - un[i-1]) + nu * dt / dx**2 *                (un[i+1] - 2 * un[i] + un[i-1]) #looping over all of the internal nodes
-    u[0] = un[0] - un[0] * dt / dx * (un[0] - un[-2]) + nu * dt / dx**2 *                (un[1] - 2 * un[0] + un[-2]) #setting the value for the first node
-    u[-1] = u[0] #setting the value for the last not
-        
-u_analytical = numpy.asarray([ufunc(nt * dt, xi, nu) for xi in x]) #calculating the analytical solution
+u = Solver1D(u, dt, dx, 'burgers', nu=nu, bc='periodic').step(nt)  # looping over time
+
+u_analytical = burgers(nt * dt, x, nu) #calculating the analytical solution
 
 
 # In[54]:
@@ -125,3 +87,25 @@ pyplot.legend();
 
 
 
+
+
+# ### Adaptive time steps
+#
+# dt = dx * nu above is fixed for the whole run, although the wave steepens
+# and then decays.  adaptive.Stepper measures max |u| before every step and
+# takes the largest dt that keeps the scheme stable, landing exactly on the
+# same final time in fewer steps.
+
+from adaptive import Stepper
+
+stepper = Stepper(Solver1D(burgers(0, x, nu), dt, dx, 'burgers', nu=nu,
+                           bc='periodic'))
+u_adaptive, = stepper.advance(nt * dt)
+print('%d adaptive steps instead of %d' % (stepper.n, nt))
+
+pyplot.figure(figsize=(11, 7), dpi=100)
+pyplot.plot(x, u_adaptive, marker='o', lw=2, label='Adaptive')
+pyplot.plot(x, u_analytical, label='Analytical')
+pyplot.xlim([0, 2 * numpy.pi])
+pyplot.ylim([0, 10])
+pyplot.legend();
@@ -62,27 +62,60 @@ u[int(.5 / dy): int(1 / dy + 1), int(.5 / dx):int(1 / dx + 1)] = 2
 
 # In[5]:
 
-get_ipython().run_cell_magic(u'timeit', u'', u'u = numpy.ones((ny, nx))\nu[int(.5 / dy): int(1 / dy + 1), int(.5 / dx):int(1 / dx + 1)] = 2\n\nfor n in range(nt + 1): ##loop across number of time steps\n    un = u.copy()\n    row, col = u.shape\n    for j in range(1, row):\n        for i in range(1, col):\n            u[j, i] = (un[j, i] - (c * dt / dx * \n                                  (un[j, i] - un[j, i - 1])) - \n                                  (c * dt / dy * \n                                   (un[j, i] - un[j - 1, i])))\n            u[0, :] = 1\n            u[-1, :] = 1\n            u[:, 0] = 1\n            u[:, -1] = 1')
+import timeit    #works outside IPython, unlike the %%timeit magic
+
+
+def loops():
+    u = numpy.ones((ny, nx))
+    u[int(.5 / dy): int(1 / dy + 1), int(.5 / dx):int(1 / dx + 1)] = 2
+
+    for n in range(nt + 1): ##loop across number of time steps
+        un = u.copy()
+        row, col = u.shape
+        for j in range(1, row):
+            for i in range(1, col):
+                u[j, i] = (un[j, i] - (c * dt / dx *
+                                      (un[j, i] - un[j, i - 1])) -
+                                      (c * dt / dy *
+                                       (un[j, i] - un[j - 1, i])))
+                u[0, :] = 1
+                u[-1, :] = 1
+                u[:, 0] = 1
+                u[:, -1] = 1
+
+
+print('loops:  best of 3, %.3g s' % min(timeit.repeat(loops, number=1,
+                                                        repeat=3)))
 
 
 # With the "raw" Python code above, the best execution time achieved was 1.94 seconds.  Keep in mind that with these three nested loops, that the statements inside the **j** loop are being evaluated more than 650,000 times.   Let's compare that with the performance of the same code implemented with array operations:
 
 # In[6]:
 
-get_ipython().run_cell_magic(u'timeit', u'', u'u = numpy.ones((ny, nx))\nu[int(.5 / dy): int(1 / dy + 1), int(.5 / dx):int(1 / dx + 1)] = 2\n\nfor n in range(nt + 1): ##loop across number of time steps\n    un = u.copy()\n    u[1:, 1:] = un[1:, 1:] - ((c * dt / dx * (un[1:, 1:] - un[1:, 0:-1])) -\n                              (c * dt / dy * (un[1:, 1:] - un[0:-1, 1:])))\n    u[0, :] = 1\n    u[-1, :] = 1\n    u[:, 0] = 1\n    u[:, -1] = 1')
+def slices():
+    u = numpy.ones((ny, nx))
+    u[int(.5 / dy): int(1 / dy + 1), int(.5 / dx):int(1 / dx + 1)] = 2
 
+    for n in range(nt + 1): ##loop across number of time steps
+        un = u.copy()
+        u[1:, 1:] = un[1:, 1:] - ((c * dt / dx * (un[1:, 1:] - un[1:, 0:-1])) -
+                                  (c * dt / dy * (un[1:, 1:] - un[0:-1, 1:])))
+        u[0, :] = 1
+        u[-1, :] = 1
+        u[:, 0] = 1
+        u[:, -1] = 1
 
-# As you can see, the speed increase is substantial.  The same calculation goes from 1.94 seconds to 5.09 milliseconds.  2 seconds isn't a huge amount of time to wait, but these speed gains will increase exponentially with the size and complexity of the problem being evaluated.  
 
-# In[7]:
+print('slices: best of 3, %.3g s' % (min(timeit.repeat(slices, number=100,
+                                                         repeat=3)) / 100))
+
 
-from IPython.core.display import HTML
-def css_styling():
-    styles = open("../styles/custom.css", "r").read()
-    return HTML(styles)
-css_styling()
+# benchmark.py times every lesson solver this way over a ladder of grid
+# sizes, e.g. `python benchmark.py step7 --nx 81 257 1025`.
 
 
+# As you can see, the speed increase is substantial.  The same calculation goes from 1.94 seconds to 5.09 milliseconds.  2 seconds isn't a huge amount of time to wait, but these speed gains will increase exponentially with the size and complexity of the problem being evaluated.  
+
 # In[ ]:
 
 
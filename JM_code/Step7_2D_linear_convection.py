@@ -2,10 +2,9 @@
 
 # In[1]:
 
-from mpl_toolkits.mplot3d import Axes3D    ##New Library required for projected 3d plots
-
 import numpy
-from matplotlib import pyplot, cm
+from solver2d import Solver2D
+import render     ##3d surface plots; matplotlib is only loaded when drawing
 
 
 ###variable declarations
@@ -31,10 +30,7 @@ u[int(.5 / dy):int(1 / dy + 1),int(.5 / dx):int(1 / dx + 1)] = 2
 
 ###Plot Initial Condition
 ##the figsize parameter can be used to produce different sized images
-fig = pyplot.figure(figsize=(11, 7), dpi=100)
-ax = fig.gca(projection='3d')                      
-X, Y = numpy.meshgrid(x, y)                            
-surf = ax.plot_surface(X, Y, u[:], cmap=cm.viridis)
+fig = render.surface(x, y, u)
 
 
 
@@ -108,18 +104,11 @@ surf2 = ax.plot_surface(X, Y, u[:], cmap=cm.viridis)"""
 u = numpy.ones((ny, nx))
 u[int(.5 / dy):int(1 / dy + 1), int(.5 / dx):int(1 / dx + 1)] = 2
 
-for n in range(nt + 1): ##loop across number of time steps
-    un = u.copy()
-    u[1:, 1:] = (un[1:, 1:] - (c * dt / dx * (un[1:, 1:] - un[1:, :-1])) -
-                              (c * dt / dy * (un[1:, 1:] - un[:-1, 1:])))
-    u[0, :] = 1
-    u[-1, :] = 1
-    u[:, 0] = 1
-    u[:, -1] = 1
+solver = Solver2D(u, dt, dx, dy, 'linear', c=c)  ##edges are held at 1
+solver.step(nt + 1) ##loop across number of time steps
+u = solver.u
 
-fig = pyplot.figure(figsize=(11, 7), dpi=100)
-ax = fig.gca(projection='3d')
-surf2 = ax.plot_surface(X, Y, u[:], cmap=cm.viridis)
+fig = render.surface(x, y, u)
 
     
 
@@ -1,8 +1,8 @@
 
 
 
-from mpl_toolkits.mplot3d import Axes3D
-from matplotlib import pyplot, cm
+from solver2d import Solver2D
+import render
 import numpy
 
 
@@ -24,8 +24,6 @@ y = numpy.linspace(0, 2, ny)
 
 u = numpy.ones((ny, nx)) ##create a 1xn vector of 1's
 v = numpy.ones((ny, nx))
-un = numpy.ones((ny, nx))
-vn = numpy.ones((ny, nx))
 
 ###Assign initial conditions
 ##set hat function I.C. : u(.5<=x<=1 && .5<=y<=1 ) is 2
@@ -36,57 +34,24 @@ v[int(.5 / dy):int(1 / dy + 1), int(.5 / dx):int(1 / dx + 1)] = 2
 
 # In[3]:
 
-fig = pyplot.figure(figsize=(11, 7), dpi=100)
-ax = fig.gca(projection='3d')
-X, Y = numpy.meshgrid(x, y)
-
-ax.plot_surface(X, Y, u, cmap=cm.viridis, rstride=2, cstride=2)
-ax.set_xlabel('$x$')
-ax.set_ylabel('$y$');
+fig = render.surface(x, y, u)
 
 
 # In[4]:
 
-for n in range(nt + 1): ##loop across number of time steps
-    un = u.copy()
-    vn = v.copy()
-    u[1:, 1:] = (un[1:, 1:] - 
-                 (un[1:, 1:] * c * dt / dx * (un[1:, 1:] - un[1:, :-1])) -
-                  vn[1:, 1:] * c * dt / dy * (un[1:, 1:] - un[:-1, 1:]))
-    v[1:, 1:] = (vn[1:, 1:] -
-                 (un[1:, 1:] * c * dt / dx * (vn[1:, 1:] - vn[1:, :-1])) -
-                 vn[1:, 1:] * c * dt / dy * (vn[1:, 1:] - vn[:-1, 1:]))
-    
-    u[0, :] = 1
-    u[-1, :] = 1
-    u[:, 0] = 1
-    u[:, -1] = 1
-    
-    v[0, :] = 1
-    v[-1, :] = 1
-    v[:, 0] = 1
-    v[:, -1] = 1
+solver = Solver2D((u, v), dt, dx, dy, 'convection', c=c)  ##edges are held at 1
+solver.step(nt + 1) ##loop across number of time steps
+u, v = solver.u, solver.v
 
 
 # In[5]:
 
-fig = pyplot.figure(figsize=(11, 7), dpi=100)
-ax = fig.gca(projection='3d')
-X, Y = numpy.meshgrid(x, y)
-
-ax.plot_surface(X, Y, u, cmap=cm.viridis, rstride=2, cstride=2)
-ax.set_xlabel('$x$')
-ax.set_ylabel('$y$');
+fig = render.surface(x, y, u)
 
 
 # In[6]:
 
-fig = pyplot.figure(figsize=(11, 7), dpi=100)
-ax = fig.gca(projection='3d')
-X, Y = numpy.meshgrid(x, y)
-ax.plot_surface(X, Y, v, cmap=cm.viridis, rstride=2, cstride=2)
-ax.set_xlabel('$x$')
-ax.set_ylabel('$y$');
+fig = render.surface(x, y, v)
 
 
 
@@ -2,8 +2,8 @@
 
 
 import numpy
-from matplotlib import pyplot, cm
-from mpl_toolkits.mplot3d import Axes3D ##library for 3d projection plots
+from solver2d import Solver2D
+import render  ##3d surface plots, matplotlib is only loaded when drawing
 
 
 
@@ -23,7 +23,6 @@ x = numpy.linspace(0, 2, nx)
 y = numpy.linspace(0, 2, ny)
 
 u = numpy.ones((ny, nx))  # create a 1xn vector of 1's
-un = numpy.ones((ny, nx))
 
 ###Assign initial conditions
 # set hat function I.C. : u(.5<=x<=1 && .5<=y<=1 ) is 2
@@ -32,18 +31,7 @@ u[int(.5 / dy):int(1 / dy + 1),int(.5 / dx):int(1 / dx + 1)] = 2
 
 # In[3]:
 
-fig = pyplot.figure()
-ax = fig.gca(projection='3d')
-X, Y = numpy.meshgrid(x, y)
-surf = ax.plot_surface(X, Y, u, rstride=1, cstride=1, cmap=cm.viridis,
-        linewidth=0, antialiased=False)
-
-ax.set_xlim(0, 2)
-ax.set_ylim(0, 2)
-ax.set_zlim(1, 2.5)
-
-ax.set_xlabel('$x$')
-ax.set_ylabel('$y$');
+fig = render.surface(x, y, u, zlim=(1, 2.5))
 
 
 # \begin{align}
@@ -54,29 +42,16 @@ ax.set_ylabel('$y$');
 # In[4]:
 
 ###Run through nt timesteps
-def diffuse(nt):
+def diffuse(nt, plot=True):
     u[int(.5 / dy):int(1 / dy + 1),int(.5 / dx):int(1 / dx + 1)] = 2  
     
-    for n in range(nt + 1): 
-        un = u.copy()
-        u[1:-1, 1:-1] = (un[1:-1,1:-1] + 
-                        nu * dt / dx**2 * 
-                        (un[1:-1, 2:] - 2 * un[1:-1, 1:-1] + un[1:-1, 0:-2]) +
-                        nu * dt / dy**2 * 
-                        (un[2:,1: -1] - 2 * un[1:-1, 1:-1] + un[0:-2, 1:-1]))
-        u[0, :] = 1
-        u[-1, :] = 1
-        u[:, 0] = 1
-        u[:, -1] = 1
+    solver = Solver2D(u, dt, dx, dy, 'diffusion', nu=nu)  # edges are held at 1
+    solver.step(nt + 1)
+    u[:] = solver.u
 
     
-    fig = pyplot.figure()
-    ax = fig.gca(projection='3d')
-    surf = ax.plot_surface(X, Y, u[:], rstride=1, cstride=1, cmap=cm.viridis,
-        linewidth=0, antialiased=True)
-    ax.set_zlim(1, 2.5)
-    ax.set_xlabel('$x$')
-    ax.set_ylabel('$y$');
+    if plot:
+        render.surface(x, y, u, zlim=(1, 2.5))
     
 
 
@@ -96,3 +71,14 @@ diffuse(50)
 
 
 
+
+
+# The same run with the implicit ADI solver of implicit.py, which is stable
+# for any dt: 50 explicit steps become 5.
+
+from implicit import Implicit2D
+
+u[:] = 1
+u[int(.5 / dy):int(1 / dy + 1),int(.5 / dx):int(1 / dx + 1)] = 2
+u[:] = Implicit2D(u, 51 * dt / 5, dx, dy, nu, 'crank-nicolson').step(5)[0]
+fig = render.surface(x, y, u, zlim=(1, 2.5))
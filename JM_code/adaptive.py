@@ -0,0 +1,193 @@
+"""
+Adaptive time stepping for Solver1D and Solver2D.
+
+The explicit schemes of Steps 1 to 8 build every new value as a weighted sum
+of old ones, and they stay stable while no weight is negative:
+
+    C + 2 D <= 1,    C = a dt/dx (+ b dt/dy),
+                     D = nu dt/dx**2 (+ nu dt/dy**2)
+
+where a and b are the largest advecting speeds: |c| for linear convection,
+max |u| and max |v| of the current fields for the nonlinear equations.
+Step 3 fixes sigma = C by hand for a known speed; Stepper instead measures
+the speeds before every step (one min/max reduction per field, a single
+pass with the numba backend) and takes the largest dt with C + 2 D <= cfl,
+so a decaying Burgers wave is run with ever longer steps.
+
+The upwind differences also need the flow to go the way they look: a speed
+below -nu/dx makes the upstream weight negative for any dt.  Violations and
+non-finite fields raise StabilityError instead of producing garbage.
+
+    stepper = Stepper(Solver1D(u, 0, dx, 'burgers', nu=nu, bc='periodic'))
+    stepper.advance(.5)
+    u, t, steps = stepper.solver.u, stepper.t, stepper.n
+"""
+
+import math
+
+import numpy
+
+from solver2d import Solver2D
+
+
+class StabilityError(ArithmeticError):
+    """An explicit step would be (or has been) numerically unstable."""
+
+
+# equation -> which fields advect: 'c' for the constant speed, otherwise the
+# index of the field, times c where the kernel multiplies by c
+ADVECTION_1D = {
+    'linear': ('c',),
+    'nonlinear': (0,),
+    'diffusion': (),
+    'burgers': (0,),
+}
+ADVECTION_2D = {
+    'linear': ('c', 'c'),
+    'convection': ('c0', 'c1'),
+    'diffusion': (),
+    'burgers': (0, 1),
+}
+
+
+def _min_max(solver, f):
+    if solver.backend == 'numba':
+        import numba_kernels
+        return numba_kernels.min_max(f)
+    return f.min(), f.max()
+
+
+def _speed(solver, spec):
+    """(min, max) of the velocity advecting along one axis."""
+    c = float(solver.c)
+    if spec == 'c':
+        return c, c
+    if isinstance(spec, str):   #'c0', 'c1': c times a field
+        lo, hi = _min_max(solver, solver.fields[int(spec[1])])
+        return min(c * lo, c * hi), max(c * lo, c * hi)
+    return _min_max(solver, solver.fields[spec])
+
+
+def rates(solver):
+    """(advective, diffusive) rates: C = advective * dt, D = diffusive * dt.
+
+    Raises StabilityError for non-finite fields or flow against the upwind
+    direction that no dt can make stable.
+    """
+    if numpy.ndim(solver.dt) or numpy.ndim(solver.nu) or numpy.ndim(solver.c):
+        raise ValueError('adaptive stepping needs a single run, not an '
+                         'ensemble')
+    nu = float(solver.nu)
+    if isinstance(solver, Solver2D):
+        specs = ADVECTION_2D[solver.equation]
+        steps = (solver.dx, solver.dy)
+    else:
+        specs = ADVECTION_1D[solver.equation]
+        steps = (solver.dx,)
+
+    if solver.equation not in ('diffusion', 'burgers'):
+        nu = 0.0   #the kernel has no viscous term
+    advective = 0.0
+    for spec, h in zip(specs, steps):
+        lo, hi = _speed(solver, spec)
+        if not (math.isfinite(lo) and math.isfinite(hi)):
+            raise StabilityError('non-finite values after step %d'
+                                 % solver.n)
+        if lo * h + nu < 0:
+            raise StabilityError('speed %g against the upwind direction '
+                                 'exceeds nu/dx = %g' % (lo, nu / h))
+        advective += max(abs(lo), abs(hi)) / h
+    return advective, nu * sum(1 / h**2 for h in steps)
+
+
+def numbers(solver):
+    """(C, D), the Courant and diffusion numbers of the next step."""
+    advective, diffusive = rates(solver)
+    return advective * float(solver.dt), diffusive * float(solver.dt)
+
+
+def stable_dt(solver, cfl=0.9):
+    """Largest dt with C + 2 D <= cfl for the current fields (inf if none)."""
+    advective, diffusive = rates(solver)
+    rate = advective + 2 * diffusive
+    return cfl / rate if rate else math.inf
+
+
+def check(solver, cfl=1.0):
+    """Raise StabilityError if the solver's fixed dt breaks C + 2 D <= cfl."""
+    courant, diffusion = numbers(solver)
+    if courant + 2 * diffusion > cfl:
+        raise StabilityError('step %d: C = %.3g, D = %.3g, C + 2D > %g'
+                             % (solver.n, courant, diffusion, cfl))
+
+
+class Stepper:
+    """Advance a solver with dt chosen from its fields before every step.
+
+    `cfl` is the safety target for C + 2 D (at most 1).  `dt_max` caps the
+    step, which is needed when nothing moves; a stable dt below `dt_min`
+    raises StabilityError.  With adaptive=False the solver's own dt is kept
+    and only checked, which turns a silent blow-up into an error.  `t` is the
+    solver's time, so a restored solver carries on from where it was, and
+    `dts` the dt of every step taken here.
+    """
+
+    def __init__(self, solver, cfl=0.9, dt_max=None, dt_min=0.0,
+                 adaptive=True):
+        if not 0 < cfl <= 1:
+            raise ValueError('cfl must be in (0, 1], got %r' % cfl)
+        self.solver = solver
+        self.cfl = cfl
+        self.dt_max = math.inf if dt_max is None else dt_max
+        self.dt_min = dt_min
+        self.adaptive = adaptive
+        self.dts = []
+
+    @property
+    def n(self):
+        return len(self.dts)
+
+    @property
+    def t(self):
+        return self.solver.t
+
+    def _next_dt(self):
+        if not self.adaptive:
+            check(self.solver, self.cfl)
+            return float(self.solver.dt)
+        dt = min(stable_dt(self.solver, self.cfl), self.dt_max)
+        if dt == math.inf:
+            raise ValueError('nothing limits dt, pass dt_max')
+        if dt < self.dt_min:
+            raise StabilityError('stable dt %g is below dt_min %g after step '
+                                 '%d' % (dt, self.dt_min, self.solver.n))
+        return dt
+
+    def _step(self, dt):
+        self.solver.dt = dt
+        self.solver.step(1)
+        self.dts.append(dt)
+
+    def step(self, nt=1):
+        """Take nt steps and return the solver's fields."""
+        for n in range(nt):
+            self._step(self._next_dt())
+        return self.solver.fields
+
+    def advance(self, t_end):
+        """Step until t reaches t_end and return the solver's fields.
+
+        Adaptive steps shorten the last one to land on t_end; a fixed dt
+        stops at the last step that does not pass it.
+        """
+        while self.t < t_end:
+            dt = self._next_dt()
+            if not self.adaptive:
+                if self.t + dt > t_end * (1 + 1e-12):
+                    break
+            elif self.t + dt >= t_end:
+                self._step(t_end - self.t)
+                self.solver.t = t_end
+                break
+            self._step(dt)
+        return self.solver.fields
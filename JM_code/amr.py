@@ -0,0 +1,378 @@
+"""
+Block-structured adaptive mesh refinement for the 1D and 2D solvers.
+
+Step 3 resolves the hat's fronts by refining the whole grid, and Step 5's
+sawtooth needs resolution only at its shock.  AMR wraps a Solver1D or
+Solver2D as the coarse level 0 and keeps up to `max_level` finer levels,
+each a list of rectangular patches `ratio` times finer in space:
+
+  * every `regrid` coarse steps the points of a level where |df|/dx exceeds
+    `threshold` (any field, any axis) are flagged and dilated by `buffer`
+    points; the blocks of `block` points holding flags, merged into runs,
+    become the patches of the next level.  A new patch takes its values
+    from the old patches it overlaps and elsewhere from linear
+    interpolation of its parent.
+  * a step advances level 0 by dt and then every finer level `substeps`
+    steps per step of its parent (subcycling): `ratio` keeps the convective
+    Courant number of the coarse level, ratio**2 (the default for diffusion
+    and Burgers) its diffusion number.  The one-point ghost layer of
+    a patch is copied from its neighbours on the same level or else
+    interpolated linearly from the parent in space and time.  The fine
+    values are then injected into the coarse points they coincide with.
+
+Patches are stepped with the base solver's own kernel and coefficients, so
+every equation and backend of solver1d and solver2d can be refined.  A patch
+stays at least one point inside its parent and so off the domain edges:
+there is no refinement right at a boundary.  The lessons' schemes are not in
+conservative form, so no flux correction is done at the coarse-fine edges.
+
+    amr = AMR(Solver1D(u, dt, dx, 'burgers', nu=nu, bc='periodic'),
+              threshold=2, max_level=2)
+    amr.step(nt)
+    (x,), (u,) = amr.sample()   #composite solution on the finest grid
+    amr.cost()                  #points advanced per coarse step
+"""
+
+import numpy
+
+from solver1d import Solver1D
+
+
+def _interpolate(f, coords):
+    """Multilinear interpolation of f on the tensor grid of fractional
+    indices `coords` (one array per axis); integer indices are exact."""
+    for axis, c in enumerate(coords):
+        i = numpy.minimum(c.astype(int), f.shape[axis] - 2)
+        shape = [1] * f.ndim
+        shape[axis] = -1
+        w = (c - i).reshape(shape)
+        f = numpy.take(f, i, axis) * (1 - w) + numpy.take(f, i + 1, axis) * w
+    return f
+
+
+def _runs(row):
+    """(start, stop) of every run of True in a 1D boolean array."""
+    d = numpy.diff(numpy.concatenate(([0], row.astype(numpy.int8), [0])))
+    return list(zip(numpy.flatnonzero(d == 1).tolist(),
+                    numpy.flatnonzero(d == -1).tolist()))
+
+
+def _rectangles(marked):
+    """Cover the True blocks of a 2D array with ((j0, j1), (i0, i1)) block
+    ranges: runs along x, merged down y while they line up."""
+    done, open_ = [], {}
+    for j, row in enumerate(marked):
+        following = {}
+        for run in _runs(row):
+            following[run] = open_.pop(run, j)
+        done += [((j0, j), run) for run, j0 in open_.items()]
+        open_ = following
+    done += [((j0, len(marked)), run) for run, j0 in open_.items()]
+    return done
+
+
+class Level0:
+    """The wrapped solver as the root of the hierarchy: every point is
+    interior and array indices are level indices."""
+
+    level = 0
+    parent = None
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.shape = solver.fields[0].shape
+        self.lo = self.origin = (0,) * len(self.shape)
+        self.interior = (slice(None),) * len(self.shape)
+
+    @property
+    def fields(self):
+        return self.solver.fields
+
+    @property
+    def old(self):
+        if isinstance(self.solver, Solver1D):
+            return (self.solver._un,)
+        return self.solver._old
+
+
+class Patch:
+    """Points lo .. lo + shape - 1 of a level, stored with one ghost layer
+    (array index 0 is level index `origin`)."""
+
+    def __init__(self, level, lo, shape, parent, nfields, dtype):
+        self.level, self.lo, self.shape = level, lo, shape
+        self.parent = parent
+        self.origin = tuple(k - 1 for k in lo)
+        self.interior = (slice(1, -1),) * len(shape)
+        full = tuple(n + 2 for n in shape)
+        self.fields = tuple(numpy.zeros(full, dtype) for k in range(nfields))
+        self.old = tuple(numpy.zeros(full, dtype) for k in range(nfields))
+        self.ghosts = []   #(ghost slices, coordinates in the parent)
+        self.copies = []   #(ghost slices, sibling, slices in the sibling)
+
+
+class AMR:
+    """Refinement hierarchy over `solver`, which holds level 0.
+
+    `fields`, `n` and `t` are those of the coarse level, which carries the
+    injected fine values; sample() gives the composite solution.  The first
+    patches interpolate the coarse initial condition unless `initial`, a
+    function initial(x) or initial(x, y) returning the field(s) at the
+    given coordinates, samples it at their own resolution.
+    """
+
+    def __init__(self, solver, threshold, ratio=2, max_level=1, buffer=2,
+                 block=8, regrid=4, initial=None, substeps=None):
+        ndim = solver.fields[0].ndim
+        if ndim not in (1, 2) or (ndim == 2 and isinstance(solver,
+                                                           Solver1D)):
+            raise ValueError('AMR refines a single 1D or 2D run, not an '
+                             'ensemble')
+        self.solver = solver
+        self.ndim = ndim
+        self.threshold = threshold
+        self.ratio, self.max_level = ratio, max_level
+        if substeps is None:
+            diffusive = solver.equation in ('diffusion', 'burgers')
+            substeps = ratio**2 if diffusive else ratio
+        self.substeps = substeps
+        self.buffer, self.block, self.regrid_every = buffer, block, regrid
+        if isinstance(solver, Solver1D):
+            self.spacing = (solver.dx,)
+        else:
+            self.spacing = (solver.dy, solver.dx)
+        self.levels = [[Level0(solver)]]
+        self.n = 0
+        self.regrid(initial)
+
+    @property
+    def fields(self):
+        return self.solver.fields
+
+    @property
+    def t(self):
+        return self.solver.t
+
+    def cost(self):
+        """Points advanced per coarse step, all levels and substeps."""
+        return sum(int(numpy.prod(p.shape)) * self.substeps**level
+                   for level, patches in enumerate(self.levels)
+                   for p in patches)
+
+    ###Regridding
+
+    def _flags(self, parent, level):
+        h = [s / self.ratio**level for s in self.spacing]
+        flags = numpy.zeros(parent.shape, bool)
+        for f in parent.fields:
+            f = f[parent.interior]
+            for axis in range(self.ndim):
+                steep = (numpy.abs(numpy.diff(f, axis=axis))
+                         > self.threshold * h[axis])
+                for side in (slice(None, -1), slice(1, None)):
+                    index = [slice(None)] * self.ndim
+                    index[axis] = side
+                    flags[tuple(index)] |= steep
+        for k in range(self.buffer):
+            grown = flags.copy()
+            for axis in range(self.ndim):
+                for dst, src in ((slice(1, None), slice(None, -1)),
+                                 (slice(None, -1), slice(1, None))):
+                    a, b = [slice(None)] * self.ndim, [slice(None)] * self.ndim
+                    a[axis], b[axis] = dst, src
+                    grown[tuple(a)] |= flags[tuple(b)]
+            flags = grown
+        return flags
+
+    def _cluster(self, parent, flags):
+        """Inclusive footprints ((a, b) per axis, parent interior indices)
+        of the children; they stay one point inside the parent, and
+        neighbouring footprints share their edge points."""
+        if min(parent.shape) < 4:
+            return []
+        edges = [list(range(1, m - 2, self.block)) + [m - 2]
+                 for m in parent.shape]
+        marked = flags
+        for axis, e in enumerate(edges):
+            marked = numpy.logical_or.reduceat(marked, e[:-1], axis)
+        if self.ndim == 1:
+            return [((edges[0][s], edges[0][t]),) for s, t in _runs(marked)]
+        return [tuple((e[s], e[t]) for e, (s, t) in zip(edges, ranges))
+                for ranges in _rectangles(marked)]
+
+    def _coords(self, patch, index):
+        # parent array coordinates of the patch array points in `index`
+        r, parent = self.ratio, patch.parent
+        full = patch.fields[0].shape
+        return [(patch.origin[k] + numpy.arange(full[k])[index[k]]) / r
+                - parent.origin[k] for k in range(self.ndim)]
+
+    def _new_patch(self, level, parent, footprint, old, initial):
+        r = self.ratio
+        lo = tuple(r * (parent.lo[k] + a) for k, (a, b) in
+                   enumerate(footprint))
+        shape = tuple(r * (b - a) + 1 for a, b in footprint)
+        fields = parent.fields
+        patch = Patch(level, lo, shape, parent, len(fields), fields[0].dtype)
+        everything = (slice(None),) * self.ndim
+        coords = self._coords(patch, everything)
+        for f, g in zip(patch.fields, fields):
+            f[...] = _interpolate(g, coords)
+        if initial is not None:
+            h = [s / self.ratio**level for s in self.spacing]
+            axes = [(o + numpy.arange(n)) * d for o, n, d in
+                    zip(patch.origin, patch.fields[0].shape, h)]
+            if self.ndim == 2:
+                axes = [axes[1][numpy.newaxis, :], axes[0][:, numpy.newaxis]]
+            values = initial(*axes)
+            if isinstance(values, numpy.ndarray):
+                values = (values,)
+            for f, value in zip(patch.fields, values):
+                f[...] = value
+        for other in old:
+            overlap = self._overlap(patch, everything, other)
+            if overlap:
+                for f, g in zip(patch.fields, other.fields):
+                    f[overlap[0]] = g[overlap[1]]
+        full = patch.fields[0].shape
+        for axis in range(self.ndim):
+            for side in (0, full[axis] - 1):
+                index = [slice(None)] * self.ndim
+                index[axis] = slice(side, side + 1)
+                index = tuple(index)
+                patch.ghosts.append((index, self._coords(patch, index)))
+        return patch
+
+    def _overlap(self, patch, index, other):
+        """Slices of `index` (a region of patch's array) that lie in the
+        interior of `other`, in both arrays; None if they do not meet."""
+        full = patch.fields[0].shape
+        mine, theirs = [], []
+        for k in range(self.ndim):
+            start, stop, _ = index[k].indices(full[k])
+            lo = max(patch.origin[k] + start, other.lo[k])
+            hi = min(patch.origin[k] + stop, other.lo[k] + other.shape[k])
+            if lo >= hi:
+                return None
+            mine.append(slice(lo - patch.origin[k], hi - patch.origin[k]))
+            theirs.append(slice(lo - other.origin[k], hi - other.origin[k]))
+        return tuple(mine), tuple(theirs)
+
+    def regrid(self, initial=None):
+        """Rebuild every level above the coarse one from the current flags."""
+        for level in range(self.max_level):
+            old = (self.levels[level + 1]
+                   if level + 1 < len(self.levels) else [])
+            patches = []
+            for parent in self.levels[level]:
+                flags = self._flags(parent, level)
+                for footprint in self._cluster(parent, flags):
+                    patches.append(self._new_patch(level + 1, parent,
+                                                   footprint, old, initial))
+            for patch in patches:
+                for other in patches:
+                    if other is patch:
+                        continue
+                    for index, coords in patch.ghosts:
+                        overlap = self._overlap(patch, index, other)
+                        if overlap:
+                            patch.copies.append((overlap[0], other,
+                                                 overlap[1]))
+            del self.levels[level + 1:]
+            if not patches:
+                break
+            self.levels.append(patches)
+
+    ###Time stepping
+
+    def _fill(self, patch, theta):
+        # ghosts at `theta` of the parent's last step, then from siblings
+        parent = patch.parent
+        for index, coords in patch.ghosts:
+            for f, g, gold in zip(patch.fields, parent.fields, parent.old):
+                value = _interpolate(g, coords)
+                if theta < 1:
+                    value *= theta
+                    value += (1 - theta) * _interpolate(gold, coords)
+                f[index] = value
+        for index, other, source in patch.copies:
+            for f, g in zip(patch.fields, other.fields):
+                f[index] = g[source]
+
+    def _step_patch(self, patch, level):
+        solver = self.solver
+        dt, c, nu = solver.params()
+        dt = dt / self.substeps**level
+        h = [s / self.ratio**level for s in self.spacing]
+        new, prev = patch.old, patch.fields
+        patch.fields, patch.old = new, prev
+        if self.ndim == 1:
+            u, un = new[0], prev[0]
+            if solver.one_sided:
+                solver.kernel(u[1:], un[:-1], un[1:], None, dt, h[0], c, nu)
+            else:
+                solver.kernel(u[1:-1], un[:-2], un[1:-1], un[2:], dt, h[0],
+                              c, nu)
+            return
+        if not hasattr(patch, 'work'):
+            patch.work = numpy.empty(tuple(n - solver.halo
+                                           for n in new[0].shape),
+                                     new[0].dtype)
+        solver.kernel(new, prev, patch.work, dt, h[1], h[0], c, nu)
+
+    def _inject(self, patch):
+        r, parent = self.ratio, patch.parent
+        src = tuple(slice(1, 1 + n, r) for n in patch.shape)
+        dst = tuple(slice(lo // r - o, lo // r - o + (n - 1) // r + 1)
+                    for lo, n, o in zip(patch.lo, patch.shape,
+                                        parent.origin))
+        for f, g in zip(parent.fields, patch.fields):
+            f[dst] = g[src]
+
+    def _advance(self, level):
+        if level == 0:
+            self.solver.step(1)
+        else:
+            for patch in self.levels[level]:
+                self._step_patch(patch, level)
+        if level + 1 < len(self.levels):
+            children = self.levels[level + 1]
+            for s in range(self.substeps):
+                for patch in children:
+                    self._fill(patch, s / self.substeps)
+                self._advance(level + 1)
+            for patch in children:
+                self._inject(patch)
+
+    def step(self, nt=1):
+        """Advance nt coarse steps, regridding every `regrid` of them."""
+        for n in range(nt):
+            if self.n and self.n % self.regrid_every == 0:
+                self.regrid()
+            self._advance(0)
+            self.n += 1
+        return self.fields
+
+    def sample(self, level=None):
+        """(coordinates, fields) of the composite solution on the grid of
+        `level` (default the finest), coarse values interpolated linearly
+        where no patch of that level lies."""
+        if level is None:
+            level = len(self.levels) - 1
+        R = self.ratio**level
+        base = self.levels[0][0]
+        shape = tuple((n - 1) * R + 1 for n in base.shape)
+        out = [_interpolate(f, [numpy.arange(n) / R for n in shape])
+               for f in base.fields]
+        for finer in range(1, level + 1):
+            Rf = self.ratio**(level - finer)
+            for p in self.levels[finer]:
+                coords = [numpy.arange((n - 1) * Rf + 1) / Rf + 1
+                          for n in p.shape]
+                dst = tuple(slice(lo * Rf, (lo + n - 1) * Rf + 1)
+                            for lo, n in zip(p.lo, p.shape))
+                for f, g in zip(out, p.fields):
+                    f[dst] = _interpolate(g, coords)
+        grid = tuple(numpy.arange(n) * h / R
+                     for n, h in zip(shape, self.spacing))
+        return grid, tuple(out)
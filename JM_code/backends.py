@@ -0,0 +1,29 @@
+"""
+Backend selection for the stencil solvers.
+
+`backend="numpy"` runs the slice kernels of solver1d/solver2d,
+`backend="numba"` runs the fused loops of numba_kernels.  Numba is optional:
+asking for it when it is not installed warns and falls back to numpy.
+"""
+
+import importlib.util
+import warnings
+
+
+BACKENDS = ('numpy', 'numba')
+
+
+def have_numba():
+    return importlib.util.find_spec('numba') is not None
+
+
+def resolve(backend):
+    """Return the backend that will actually run for the requested one."""
+    if backend not in BACKENDS:
+        raise ValueError('unknown backend %r, expected one of %s'
+                         % (backend, BACKENDS))
+    if backend == 'numba' and not have_numba():
+        warnings.warn('numba is not installed, falling back to the numpy '
+                      'backend', RuntimeWarning, stacklevel=3)
+        return 'numpy'
+    return backend
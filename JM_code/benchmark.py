@@ -0,0 +1,191 @@
+"""
+Benchmarks of every lesson solver over a ladder of grid sizes.
+
+For each case of cases.py, backend and grid size a fresh process builds the
+solver, takes one warm-up step (JIT compilation, page faults) and then times
+batches of steps, doubling the batch until it runs for at least `min_time`;
+the best of `repeat` batches is kept.  Reported per run:
+
+    time_per_step        seconds
+    cell_updates         grid points advanced per second (all fields count
+                         once: a point of a coupled u, v grid is one update)
+    bandwidth            bytes per second of the compulsory traffic, reading
+                         the old and writing the new level of every field
+                         (plus one read of p and b and a write of p per
+                         pressure iteration for the flows)
+    peak_rss             bytes, peak resident set size of the run's process
+
+Results are written as JSON; given a baseline file, runs slower than it by
+more than `threshold` are reported and the command exits with status 1.
+
+    python benchmark.py --output base.json
+    python benchmark.py step8 step9 --nx 513 1025 --baseline base.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+import numpy
+
+from cases import CASES
+
+
+LADDERS = {
+    '1d': (1001, 10001, 100001, 1000001),
+    '2d': (129, 257, 513, 1025, 2049),
+    'poisson': (65, 129, 257, 513, 1025),
+    'flow': (41, 81, 161, 321),
+}
+BACKENDS = {'1d': ('numpy', 'numba'), '2d': ('numpy', 'numba'),
+            'poisson': ('numpy',), 'flow': ('numpy',)}
+
+
+def _peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _traffic(solver):
+    """Compulsory bytes moved by one step of solver."""
+    nbytes = sum(2 * f.nbytes for f in solver.fields)
+    iterations = getattr(solver, 'pressure_iterations', None)
+    if iterations:
+        nbytes += 3 * solver.p.nbytes * numpy.mean(iterations)
+    return nbytes
+
+
+def run_one(name, nx, backend='numpy', dtype='float64', min_time=0.2,
+            repeat=3):
+    """Benchmark one case in this process and return its result dict."""
+    case = CASES[name]
+    options = dict(dtype=dtype)
+    if backend != 'numpy':
+        options['backend'] = backend
+    solver = case.build(nx, **options)
+    try:
+        solver.step(1)
+        steps, best = 1, None
+        while True:
+            start = time.perf_counter()
+            solver.step(steps)
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+            steps *= 2
+        best = elapsed
+        for r in range(repeat - 1):
+            start = time.perf_counter()
+            solver.step(steps)
+            best = min(best, time.perf_counter() - start)
+        per_step = best / steps
+        cells = solver.fields[0].size
+        return dict(case=name, kind=case.kind, nx=nx, backend=backend,
+                    dtype=dtype, steps=steps, time_per_step=per_step,
+                    cell_updates=cells / per_step,
+                    bandwidth=_traffic(solver) / per_step,
+                    peak_rss=_peak_rss())
+    finally:
+        if hasattr(solver, 'close'):
+            solver.close()
+
+
+def _run_job(job):
+    return run_one(**job)
+
+
+def run(names=None, ladder=None, backends=None, dtype='float64',
+        min_time=0.2, repeat=3):
+    """Benchmark every case, backend and grid size, each in a fresh process
+    (so peak_rss is the run's own), and return the results document."""
+    jobs = []
+    for name in names or CASES:
+        kind = CASES[name].kind
+        for backend in BACKENDS[kind]:
+            if backends and backend not in backends:
+                continue
+            for nx in ladder or LADDERS[kind]:
+                jobs.append(dict(name=name, nx=nx, backend=backend,
+                                 dtype=dtype, min_time=min_time,
+                                 repeat=repeat))
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for result in pool.imap(_run_job, jobs):
+            print('%-7s %-6s %7d  %10.3e s/step  %9.3e cells/s  %7.2f GB/s  '
+                  '%6.0f MB' % (result['case'], result['backend'],
+                                result['nx'], result['time_per_step'],
+                                result['cell_updates'],
+                                result['bandwidth'] / 1e9,
+                                result['peak_rss'] / 2**20))
+            results.append(result)
+    return dict(machine=dict(node=platform.node(),
+                             machine=platform.machine(),
+                             processor=platform.processor(),
+                             cpus=os.cpu_count(),
+                             python=platform.python_version(),
+                             numpy=numpy.__version__),
+                date=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                results=results)
+
+
+def _key(result):
+    return (result['case'], result['backend'], result['dtype'],
+            result['nx'])
+
+
+def compare(document, baseline, threshold=0.1):
+    """Runs of document slower than in baseline by more than threshold, as
+    (result, baseline time per step) pairs."""
+    reference = {_key(r): r['time_per_step'] for r in baseline['results']}
+    regressions = []
+    for result in document['results']:
+        before = reference.get(_key(result))
+        if before and result['time_per_step'] > before * (1 + threshold):
+            regressions.append((result, before))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('cases', nargs='*', metavar='case',
+                        help='cases to run, from %s (default: all)'
+                        % ', '.join(CASES))
+    parser.add_argument('--nx', type=int, nargs='+',
+                        help='grid sizes (default: a ladder per kind)')
+    parser.add_argument('--backend', nargs='+', choices=('numpy', 'numba'))
+    parser.add_argument('--dtype', default='float64')
+    parser.add_argument('--min-time', type=float, default=0.2)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write the results to this file')
+    parser.add_argument('--baseline', help='compare against this results file')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='allowed slowdown against the baseline')
+    args = parser.parse_args(argv)
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error('unknown cases: %s' % ', '.join(sorted(unknown)))
+
+    document = run(args.cases, args.nx, args.backend, args.dtype,
+                   args.min_time, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(document, json.load(f), args.threshold)
+        for result, before in regressions:
+            print('REGRESSION %s %s nx=%d: %.3e s/step, baseline %.3e'
+                  % (result['case'], result['backend'], result['nx'],
+                     result['time_per_step'], before))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+The lessons' model problems as ready-to-step solvers.
+
+Every case builds its solver from the grid size alone, with the physical
+parameters, initial condition and time step rule of its lesson (dt follows
+dx where the lesson uses a sigma), so the same problem can be run at any
+resolution, precision or backend:
+
+    case = CASES['step8']
+    solver = case.build(nx=1025, dtype='float32', backend='numba')
+    solver.step(case.nt)
+
+The lesson's sigma and nu (and Re for the flows) can be changed as keywords
+of the builder.  Other `options` are passed on to the solver class (backend,
+threads, dtype, ...); `kind` tells which: '1d' (Solver1D), '2d' (Solver2D),
+'poisson' (Relaxation) or 'flow' (NavierStokes2D).  Only '1d' and '2d' take
+a backend.  A `scheme` or `integrator` option runs Steps 1, 2, 5, 7 and 8
+with highorder.py's HighOrder1D/2D instead, e.g. scheme='weno5'.
+"""
+
+import collections
+
+import numpy
+
+import instrument
+import poisson
+from navier_stokes import NavierStokes2D
+from highorder import HighOrder1D, HighOrder2D
+from solver1d import Solver1D
+from solver2d import Solver2D
+
+
+Case = collections.namedtuple('Case', 'build nx nt kind description')
+
+
+class Relaxation:
+    """Step 10 behind the solver interface: each step is one iteration of
+    poisson.solve's `method` (a sweep, or a V-cycle for multigrid)."""
+
+    def __init__(self, p, b, dx, dy, bc=poisson.POISSON_BC,
+                 method='jacobi', dtype=float):
+        self.p = numpy.array(p, dtype=dtype)
+        self.b = numpy.array(b, dtype=dtype)
+        self.dtype = self.p.dtype
+        self.dx, self.dy = dx, dy
+        self.bc, self.method = bc, method
+        self._poisson = poisson.Poisson(self.p.shape, dx, dy, bc)
+        self.residuals = []
+        self.n = 0
+
+    @property
+    def fields(self):
+        return (self.p,)
+
+    def step(self, nt=1):
+        rec = instrument.active
+        if rec:
+            t = rec.clock()
+        result = self._poisson.solve(self.p, self.b, self.method, rtol=0,
+                                     maxiter=nt)
+        self.residuals.append(result.residuals[-1])
+        if rec:
+            rec.lap('relaxation', t)
+            rec.count('steps', nt)
+        self.n += nt
+        return self.fields
+
+
+def _hat(nx, ny=None):
+    # u = 2 on 0.5 <= x, y <= 1 and 1 elsewhere, on [0, 2] (x [0, 2])
+    dx = 2.0 / (nx - 1)
+    if ny is None:
+        u = numpy.ones(nx)
+        u[int(.5 / dx):int(1 / dx + 1)] = 2
+        return u, dx
+    dy = 2.0 / (ny - 1)
+    u = numpy.ones((ny, nx))
+    u[int(.5 / dy):int(1 / dy + 1), int(.5 / dx):int(1 / dx + 1)] = 2
+    return u, dx, dy
+
+
+def _explicit(options, solver, highorder):
+    # a scheme or integrator option selects highorder.py's solver
+    if 'scheme' in options or 'integrator' in options:
+        return highorder
+    return solver
+
+
+def step1(nx=41, sigma=.5, **options):
+    u, dx = _hat(nx)
+    solver = _explicit(options, Solver1D, HighOrder1D)
+    return solver(u, sigma * dx, dx, 'linear', c=1, **options)
+
+
+def step2(nx=41, sigma=.5, **options):
+    u, dx = _hat(nx)
+    solver = _explicit(options, Solver1D, HighOrder1D)
+    return solver(u, sigma * dx, dx, 'nonlinear', **options)
+
+
+def step3(nx=41, sigma=.5, **options):
+    u, dx = _hat(nx)
+    return Solver1D(u, sigma * dx, dx, 'linear', c=1, **options)
+
+
+def step4(nx=41, nu=.3, sigma=.2, **options):
+    u, dx = _hat(nx)
+    return Solver1D(u, sigma * dx**2 / nu, dx, 'diffusion', nu=nu, **options)
+
+
+def step5(nx=101, nu=.07, **options):
+    from analytic import burgers
+    dx = 2 * numpy.pi / (nx - 1)
+    u = burgers(0, numpy.linspace(0, 2 * numpy.pi, nx), nu)
+    solver = _explicit(options, Solver1D, HighOrder1D)
+    return solver(u, dx * nu, dx, 'burgers', nu=nu, bc='periodic', **options)
+
+
+def step7(nx=81, sigma=.2, **options):
+    u, dx, dy = _hat(nx, nx)
+    solver = _explicit(options, Solver2D, HighOrder2D)
+    return solver(u, sigma * dx, dx, dy, 'linear', c=1, **options)
+
+
+def step8(nx=101, sigma=.2, **options):
+    u, dx, dy = _hat(nx, nx)
+    solver = _explicit(options, Solver2D, HighOrder2D)
+    return solver((u, u), sigma * dx, dx, dy, 'convection', c=1, **options)
+
+
+def step9(nx=31, nu=.05, sigma=.25, **options):
+    u, dx, dy = _hat(nx, nx)
+    return Solver2D(u, sigma * dx * dy / nu, dx, dy, 'diffusion', nu=nu,
+                    **options)
+
+
+def step10(nx=50, **options):
+    dx, dy = 2.0 / (nx - 1), 1.0 / (nx - 1)
+    b = numpy.zeros((nx, nx))
+    b[int(nx / 4), int(nx / 4)] = 100
+    b[int(3 * nx / 4), int(3 * nx / 4)] = -100
+    return Relaxation(numpy.zeros((nx, nx)), b, dx, dy, **options)
+
+
+def _viscosity(nu, Re):
+    # Re from the unit lid or mean speed and the domain width 2
+    return 2.0 / Re if Re else nu
+
+
+def step11(nx=41, nu=.1, Re=None, **options):
+    dx = 2.0 / (nx - 1)
+    nu = _viscosity(nu, Re)
+    z = numpy.zeros((nx, nx))
+    # dt = .001 at nx = 41, scaled with the diffusive limit dx**2 / nu
+    dt = .001 * (41 - 1)**2 / (nx - 1)**2 * min(1, .1 / nu)
+    return NavierStokes2D(z, z, z, dt, dx, dx, rho=1, nu=nu, flow='cavity',
+                          **options)
+
+
+def step12(nx=41, nu=.1, Re=None, **options):
+    dx = 2.0 / (nx - 1)
+    nu = _viscosity(nu, Re)
+    z = numpy.zeros((nx, nx))
+    dt = .01 * (41 - 1)**2 / (nx - 1)**2 * min(1, .1 / nu)
+    return NavierStokes2D(z, z, numpy.ones((nx, nx)), dt, dx, dx, rho=1,
+                          nu=nu, flow='channel', F=1, **options)
+
+
+CASES = {
+    'step1': Case(step1, 41, 25, '1d', '1D linear convection'),
+    'step2': Case(step2, 41, 20, '1d', '1D nonlinear convection'),
+    'step3': Case(step3, 41, 20, '1d', '1D linear convection, dt from sigma'),
+    'step4': Case(step4, 41, 20, '1d', '1D diffusion'),
+    'step5': Case(step5, 101, 100, '1d', '1D Burgers, periodic'),
+    'step7': Case(step7, 81, 100, '2d', '2D linear convection'),
+    'step8': Case(step8, 101, 80, '2d', '2D convection'),
+    'step9': Case(step9, 31, 50, '2d', '2D diffusion'),
+    'step10': Case(step10, 50, 100, 'poisson', 'Poisson equation, Jacobi'),
+    'step11': Case(step11, 41, 100, 'flow', 'cavity flow'),
+    'step12': Case(step12, 41, 100, 'flow', 'channel flow'),
+}
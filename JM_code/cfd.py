@@ -0,0 +1,225 @@
+"""
+Command-line entry point for the lesson cases of cases.py.
+
+    python -m cfd list
+    python -m cfd run step8 --nx 2048 --nt 5000 --backend numba
+    python -m cfd run runs.toml              #the runs of a case file
+    python -m cfd run runs.yaml --nt 10      #flags override the file
+
+A case file (TOML, YAML or JSON) holds one run, or a list of them under
+`runs`; the other top-level keys are defaults for every run:
+
+    dtype = "float32"
+
+    [[runs]]
+    case = "step8"
+    nx = 1025
+    output = "step8.npz"
+
+    [[runs]]
+    case = "step11"
+    nt = 500
+    plot = "cavity.png"
+
+Run keys are case, nx, nt (defaults from CASES), output (.npz of the final
+fields), snapshots and every (snapshots.record), plot (PNG of the first
+field) and trace (Chrome trace of the phases, see instrument.py).  Any other
+key is passed on to the case's solver: backend, threads, dtype, tile,
+time_block, method, nit, scheme, integrator, ...  A case only gets the keys
+its builder or solver has a parameter for, so one --backend or --set can
+serve cases of every kind; the others are reported and left out.  For the
+flows (step11, step12) `method` is the pressure solve's.
+
+Only numpy and the solver modules are imported up front: matplotlib is
+imported for `plot`, PyYAML for .yaml files and sympy at most once ever, by
+the Burgers case (see analytic.py).
+"""
+
+import argparse
+import contextlib
+import inspect
+import json
+import os
+import sys
+import time
+
+import numpy
+
+import instrument
+from cases import CASES, Relaxation
+from highorder import HighOrder1D, HighOrder2D
+from navier_stokes import NavierStokes2D
+from solver1d import Solver1D
+from solver2d import Solver2D
+
+
+SOLVERS = {'1d': Solver1D, '2d': Solver2D, 'poisson': Relaxation,
+           'flow': NavierStokes2D}
+HIGH_ORDER = {'1d': HighOrder1D, '2d': HighOrder2D}
+
+
+def load(path):
+    """The list of run dicts of a case file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.toml':
+        try:
+            import tomllib
+        except ImportError:   #Python < 3.11
+            import tomli as tomllib
+        with open(path, 'rb') as f:
+            document = tomllib.load(f)
+    elif ext in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError('PyYAML is needed to read %s' % path) from None
+        with open(path) as f:
+            document = yaml.safe_load(f)
+    elif ext == '.json':
+        with open(path) as f:
+            document = json.load(f)
+    else:
+        raise ValueError('unknown case file type %r, expected .toml, .yaml '
+                         'or .json' % ext)
+    defaults = dict(document or {})
+    runs = defaults.pop('runs', [{}])
+    return [dict(defaults, **run) for run in runs]
+
+
+def case_options(case, options):
+    """The options of a run that `case` takes, and the keys it has no
+    parameter for.  A flow's `method` goes to its pressure solve."""
+    spec = CASES[case]
+    options = dict(options)
+    if spec.kind == 'flow' and 'method' in options:
+        options['pressure'] = dict(options.get('pressure') or {},
+                                   method=options.pop('method'))
+    solver = SOLVERS[spec.kind]
+    if spec.kind in HIGH_ORDER and ('scheme' in options
+                                    or 'integrator' in options):
+        solver = HIGH_ORDER[spec.kind]
+    known = (set(inspect.signature(spec.build).parameters)
+             | set(inspect.signature(solver).parameters))
+    dropped = sorted(set(options) - known)
+    return {k: v for k, v in options.items() if k in known}, dropped
+
+
+def _plot(solver, path):
+    import render
+    field = solver.fields[0]
+    if field.ndim == 1:
+        x = numpy.arange(field.shape[-1]) * solver.dx
+        return render.curve(x, field, path)
+    y, x = (numpy.arange(n) * d for n, d in zip(field.shape[-2:],
+                                                (solver.dy, solver.dx)))
+    return render.surface(x, y, field, path)
+
+
+def run(case, nx=None, nt=None, output=None, snapshots=None, every=None,
+        plot=None, trace=None, **options):
+    """Build and step one case, write what was asked for and return the
+    solver."""
+    if case not in CASES:
+        raise ValueError('unknown case %r, expected one of %s'
+                         % (case, ', '.join(CASES)))
+    spec = CASES[case]
+    nx = nx or spec.nx
+    nt = nt or spec.nt
+    kept, dropped = case_options(case, options)
+    if dropped:
+        print('%s: ignoring %s, not an option of this case'
+              % (case, ', '.join(dropped)), file=sys.stderr)
+    solver = spec.build(nx, **kept)
+    recorder = instrument.Recorder(trace=True) if trace else None
+    start = time.perf_counter()
+    try:
+        with recorder or contextlib.nullcontext():
+            if snapshots:
+                import snapshots as snapshot_files
+                snapshot_files.record(solver, nt, every or nt, snapshots)
+            else:
+                solver.step(nt)
+    finally:
+        if hasattr(solver, 'close'):
+            solver.close()
+    elapsed = time.perf_counter() - start
+    print('%-7s nx=%-6d nt=%-6d %8.3f s  %10.3e s/step'
+          % (case, nx, nt, elapsed, elapsed / nt))
+
+    if output:
+        names = ('u', 'v', 'p')[:len(solver.fields)]
+        numpy.savez(output, **dict(zip(names, solver.fields)))
+    if plot:
+        _plot(solver, plot)
+    if recorder:
+        recorder.write_trace(trace)
+    return solver
+
+
+def _value(text):
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return {'none': None, 'true': True, 'false': False}.get(text.lower(),
+                                                             text)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='cfd',
+                                     description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='list the cases')
+    p = commands.add_parser('run', help='run cases or case files')
+    p.add_argument('targets', nargs='+', metavar='case',
+                   help='case names from %s, or case files' % ', '.join(CASES))
+    p.add_argument('--nx', type=int, help='grid points per axis')
+    p.add_argument('--nt', type=int, help='time steps')
+    p.add_argument('--backend', choices=('numpy', 'numba'))
+    p.add_argument('--dtype')
+    p.add_argument('--threads', type=int)
+    p.add_argument('--output', help='.npz file of the final fields')
+    p.add_argument('--snapshots', help='path prefix of snapshot files')
+    p.add_argument('--every', type=int, help='steps between snapshots')
+    p.add_argument('--plot', help='PNG file of the first field')
+    p.add_argument('--trace', help='Chrome trace file of the run')
+    p.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                   help='any other solver option, e.g. --set time_block=4')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for name, case in CASES.items():
+            print('%-7s %-8s nx=%-4d nt=%-4d %s' % (name, case.kind, case.nx,
+                                                   case.nt, case.description))
+        return 0
+
+    overrides = {key: value for key, value in vars(args).items()
+                 if key not in ('command', 'targets', 'set')
+                 and value is not None}
+    for item in args.set:
+        key, sep, value = item.partition('=')
+        if not sep:
+            parser.error('--set expects KEY=VALUE, got %r' % item)
+        overrides[key] = _value(value)
+
+    runs = []
+    for target in args.targets:
+        if target in CASES:
+            runs.append(dict(case=target))
+        elif os.path.isfile(target):
+            try:
+                runs.extend(load(target))
+            except (ImportError, ValueError) as error:
+                parser.error(str(error))
+        else:
+            parser.error('%r is neither a case nor a case file' % target)
+    for options in runs:
+        if 'case' not in options:
+            parser.error('a run has no case: %r' % options)
+        run(**dict(options, **overrides))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Checkpoint and restart for Solver1D and Solver2D.
+
+A checkpoint is one binary file:
+
+    magic b'CFDCKPT\\0' | version (uint32) | header length (uint32)
+    JSON header: solver kind, step n, time t, parameters, array table
+    raw array data, each array starting on a 64-byte boundary
+
+Arrays are written straight from the solver buffers (no copy) and restore()
+memory-maps them back, so saving and loading cost about one pass over the
+data.  The file is written to a temporary name and renamed, so a job killed
+mid-save keeps its previous checkpoint.  A restored solver continues
+bit-identically:
+
+    solver = restore('run.ckpt') if os.path.exists('run.ckpt') else build()
+    run(solver, nt, every=500, path='run.ckpt')
+"""
+
+import json
+import os
+import struct
+
+import numpy
+
+from solver1d import Solver1D
+from solver2d import Solver2D
+
+
+MAGIC = b'CFDCKPT\0'
+VERSION = 1
+ALIGN = 64
+
+_PREFIX = struct.Struct('<8sII')
+
+
+def _describe(solver):
+    """(kind, constructor keywords) needed to rebuild solver."""
+    if isinstance(solver, Solver2D):
+        kind = '2d'
+    elif isinstance(solver, Solver1D):
+        kind = '1d'
+    else:
+        raise TypeError('cannot checkpoint %s, only Solver1D and Solver2D'
+                        % type(solver).__name__)
+    if not isinstance(solver.bc_spec, (str, int, float)):
+        raise ValueError('solvers with a custom boundary condition callable '
+                         'cannot be checkpointed')
+    params = dict(dx=solver.dx, equation=solver.equation, c=solver.c,
+                  nu=solver.nu, dt=solver.dt, bc=solver.bc_spec,
+                  backend=solver.backend, dtype=solver.dtype.name)
+    if kind == '2d':
+        params.update(dy=solver.dy, threads=solver.threads, tile=solver.tile,
+                      time_block=solver.time_block, active=solver.active)
+    return kind, params
+
+
+def save(solver, path):
+    """Write the state of solver to path.
+
+    Only Solver1D and Solver2D with a constant or named boundary condition
+    are covered; the flows, the high-order and the implicit solvers raise
+    TypeError.
+    """
+    kind, params = _describe(solver)
+    arrays = [('field%d' % k, f) for k, f in enumerate(solver.fields)]
+    # ensemble coefficients are arrays; scalars go into the JSON header
+    for name in ('dt', 'c', 'nu'):
+        if numpy.ndim(params[name]):
+            arrays.append(('param:' + name, params.pop(name)))
+        else:
+            params[name] = float(params[name])
+    t = solver.t   #an array for ensembles with several dt
+    if numpy.ndim(t):
+        arrays.append(('time', t))
+        t = None
+    else:
+        t = float(t)
+
+    table, offset = [], 0
+    for name, a in arrays:
+        a = numpy.ascontiguousarray(a)
+        table.append(dict(name=name, dtype=a.dtype.str, shape=a.shape,
+                          offset=offset))
+        offset += -(-a.nbytes // ALIGN) * ALIGN
+    header = json.dumps(dict(kind=kind, n=solver.n, t=t, params=params,
+                             arrays=table)).encode()
+    start = -(-(_PREFIX.size + len(header)) // ALIGN) * ALIGN
+
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for entry, (name, a) in zip(table, arrays):
+            f.seek(start + entry['offset'])
+            f.write(memoryview(numpy.ascontiguousarray(a)).cast('B'))
+        f.truncate(start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read(path):
+    """Return (header, {name: read-only memory-mapped array})."""
+    with open(path, 'rb') as f:
+        magic, version, size = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError('%s is not a checkpoint file' % path)
+        if version != VERSION:
+            raise ValueError('%s has checkpoint version %d, expected %d'
+                             % (path, version, VERSION))
+        header = json.loads(f.read(size))
+    start = -(-(_PREFIX.size + size) // ALIGN) * ALIGN
+    arrays = {e['name']: numpy.memmap(path, dtype=e['dtype'], mode='r',
+                                      offset=start + e['offset'],
+                                      shape=tuple(e['shape']))
+              for e in header['arrays']}
+    return header, arrays
+
+
+def restore(path, **overrides):
+    """Rebuild the solver saved in path; keywords override saved parameters.
+
+    Overriding threads or backend is safe; changing the physics is not a
+    restart any more.
+    """
+    header, arrays = read(path)
+    params = dict(header['params'])
+    for name, a in arrays.items():
+        if name.startswith('param:'):
+            # a copy: a memmap would keep the file mapped, and open files
+            # cannot be replaced on Windows
+            params[name[len('param:'):]] = numpy.array(a)
+    params.update(overrides)
+    fields = [arrays['field%d' % k] for k in range(len(arrays))
+              if 'field%d' % k in arrays]
+
+    dt, dx = params.pop('dt'), params.pop('dx')
+    if header['kind'] == '2d':
+        solver = Solver2D(tuple(fields), dt, dx, params.pop('dy'), **params)
+    else:
+        solver = Solver1D(fields[0], dt, dx, **params)
+    solver.n = header['n']
+    if 'time' in arrays:
+        solver.t = numpy.array(arrays['time'])
+    elif header.get('t') is not None:
+        solver.t = header['t']
+    else:   #written before the time was saved
+        solver.t = solver.n * solver.dt
+    return solver
+
+
+def run(solver, nt, every, path):
+    """Step solver until solver.n == nt, checkpointing every `every` steps.
+
+    Counting is in absolute steps, so calling run() again on a restored
+    solver with the same nt finishes the original run.
+    """
+    while solver.n < nt:
+        solver.step(min(every - solver.n % every, nt - solver.n))
+        save(solver, path)
+    return solver
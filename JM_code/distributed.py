@@ -0,0 +1,599 @@
+"""
+Domain decomposition of the 2D cases over worker processes.
+
+Threads (Solver2D's threads=N) share one interpreter and stop scaling where
+the numpy calls are too short to release the GIL for long; here every
+process owns a block of the grid instead.  The interior points are split
+over a py x px grid of ranks, each of which keeps its block with a one point
+frame around it: on the domain's edges the frame is the boundary itself,
+inside it is a halo holding the neighbours' edge rows and columns, refreshed
+after every update by exchange().  With the lessons' five-point stencils
+that makes every rank's update the same arithmetic as the serial solver's,
+so the assembled result is identical to it.
+
+    fields = run('step8', nx=2049, nt=500, processes=8).fields
+
+Cases are step7, step8, step9 (Solver2D), step10 (Jacobi sweeps, with the
+global L1 norm of the lessons' stopping test) and step11 (the cavity flow,
+with the lessons' fixed nit pressure sweeps); run() also reports the
+largest Courant number over all ranks for the convective ones.  The
+periodic channel of step12 is not decomposed.
+
+The ranks talk through a communicator with the mpi4py interface
+(Get_rank, Get_size, Sendrecv, allreduce, Barrier).  run() starts the
+processes on one machine and gives them a SharedComm, whose messages pass
+through a multiprocessing.shared_memory block; simulate(), the code every
+rank runs, takes mpi4py's COMM_WORLD just as well:
+
+    from mpi4py import MPI
+    spec, initial = setup('step8', nx=2049)
+    dims = process_grid(MPI.COMM_WORLD.Get_size(), initial[0].shape)
+    rank = simulate(MPI.COMM_WORLD, dims, spec, initial, nt=500)
+    rank.fields, rank.block   #this rank's fields and its place in the grid
+
+    python distributed.py step9 --nx 2001 --nt 200 --processes 4
+"""
+
+import argparse
+import collections
+import multiprocessing
+import multiprocessing.connection
+import queue
+import sys
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy
+
+import poisson
+from cases import CASES
+from navier_stokes import NavierStokes2D
+from solver2d import Solver2D
+
+
+SIDES = ('west', 'east', 'south', 'north')
+
+Result = collections.namedtuple('Result', 'fields steps courant l1norm')
+
+
+def _constants(comm):
+    # PROC_NULL, SUM and MAX of the communicator's library
+    if type(comm).__module__.startswith('mpi4py'):
+        from mpi4py import MPI
+        return MPI.PROC_NULL, MPI.SUM, MPI.MAX
+    return comm.PROC_NULL, comm.SUM, comm.MAX
+
+
+class SharedComm:
+    """The part of an MPI communicator the ranks use, for processes of one
+    machine: messages and reductions go through a shared memory block and
+    every call waits on a barrier of all ranks.
+
+    Each rank has a mailbox slot per message tag; Sendrecv writes the
+    message into the destination's slot, waits for the other ranks to do
+    the same and reads its own.  The slots alternate between two halves, so
+    a rank going on to the next call cannot overwrite a message still being
+    read, and one barrier per call is enough.  Unlike MPI's, every call is
+    collective: all ranks must make it, PROC_NULL ends included.
+    """
+
+    PROC_NULL = -1
+    SUM, MAX = 'sum', 'max'
+    TAGS = 4
+    OPS = {'sum': numpy.sum, 'max': numpy.max}
+
+    def __init__(self, rank, size, barrier, name, message_bytes):
+        self.rank, self.size = rank, size
+        self._barrier = barrier
+        self._shm = shared_memory.SharedMemory(name)
+        n = 2 * size * self.TAGS * message_bytes
+        self._mailbox = numpy.ndarray((2, size, self.TAGS, message_bytes),
+                                      numpy.uint8, self._shm.buf)
+        self._slots = numpy.ndarray((2, size), numpy.float64, self._shm.buf,
+                                    offset=n)
+        self._messages = self._reductions = 0
+
+    @classmethod
+    def nbytes(cls, size, message_bytes):
+        """Size of the shared block for size ranks."""
+        return 2 * size * (cls.TAGS * message_bytes + 8)
+
+    def Get_rank(self):
+        return self.rank
+
+    def Get_size(self):
+        return self.size
+
+    def Barrier(self):
+        self._barrier.wait()
+
+    def _slot(self, rank, tag, buf):
+        half = self._messages % 2
+        return self._mailbox[half, rank, tag, :buf.nbytes].view(
+            buf.dtype).reshape(buf.shape)
+
+    def Sendrecv(self, sendbuf, dest, sendtag=0, recvbuf=None,
+                 source=PROC_NULL, recvtag=0):
+        if dest != self.PROC_NULL:
+            self._slot(dest, sendtag, sendbuf)[...] = sendbuf
+        self._barrier.wait()
+        if source != self.PROC_NULL:
+            recvbuf[...] = self._slot(self.rank, recvtag, recvbuf)
+        self._messages += 1
+
+    def allreduce(self, value, op=SUM):
+        slots = self._slots[self._reductions % 2]
+        slots[self.rank] = value
+        self._barrier.wait()
+        self._reductions += 1
+        return float(self.OPS[op](slots))
+
+    def close(self):
+        del self._mailbox, self._slots
+        self._shm.close()
+
+
+def _split(n, parts):
+    # the interior points 1 .. n-2 in `parts` contiguous (j0, j1) ranges
+    if parts > n - 2:
+        raise ValueError('cannot split %d interior points over %d ranks'
+                         % (n - 2, parts))
+    edges = [1 + (n - 2) * k // parts for k in range(parts + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def process_grid(size, shape):
+    """The (py, px) grid of size ranks with the fewest halo points."""
+    ny, nx = shape
+    best = None
+    for py in range(1, size + 1):
+        if size % py == 0:
+            px = size // py
+            halo = (py - 1) * nx + (px - 1) * ny
+            if best is None or halo < best[0]:
+                best = (halo, (py, px))
+    return best[1]
+
+
+class Subdomain:
+    """One rank's block of a (ny, nx) grid split over a (py, px) grid of
+    ranks, and its halo exchange and global reductions through `comm`.
+
+    `rows` and `cols` are the global slices of the block with its frame;
+    `physical` tells which of its SIDES lie on the domain's edges.
+    """
+
+    def __init__(self, comm, dims, shape):
+        self.comm = comm
+        null, self.SUM, self.MAX = _constants(comm)
+        py, px = dims
+        rank, size = comm.Get_rank(), comm.Get_size()
+        if py * px != size:
+            raise ValueError('%d x %d ranks do not make %d' % (py, px, size))
+        self.coords = ry, rx = divmod(rank, px)
+        (j0, j1), (i0, i1) = _split(shape[0], py)[ry], _split(shape[1], px)[rx]
+        self.rows, self.cols = slice(j0 - 1, j1 + 1), slice(i0 - 1, i1 + 1)
+        self.neighbours = dict(west=rank - 1 if rx > 0 else null,
+                               east=rank + 1 if rx < px - 1 else null,
+                               south=rank - px if ry > 0 else null,
+                               north=rank + px if ry < py - 1 else null)
+        self.physical = {side: n == null
+                         for side, n in self.neighbours.items()}
+        self._null = null
+        self._buffers = {}
+
+    @property
+    def block(self):
+        """The part of the global grid this rank computes: its interior and
+        whichever frame sides are domain edges, as global and local slices."""
+        p = self.physical
+        local = (slice(0 if p['south'] else 1, None if p['north'] else -1),
+                 slice(0 if p['west'] else 1, None if p['east'] else -1))
+        glob = tuple(slice(s.start + l.start,
+                           s.stop if l.stop is None else s.stop + l.stop)
+                     for s, l in zip((self.rows, self.cols), local))
+        return glob, local
+
+    def local(self, field, dtype=None):
+        """A copy of this rank's block of a global field, with its frame."""
+        return numpy.array(field[self.rows, self.cols], dtype=dtype)
+
+    def store(self, local, field):
+        """Write the part of `local` this rank computes into `field`."""
+        glob, loc = self.block
+        field[glob] = local[loc]
+
+    def _buffer(self, key, shape, dtype):
+        if key not in self._buffers:
+            self._buffers[key] = numpy.empty(shape, dtype)
+        return self._buffers[key]
+
+    def _sendrecv(self, fields, send, dest, recv, source, tag):
+        shape = (len(fields),) + fields[0][recv].shape
+        key = (shape, fields[0].dtype, tag)
+        sendbuf = self._buffer(key + ('send',), shape, fields[0].dtype)
+        recvbuf = self._buffer(key + ('recv',), shape, fields[0].dtype)
+        if dest != self._null:
+            for k, f in enumerate(fields):
+                sendbuf[k] = f[send]
+        self.comm.Sendrecv(sendbuf, dest=dest, sendtag=tag, recvbuf=recvbuf,
+                           source=source, recvtag=tag)
+        if source != self._null:
+            for k, f in enumerate(fields):
+                f[recv] = recvbuf[k]
+
+    def exchange(self, *fields):
+        """Refresh the halos of the fields (of one dtype) from the
+        neighbours: columns first, then whole rows, so corners come along."""
+        n = self.neighbours
+        col = lambda i: (slice(None), i)
+        row = lambda j: (j, slice(None))
+        self._sendrecv(fields, col(-2), n['east'], col(0), n['west'], 0)
+        self._sendrecv(fields, col(1), n['west'], col(-1), n['east'], 1)
+        self._sendrecv(fields, row(-2), n['north'], row(0), n['south'], 2)
+        self._sendrecv(fields, row(1), n['south'], row(-1), n['north'], 3)
+
+    def sum(self, x):
+        return self.comm.allreduce(float(x), op=self.SUM)
+
+    def max(self, x):
+        return self.comm.allreduce(float(x), op=self.MAX)
+
+
+###The cases, as every rank runs them
+
+def setup(case, nx=None, **options):
+    """The picklable description of a case and its global initial fields.
+
+    options are those of the case's builder in cases.py.
+    """
+    if case not in CASES:
+        raise ValueError('unknown case %r, expected one of %s'
+                         % (case, ', '.join(CASES)))
+    spec = CASES[case]
+    solver = spec.build(nx or spec.nx, **options)
+    if spec.kind == '2d':
+        if callable(solver.bc_spec):
+            raise ValueError('distributed runs need a constant boundary value')
+        params = dict(equation=solver.equation, dt=float(solver.dt),
+                      c=float(solver.c), nu=float(solver.nu),
+                      bc=solver.bc_spec, backend=solver.backend)
+        initial = solver.fields
+    elif spec.kind == 'poisson':
+        if solver.method != 'jacobi':
+            raise ValueError('distributed Poisson runs do Jacobi sweeps, not '
+                             '%r' % solver.method)
+        params = dict(bc=solver.bc)
+        initial = (solver.p, solver.b)
+    elif spec.kind == 'flow' and solver.flow == 'cavity':
+        pressure = solver.pressure
+        if pressure['method'] != 'jacobi' or solver.tol:
+            raise ValueError('distributed flows do the fixed nit Jacobi '
+                             'sweeps of the lessons')
+        params = dict(dt=solver.dt, rho=solver.rho, nu=solver.nu,
+                      lid=solver.lid, nit=pressure['maxiter'])
+        initial = solver.fields
+    else:
+        raise ValueError('case %r cannot be decomposed' % case)
+    params.update(kind=spec.kind, dx=solver.dx, dy=solver.dy,
+                  dtype=numpy.dtype(solver.dtype).str)
+    return params, initial
+
+
+def _edges(value, physical):
+    # Solver2D's constant boundary value, on the domain's edges only
+    def bc(solver, fields):
+        for f in fields:
+            if physical['south']:
+                f[0, :] = value
+            if physical['north']:
+                f[-1, :] = value
+            if physical['west']:
+                f[:, 0] = value
+            if physical['east']:
+                f[:, -1] = value
+    return bc
+
+
+def _level(sub, shape, spec):
+    # poisson's finest level for the block: the internal sides get a
+    # Dirichlet condition with no value, which poisson._fill leaves alone
+    kinds, values, periodic = poisson._parse_bc(spec['bc'])
+    if periodic:
+        raise ValueError('periodic edges cannot be decomposed')
+    for side, edge in zip(SIDES, poisson.EDGES):
+        if not sub.physical[side]:
+            kinds[edge], values[edge] = 'dirichlet', None
+    return poisson._Level(shape, spec['dx'], spec['dy'], kinds, False), values
+
+
+class Rank:
+    """What one rank computes: `fields` are its blocks (with their frames)
+    of the case's fields after step(), `block` where they go globally."""
+
+    def __init__(self, sub, spec, initial):
+        self.sub, self.spec = sub, spec
+        self.kind = spec['kind']
+        self.steps = 0
+        self.l1norm = None
+        dtype = spec['dtype']
+        if self.kind == '2d':
+            self.solver = Solver2D(
+                tuple(sub.local(f) for f in initial), spec['dt'], spec['dx'],
+                spec['dy'], spec['equation'], spec['c'], spec['nu'],
+                bc=_edges(spec['bc'], sub.physical), backend=spec['backend'],
+                dtype=dtype)
+        elif self.kind == 'poisson':
+            p, b = (sub.local(f, float) for f in initial)
+            self.level, values = _level(sub, p.shape, spec)
+            self.level.p[...], self.level.b[...] = p, b
+            poisson._fill(self.level.p, self.level, values)
+            self._pn = numpy.empty_like(p)
+            self.dtype = numpy.dtype(dtype)
+        else:
+            u, v, p = (sub.local(f) for f in initial)
+            self.flow = NavierStokes2D(u, v, p, spec['dt'], spec['dx'],
+                                       spec['dy'], spec['rho'], spec['nu'],
+                                       'cavity', lid=spec['lid'],
+                                       nit=spec['nit'], dtype=dtype)
+            self.level, self._values = _level(sub, p.shape,
+                                              dict(spec, bc=poisson.CAVITY_BC))
+
+    @property
+    def fields(self):
+        if self.kind == '2d':
+            return self.solver.fields
+        if self.kind == 'poisson':
+            return (self.level.p.astype(self.dtype, copy=False),)
+        return self.flow.fields
+
+    @property
+    def block(self):
+        return self.sub.block
+
+    def step(self, nt, l1_target=None):
+        """Advance nt steps, or Jacobi sweeps until the L1 norm of the
+        change falls below l1_target; return the number done."""
+        if self.kind == '2d':
+            for n in range(nt):
+                self.solver.step(1)
+                self.sub.exchange(*self.solver.fields)
+            done = nt
+        elif self.kind == 'poisson':
+            done = self._relax(nt, l1_target)
+        else:
+            for n in range(nt):
+                self._cavity_step()
+            done = nt
+        self.steps += done
+        return done
+
+    def courant(self):
+        """The largest Courant number over all ranks, None for diffusion
+        and Poisson."""
+        spec = self.spec
+        equation = spec.get('equation', 'cavity')
+        if self.kind == 'poisson' or equation == 'diffusion':
+            return None
+        dt, dx, dy = spec['dt'], spec['dx'], spec['dy']
+        if equation == 'linear':
+            return abs(spec['c']) * dt / min(dx, dy)
+        if equation == 'convection':
+            dt *= abs(spec['c'])
+        block = self.sub.block[1]
+        u, v = self.fields[:2]
+        return self.sub.max(dt * max(numpy.abs(u[block]).max() / dx,
+                                     numpy.abs(v[block]).max() / dy))
+
+    def _relax(self, nt, l1_target):
+        # the lessons' stopping test, sum |p - pn| / sum |pn| over the grid
+        lv, pn, sub = self.level, self._pn, self.sub
+        inner = (slice(1, -1), slice(1, -1))
+        for n in range(nt):
+            if l1_target is not None:
+                pn[...] = lv.p
+            poisson._jacobi(lv.p, lv.b, lv, lv.r)
+            sub.exchange(lv.p)
+            if l1_target is not None:
+                change = sub.sum(numpy.abs(lv.p[inner] - pn[inner]).sum())
+                size = sub.sum(numpy.abs(pn[inner]).sum())
+                self.l1norm = change / size if size else numpy.inf
+                if self.l1norm < l1_target:
+                    return n + 1
+        return nt
+
+    def _cavity_step(self):
+        # NavierStokes2D.step with the boundaries on the domain's edges and
+        # a halo exchange after every update the next one reads around
+        flow, lv, sub = self.flow, self.level, self.sub
+        U, V, P = flow._U, flow._V, flow._P
+        flow._differences(U, V)
+        b = flow.build_up_b()
+        lv.p[...] = P
+        lv.b[...] = b
+        poisson._fill(lv.p, lv, self._values)
+        for k in range(self.spec['nit']):
+            poisson._jacobi(lv.p, lv.b, lv, lv.r)
+            sub.exchange(lv.p)
+        P[...] = lv.p
+        Un, Vn = flow._Un, flow._Vn
+        flow._momentum(Un[1:-1, 1:-1], U, U, V, flow._dux, flow._duy,
+                       (P[1:-1, 2:], P[1:-1, :-2]), flow.dx, flow.F)
+        flow._momentum(Vn[1:-1, 1:-1], V, U, V, flow._dvx, flow._dvy,
+                       (P[2:, 1:-1], P[:-2, 1:-1]), flow.dy, 0)
+        physical = sub.physical
+        for f in (Un, Vn):
+            if physical['south']:
+                f[0, :] = 0
+            if physical['west']:
+                f[:, 0] = 0
+            if physical['east']:
+                f[:, -1] = 0
+            if physical['north']:
+                f[-1, :] = 0
+        if physical['north']:
+            Un[-1, :] = flow.lid
+        sub.exchange(Un, Vn)
+        flow._U, flow._Un = Un, U
+        flow._V, flow._Vn = Vn, V
+        flow.n += 1
+
+
+def simulate(comm, dims, spec, initial, nt, l1_target=None):
+    """Every rank's part of a run: its Rank after nt steps from `initial`
+    (the global fields, or anything sliced the same way)."""
+    sub = Subdomain(comm, dims, initial[0].shape)
+    rank = Rank(sub, spec, initial)
+    rank.step(nt, l1_target)
+    return rank
+
+
+###Processes on one machine
+
+def _share(names, shape, dtypes):
+    # views of the shared fields; the caller closes the blocks once the
+    # views are gone
+    blocks = [shared_memory.SharedMemory(name) for name in names]
+    return blocks, [numpy.ndarray(shape, numpy.dtype(dtype), block.buf)
+                    for block, dtype in zip(blocks, dtypes)]
+
+
+def _rank(rank, size, barrier, dims, spec, nt, l1_target, names,
+          message_bytes, shape, results):
+    comm = SharedComm(rank, size, barrier, names[0], message_bytes)
+    blocks, fields = _share(names[1:], shape, spec['dtypes'])
+    try:
+        r = simulate(comm, dims, spec, fields, nt, l1_target)
+        for k, local in enumerate(r.fields):
+            r.sub.store(local, fields[k])
+        courant = r.courant()
+        if rank == 0:
+            results.put((r.steps, courant, r.l1norm))
+    finally:
+        fields.clear()
+        comm.close()
+        for block in blocks:
+            block.close()
+
+
+def _worker(rank, size, barrier, errors, *args):
+    # _rank in a worker process; a failure is reported on `errors`
+    try:
+        _rank(rank, size, barrier, *args)
+    except Exception:
+        barrier.abort()   #the other ranks stop waiting for this one
+        errors.put('rank %d:\n%s' % (rank, traceback.format_exc()))
+        failed = True
+    else:
+        failed = False
+    if failed:
+        sys.exit(1)
+
+
+def _watch(workers, barrier):
+    # wait for every worker; a rank killed by a signal never gets to
+    # barrier.abort(), so once any rank has failed the parent aborts the
+    # barrier for it rather than leave the others waiting for ever
+    pending = {w.sentinel: w for w in workers}
+    while pending:
+        for sentinel in multiprocessing.connection.wait(list(pending)):
+            w = pending.pop(sentinel)
+            w.join()   #the sentinel can be ready before the exit code is
+            if w.exitcode:
+                barrier.abort()
+
+
+def run(case, nx=None, nt=None, processes=2, dims=None, l1_target=None,
+        **options):
+    """Run a case of cases.py on `processes` worker processes (a dims
+    grid of them, by default process_grid's) and return a Result with the
+    assembled global fields, the steps done, the final largest Courant
+    number and the final L1 norm (of Jacobi sweeps run to l1_target).
+    A rank that raises or is killed stops the others and the run raises
+    RuntimeError."""
+    spec, initial = setup(case, nx, **options)
+    nt = nt or CASES[case].nt
+    shape = initial[0].shape
+    dims = dims or process_grid(processes, shape)
+    size = dims[0] * dims[1]
+    # the longest message: three fields' rows or columns with their frame
+    longest = max(max(j1 - j0 for j0, j1 in _split(n, parts)) + 2
+                  for n, parts in zip(shape, dims))
+    message_bytes = 3 * longest * max(f.itemsize for f in initial)
+
+    ctx = multiprocessing.get_context()
+    blocks = [shared_memory.SharedMemory(
+        create=True, size=SharedComm.nbytes(size, message_bytes))]
+    fields = []
+    try:
+        for f in initial:
+            blocks.append(shared_memory.SharedMemory(create=True,
+                                                     size=max(f.nbytes, 1)))
+            fields.append(numpy.ndarray(f.shape, f.dtype, blocks[-1].buf))
+            fields[-1][...] = f
+        del initial
+        spec = dict(spec, dtypes=[f.dtype.str for f in fields])
+        barrier, results, errors = ctx.Barrier(size), ctx.Queue(), ctx.Queue()
+        workers = [ctx.Process(target=_worker, args=(
+            rank, size, barrier, errors, dims, spec, nt, l1_target,
+            [b.name for b in blocks], message_bytes, shape, results))
+            for rank in range(size)]
+        for w in workers:
+            w.start()
+        _watch(workers, barrier)
+        if any(w.exitcode for w in workers):
+            messages = []
+            while True:
+                try:
+                    messages.append(errors.get(timeout=0.1))
+                except queue.Empty:
+                    break
+            messages += ['rank %d was killed by signal %d'
+                         % (rank, -w.exitcode)
+                         for rank, w in enumerate(workers) if w.exitcode < 0]
+            # the rank that failed first, not those it left at the barrier
+            messages.sort(key=lambda m: 'BrokenBarrierError' in m)
+            raise RuntimeError('distributed run failed, ' + (
+                messages[0] if messages else 'a worker died'))
+        steps, courant, l1norm = results.get()
+        out = tuple(numpy.array(f) for f in fields)
+        if spec['kind'] == 'poisson':
+            out = out[:1]
+    finally:
+        fields.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return Result(out, steps, courant, l1norm)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('case', choices=('step7', 'step8', 'step9', 'step10',
+                                         'step11'))
+    parser.add_argument('--nx', type=int)
+    parser.add_argument('--nt', type=int)
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--dims', type=int, nargs=2, metavar=('PY', 'PX'))
+    parser.add_argument('--l1-target', type=float,
+                        help='step10: stop once the L1 norm is below this')
+    parser.add_argument('--dtype')
+    parser.add_argument('--output', help='.npz file of the final fields')
+    args = parser.parse_args(argv)
+    options = {} if args.dtype is None else dict(dtype=args.dtype)
+    start = time.perf_counter()
+    result = run(args.case, args.nx, args.nt, args.processes, args.dims,
+                 args.l1_target, **options)
+    elapsed = time.perf_counter() - start
+    print('%-7s %s  steps=%-6d %8.3f s  courant=%s  l1norm=%s'
+          % (args.case, 'x'.join(map(str, result.fields[0].shape)),
+             result.steps, elapsed, result.courant, result.l1norm))
+    if args.output:
+        names = ('p',) if args.case == 'step10' else ('u', 'v', 'p')
+        numpy.savez(args.output, **dict(zip(names, result.fields)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
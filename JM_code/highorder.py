@@ -0,0 +1,427 @@
+"""
+Higher-order upwind schemes and SSP Runge-Kutta time stepping for the
+convection equations of Steps 1, 2, 5, 7 and 8.
+
+The lessons difference every advection term a df/dx with first-order
+upwinding, f[i] - f[i-1], and step with forward Euler, so their error only
+falls as fast as dx.  Here f is first reconstructed at the cell faces i+1/2
+from the upwind side and differenced there, a df/dx ~ a (f[i+1/2] -
+f[i-1/2]) / dx, with one of the SCHEMES
+
+    'upwind'      f[i+1/2] = f[i]: the lessons' scheme
+    'minmod', 'vanleer', 'superbee', 'mc'
+                  second order MUSCL slopes, TVD under the limiter named
+    'weno5'       fifth order WENO (Jiang & Shu), three ghost points a side
+
+and the result advanced with one of the strong-stability-preserving
+Runge-Kutta INTEGRATORS 'euler' (the lessons'), 'ssprk2' or 'ssprk3', whose
+stages are convex combinations of Euler steps.  Viscous terms are the
+lessons' central differences.  Velocities may take either sign; points
+where a < 0 use the reconstruction from the right.
+
+    solver = HighOrder1D(u, dt, dx, 'burgers', nu=nu, bc='periodic',
+                         scheme='weno5', integrator='ssprk3')
+    solver.step(nt)
+
+report() measures error against the Burgers solution of Step 5 and the
+cost (point updates, run time) of every scheme over a ladder of grids:
+
+    python highorder.py --tol 2e-2
+"""
+
+import argparse
+import time
+
+import numpy
+
+import instrument
+from solver2d import dirichlet
+
+
+G = 3   #ghost points per side, enough for weno5
+
+
+###Reconstructions
+# f at face j+1/2 from the five values around it, nearest the upwind side
+# last but one: (f[j-2], f[j-1], f[j], f[j+1], f[j+2]) for a > 0.  Passing
+# (f[j+3], f[j+2], f[j+1], f[j], f[j-1]) gives the face value for a < 0.
+
+def _upwind(fm2, fm1, f0, fp1, fp2):
+    return f0
+
+
+def _muscl(limiter):
+    def reconstruct(fm2, fm1, f0, fp1, fp2):
+        return f0 + 0.5 * limiter(f0 - fm1, fp1 - f0)
+    return reconstruct
+
+
+def minmod(a, b):
+    return numpy.where(a * b > 0, numpy.sign(a)
+                       * numpy.minimum(numpy.abs(a), numpy.abs(b)), 0.0)
+
+
+def vanleer(a, b):
+    ab = a * b
+    return numpy.where(ab > 0, 2 * ab / numpy.where(ab > 0, a + b, 1.0), 0.0)
+
+
+def superbee(a, b):
+    a_, b_ = numpy.abs(a), numpy.abs(b)
+    return numpy.where(a * b > 0, numpy.sign(a) * numpy.maximum(
+        numpy.minimum(2 * a_, b_), numpy.minimum(a_, 2 * b_)), 0.0)
+
+
+def mc(a, b):
+    return numpy.where(a * b > 0, numpy.sign(a) * numpy.minimum(
+        numpy.minimum(2 * numpy.abs(a), 2 * numpy.abs(b)),
+        0.5 * numpy.abs(a + b)), 0.0)
+
+
+def _weno5(fm2, fm1, f0, fp1, fp2, eps=1e-6):
+    p0 = (2 * fm2 - 7 * fm1 + 11 * f0) / 6
+    p1 = (-fm1 + 5 * f0 + 2 * fp1) / 6
+    p2 = (2 * f0 + 5 * fp1 - fp2) / 6
+    b0 = (13 / 12 * (fm2 - 2 * fm1 + f0)**2
+          + 0.25 * (fm2 - 4 * fm1 + 3 * f0)**2)
+    b1 = 13 / 12 * (fm1 - 2 * f0 + fp1)**2 + 0.25 * (fm1 - fp1)**2
+    b2 = (13 / 12 * (f0 - 2 * fp1 + fp2)**2
+          + 0.25 * (3 * f0 - 4 * fp1 + fp2)**2)
+    a0 = 0.1 / (eps + b0)**2
+    a1 = 0.6 / (eps + b1)**2
+    a2 = 0.3 / (eps + b2)**2
+    return (a0 * p0 + a1 * p1 + a2 * p2) / (a0 + a1 + a2)
+
+
+SCHEMES = {
+    'upwind': _upwind,
+    'minmod': _muscl(minmod),
+    'vanleer': _muscl(vanleer),
+    'superbee': _muscl(superbee),
+    'mc': _muscl(mc),
+    'weno5': _weno5,
+}
+
+# Shu-Osher form: stage k is w = a u^n + (1 - a) (w + dt L(w))
+INTEGRATORS = {
+    'euler': (0.0,),
+    'ssprk2': (0.0, 1 / 2),
+    'ssprk3': (0.0, 3 / 4, 1 / 3),
+}
+
+
+def _lookup(table, name, what):
+    if name not in table:
+        raise ValueError('unknown %s %r, expected one of %s'
+                         % (what, name, sorted(table)))
+    return table[name]
+
+
+def _along(f, axis, start, stop):
+    index = [slice(None)] * f.ndim
+    index[axis] = slice(start, stop)
+    return f[tuple(index)]
+
+
+def advection(f, a, h, axis, reconstruct):
+    """a df/dx at the points of f padded with G ghosts along `axis`."""
+    n = f.shape[axis] - 2 * G
+    s = [_along(f, axis, G - 1 + k, G + n + k) for k in range(-2, 4)]
+    faces = reconstruct(*s[:5])
+    out = _along(faces, axis, 1, None) - _along(faces, axis, None, -1)
+    positive = numpy.all(a >= 0)
+    out *= numpy.maximum(a, 0) / h if not positive else a / h
+    if not positive:
+        faces = reconstruct(s[5], s[4], s[3], s[2], s[1])
+        d = _along(faces, axis, 1, None) - _along(faces, axis, None, -1)
+        d *= numpy.minimum(a, 0) / h
+        out += d
+    return out
+
+
+def diffusion(f, h, axis):
+    """d2f/dx2 at the points of f padded with G ghosts along `axis`."""
+    n = f.shape[axis] - 2 * G
+    return (_along(f, axis, G + 1, G + n + 1) - 2 * _along(f, axis, G, G + n)
+            + _along(f, axis, G - 1, G + n - 1)) / h**2
+
+
+class HighOrder1D:
+    """Steps 1, 2 and 5 ('linear', 'nonlinear', 'burgers'; 'diffusion'
+    too) with the Solver1D interface.  bc is 'dirichlet' (the end values are
+    held, but for the outflow end of convection) or 'periodic' (u[-1]
+    duplicates u[0], as in Step 5)."""
+
+    EQUATIONS = ('linear', 'nonlinear', 'diffusion', 'burgers')
+
+    def __init__(self, u, dt, dx, equation='linear', c=1.0, nu=0.0,
+                 bc='dirichlet', scheme='weno5', integrator='ssprk3',
+                 dtype=float):
+        _lookup(dict.fromkeys(self.EQUATIONS), equation, 'equation')
+        _lookup(dict.fromkeys(('dirichlet', 'periodic')), bc, 'bc')
+        self.reconstruct = _lookup(SCHEMES, scheme, 'scheme')
+        self.stages = _lookup(INTEGRATORS, integrator, 'integrator')
+        self.equation, self.bc_spec = equation, bc
+        self.scheme, self.integrator = scheme, integrator
+        self.dt, self.dx, self.c, self.nu = float(dt), dx, float(c), float(nu)
+        self.n = 0
+
+        self.u = numpy.array(u, dtype=dtype)
+        self.dtype = self.u.dtype
+        self._un = numpy.empty_like(self.u)
+        # periodic: the nx - 1 distinct points; dirichlet: all of them
+        m = self.u.shape[-1] - 1 if bc == 'periodic' else self.u.shape[-1]
+        self._pad = numpy.empty(self.u.shape[:-1] + (m + 2 * G,), self.dtype)
+        # the points each stage updates, in u and in rhs(); like Solver1D,
+        # pure convection also updates the outflow point u[-1]
+        last = None if equation in ('linear', 'nonlinear') else -1
+        self._update = ((slice(None, -1), slice(None)) if bc == 'periodic'
+                        else (slice(1, last), slice(1, last)))
+
+    @property
+    def fields(self):
+        return (self.u,)
+
+    @property
+    def t(self):
+        return self.n * self.dt
+
+    def _fill(self, u):
+        p = self._pad
+        if self.bc_spec == 'periodic':
+            p[..., G:-G] = u[..., :-1]
+            p[..., :G] = u[..., -1 - G:-1]
+            p[..., -G:] = u[..., :G]
+        else:
+            p[..., G:-G] = u
+            p[..., :G] = u[..., :1]
+            p[..., -G:] = u[..., -1:]
+        return p
+
+    def rhs(self, u):
+        """du/dt at the points of u (at u[:-1] when periodic)."""
+        p = self._fill(u)
+        out = numpy.zeros(p.shape[:-1] + (p.shape[-1] - 2 * G,), self.dtype)
+        if self.equation != 'diffusion':
+            a = self.c if self.equation == 'linear' else p[..., G:-G]
+            out -= advection(p, a, self.dx, -1, self.reconstruct)
+        if self.equation in ('diffusion', 'burgers'):
+            out += self.nu * diffusion(p, self.dx, -1)
+        return out
+
+    def step(self, nt=1):
+        """Advance nt time steps and return the current solution."""
+        u, un = self.u, self._un
+        update, points = self._update
+        rec = instrument.active
+        for n in range(nt):
+            if rec:
+                t = rec.clock()
+            un[...] = u
+            for a in self.stages:
+                r = self.rhs(u)
+                u[..., update] += self.dt * r[..., points]
+                if a:
+                    u *= 1 - a
+                    u += a * un
+                if self.bc_spec == 'periodic':
+                    u[..., -1] = u[..., 0]
+            if rec:
+                rec.lap('stencil', t)
+        if rec:
+            rec.count('steps', nt)
+        self.n += nt
+        return u
+
+
+class HighOrder2D:
+    """Steps 7 and 8 ('linear', 'convection'; 'diffusion' and 'burgers'
+    too) with the Solver2D interface.  `bc` is a constant edge value or a
+    callable bc(solver, fields), applied after every stage."""
+
+    EQUATIONS = {'linear': 1, 'convection': 2, 'diffusion': 1, 'burgers': 2}
+
+    def __init__(self, fields, dt, dx, dy, equation='linear', c=1.0, nu=0.0,
+                 bc=1.0, scheme='weno5', integrator='ssprk3', dtype=float):
+        nfields = _lookup(self.EQUATIONS, equation, 'equation')
+        self.reconstruct = _lookup(SCHEMES, scheme, 'scheme')
+        self.stages = _lookup(INTEGRATORS, integrator, 'integrator')
+        if isinstance(fields, numpy.ndarray):
+            fields = (fields,)
+        if len(fields) != nfields:
+            raise ValueError('%r needs %d field(s), got %d'
+                             % (equation, nfields, len(fields)))
+        self.equation, self.bc_spec = equation, bc
+        self.bc = bc if callable(bc) else dirichlet(bc)
+        self.scheme, self.integrator = scheme, integrator
+        self.dt, self.dx, self.dy = float(dt), dx, dy
+        self.c, self.nu = float(c), float(nu)
+        self.n = 0
+
+        self.fields = tuple(numpy.array(f, dtype=dtype) for f in fields)
+        self.dtype = self.fields[0].dtype
+        self._old = tuple(numpy.empty_like(f) for f in self.fields)
+        *batch, ny, nx = self.fields[0].shape
+        self._pad = tuple(numpy.empty((*batch, ny + 2 * G, nx + 2 * G),
+                                      self.dtype) for f in self.fields)
+
+    @property
+    def u(self):
+        return self.fields[0]
+
+    @property
+    def v(self):
+        return self.fields[1]
+
+    @property
+    def t(self):
+        return self.n * self.dt
+
+    def _fill(self, f, p):
+        p[..., G:-G, G:-G] = f
+        p[..., :G, :] = p[..., G:G + 1, :]
+        p[..., -G:, :] = p[..., -G - 1:-G, :]
+        p[..., :, :G] = p[..., :, G:G + 1]
+        p[..., :, -G:] = p[..., :, -G - 1:-G]
+        return p
+
+    def rhs(self, fields):
+        """d/dt of every field at every grid point."""
+        pads = [self._fill(f, p) for f, p in zip(fields, self._pad)]
+        if self.equation == 'linear':
+            ax = ay = self.c
+        elif self.equation != 'diffusion':
+            ax, ay = fields
+        out = []
+        for p in pads:
+            r = numpy.zeros(p.shape[:-2] + (p.shape[-2] - 2 * G,
+                                            p.shape[-1] - 2 * G), self.dtype)
+            rows, cols = p[..., G:-G, :], p[..., :, G:-G]
+            if self.equation != 'diffusion':
+                r -= advection(rows, ax, self.dx, -1, self.reconstruct)
+                r -= advection(cols, ay, self.dy, -2, self.reconstruct)
+            if self.equation in ('diffusion', 'burgers'):
+                r += self.nu * (diffusion(rows, self.dx, -1)
+                                + diffusion(cols, self.dy, -2))
+            out.append(r)
+        return out
+
+    def step(self, nt=1):
+        """Advance nt time steps and return the tuple of current fields."""
+        inner = (Ellipsis, slice(1, -1), slice(1, -1))
+        rec = instrument.active
+        for n in range(nt):
+            if rec:
+                t = rec.clock()
+            for f, g in zip(self.fields, self._old):
+                g[...] = f
+            for a in self.stages:
+                for f, g, r in zip(self.fields, self._old,
+                                   self.rhs(self.fields)):
+                    f[inner] += self.dt * r[inner]
+                    if a:
+                        f *= 1 - a
+                        f += a * g
+                self.bc(self, self.fields)
+            if rec:
+                rec.lap('stencil', t)
+        if rec:
+            rec.count('steps', nt)
+        self.n += nt
+        return self.fields
+
+
+###Accuracy against cost
+
+def burgers_error(nx, scheme, integrator, t_end=0.5, nu=0.07, sigma=None):
+    """L1 error against analytic.burgers at t_end of Step 5 on nx points,
+    with the run's point updates and seconds.  dt is Step 5's nu dx unless
+    sigma gives dt = sigma dx / 8 (a Courant number against the peak u),
+    and at most dx**2 / (4 nu) so that fine grids stay stable."""
+    from analytic import burgers
+    x = numpy.linspace(0, 2 * numpy.pi, nx)
+    dx = x[1] - x[0]
+    dt = min(sigma * dx / 8 if sigma else nu * dx, dx**2 / (4 * nu))
+    nt = int(numpy.ceil(t_end / dt))
+    solver = HighOrder1D(burgers(0, x, nu), t_end / nt, dx, 'burgers',
+                         nu=nu, bc='periodic', scheme=scheme,
+                         integrator=integrator)
+    start = time.perf_counter()
+    solver.step(nt)
+    elapsed = time.perf_counter() - start
+    error = numpy.mean(numpy.abs(solver.u - burgers(t_end, x, nu)))
+    return error, nx * nt * len(solver.stages), elapsed
+
+
+def _integrator(scheme):
+    # the cheapest integrator that keeps the scheme's order and stability
+    return {'upwind': 'euler', 'weno5': 'ssprk3'}.get(scheme, 'ssprk2')
+
+
+def report(schemes=('upwind', 'minmod', 'vanleer', 'mc', 'weno5'),
+           integrators=None, ladder=(51, 101, 201, 401, 801, 1601, 3201),
+           tol=2e-2, sigma=None):
+    """Print the error and cost of every scheme up the ladder of grids,
+    stopping at the first that reaches tol, then compare those; return
+    {(scheme, integrator): rows} of (nx, error, updates, seconds).  Each
+    scheme runs with every one of `integrators`, or by default euler for
+    upwind, ssprk3 for weno5 and ssprk2 for the TVD schemes."""
+    pairs = [(scheme, integrator) for scheme in schemes
+             for integrator in (integrators or [_integrator(scheme)])]
+    print('%-9s %-7s %6s %10s %12s %9s' % ('scheme', 'time', 'nx', 'L1 error',
+                                          'updates', 'seconds'))
+    results = {}
+    for scheme, integrator in pairs:
+        rows = []
+        for nx in ladder:
+            error, updates, seconds = burgers_error(nx, scheme, integrator,
+                                                    sigma=sigma)
+            rows.append((nx, error, updates, seconds))
+            print('%-9s %-7s %6d %10.2e %12d %9.4f'
+                  % (scheme, integrator, nx, error, updates, seconds))
+            if error <= tol:
+                break
+        results[scheme, integrator] = rows
+
+    print('\ncoarsest grid with an L1 error below %g:' % tol)
+    first = {}
+    for pair, rows in results.items():
+        first[pair] = rows[-1] if rows[-1][1] <= tol else None
+    base = first.get(('upwind', 'euler'))
+    for (scheme, integrator), hit in first.items():
+        if hit is None:
+            print('%-9s %-7s not reached on this ladder'
+                  % (scheme, integrator))
+            continue
+        nx, error, updates, seconds = hit
+        line = '%-9s %-7s nx=%-5d %12d updates %9.4f s' % (
+            scheme, integrator, nx, updates, seconds)
+        if base and hit is not base:
+            line += '  (%.1fx coarser, %.0fx fewer updates than upwind)' % (
+                base[0] / nx, base[2] / updates)
+        print(line)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scheme', nargs='+', choices=sorted(SCHEMES))
+    parser.add_argument('--integrator', nargs='+',
+                        choices=sorted(INTEGRATORS))
+    parser.add_argument('--nx', type=int, nargs='+', help='grid ladder')
+    parser.add_argument('--tol', type=float, default=2e-2)
+    parser.add_argument('--sigma', type=float,
+                        help="Courant number (default: Step 5's dt = nu dx)")
+    args = parser.parse_args(argv)
+    options = dict(tol=args.tol, sigma=args.sigma)
+    if args.scheme:
+        options['schemes'] = args.scheme
+    if args.integrator:
+        options['integrators'] = args.integrator
+    if args.nx:
+        options['ladder'] = args.nx
+    report(**options)
+
+
+if __name__ == '__main__':
+    main()
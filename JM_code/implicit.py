@@ -0,0 +1,274 @@
+"""
+Implicit diffusion for Steps 4 and 9, free of the explicit dt < dx**2 / nu
+limit.
+
+The theta scheme
+
+    (I - theta A) u^{n+1} = (I + (1 - theta) A) u^n,    A = nu dt laplacian
+
+is backward Euler for theta = 1 and Crank-Nicolson for theta = 1/2; both
+are stable for any dt.  Edges are Dirichlet and keep their initial values,
+like the explicit solvers.
+
+In 1D the system is tridiagonal with constant coefficients; its Thomas
+factors depend only on (nu dt / dx**2, nx), so they are computed once and
+cached, and a step is one forward and one backward sweep.  In 2D the default
+is the Douglas ADI splitting, a tridiagonal solve along x for every row and
+then along y for every column (vectorized over the other axis, factors
+cached likewise); it is second order in time for theta = 1/2.  method=
+'sparse' solves the unsplit 2D system with a sparse LU factorization
+(needs scipy), built once per solver and reused every step.
+
+    u = Implicit1D(u, dt, dx, nu, 'crank-nicolson').step(nt)
+    solver = Implicit2D(u, dt, dx, dy, nu, 'backward-euler')
+    solver.step(nt)
+"""
+
+import numpy
+
+import backends
+import instrument
+
+
+SCHEMES = {
+    'backward-euler': 1.0,
+    'crank-nicolson': 0.5,
+}
+METHODS_2D = ('adi', 'sparse')
+
+
+###Tridiagonal solves
+# systems -a x[j-1] + (1 + 2a) x[j] - a x[j+1] = d[j], j = 0 .. m-1, with
+# the boundary values already moved into d
+
+_factors = {}
+
+
+def thomas_factor(a, m):
+    """(cprime, inv_m) of the Thomas algorithm for the system above, cached."""
+    key = (float(a), m)
+    if key not in _factors:
+        b = 1 + 2 * a
+        cprime = numpy.zeros(m)
+        inv_m = numpy.empty(m)
+        inv_m[0] = 1 / b
+        for j in range(1, m):
+            cprime[j - 1] = -a * inv_m[j - 1]
+            inv_m[j] = 1 / (b + a * cprime[j - 1])
+        _factors[key] = cprime, inv_m
+    return _factors[key]
+
+
+def thomas_solve(d, a, axis=-1):
+    """Solve along `axis` of d in place; every other axis is a separate
+    system.  Returns d."""
+    cprime, inv_m = thomas_factor(a, d.shape[axis])
+    x = numpy.moveaxis(d, axis, 0)
+    x[0] *= inv_m[0]
+    for j in range(1, len(x)):
+        x[j] += a * x[j - 1]
+        x[j] *= inv_m[j]
+    for j in range(len(x) - 2, -1, -1):
+        x[j] -= cprime[j] * x[j + 1]
+    return d
+
+
+def _theta(scheme):
+    if scheme not in SCHEMES:
+        raise ValueError('unknown scheme %r, expected one of %s'
+                         % (scheme, sorted(SCHEMES)))
+    return SCHEMES[scheme]
+
+
+def _check_scalar(**params):
+    for name, value in params.items():
+        if numpy.ndim(value):
+            raise ValueError('%s must be a scalar: the factorization is '
+                             'shared by every run' % name)
+
+
+class Implicit1D:
+    """Implicit 1D diffusion with the Solver1D interface.
+
+    Leading axes of `u` are independent runs solved together; dt and nu are
+    scalars.  backend='numba' runs the sweeps as a compiled loop (single run
+    only).  The fields are stored in `dtype`; the factors stay float64.
+    """
+
+    def __init__(self, u, dt, dx, nu, scheme='crank-nicolson',
+                 backend='numpy', dtype=float):
+        _check_scalar(dt=dt, nu=nu)
+        self.scheme = scheme
+        self.theta = _theta(scheme)
+        self.backend = backends.resolve(backend)
+        self.equation = 'diffusion'
+        self.dt, self.dx, self.nu = float(dt), dx, float(nu)
+        self.n = 0
+
+        self.u = numpy.array(u, dtype=dtype)
+        self.dtype = self.u.dtype
+        if self.backend == 'numba' and self.u.ndim != 1:
+            raise ValueError('the numba backend advances a single run only')
+        self._w = numpy.empty(self.u.shape[:-1] + (self.u.shape[-1] - 2,),
+                              self.dtype)
+
+    @property
+    def fields(self):
+        return (self.u,)
+
+    @property
+    def t(self):
+        return self.n * self.dt
+
+    def step(self, nt=1):
+        """Advance nt time steps and return the current solution."""
+        u, w = self.u, self._w
+        r = self.nu * self.dt / self.dx**2
+        a = self.theta * r
+        if self.backend == 'numba':
+            import numba_kernels
+            cprime, inv_m = thomas_factor(a, w.shape[-1])
+        rec = instrument.active
+        for n in range(nt):
+            if rec:
+                t = rec.clock()
+            # explicit part, then the boundary values of the implicit part
+            numpy.multiply(u[..., 1:-1], -2, out=w)
+            w += u[..., 2:]
+            w += u[..., :-2]
+            w *= (1 - self.theta) * r
+            w += u[..., 1:-1]
+            w[..., 0] += a * u[..., 0]
+            w[..., -1] += a * u[..., -1]
+            if rec:
+                t = rec.lap('explicit', t)
+            if self.backend == 'numba':
+                numba_kernels.thomas(w, a, cprime, inv_m)
+            else:
+                thomas_solve(w, a)
+            u[..., 1:-1] = w
+            if rec:
+                rec.lap('solve', t)
+        if rec:
+            rec.count('steps', nt)
+        self.n += nt
+        return u
+
+
+class Implicit2D:
+    """Implicit 2D diffusion with the Solver2D interface (field u only).
+
+    `method` is 'adi' (Douglas splitting, tridiagonal solves) or 'sparse'
+    (exact theta scheme, sparse LU from scipy).  Leading axes of `u` are
+    independent runs; dt and nu are scalars.  The fields are stored in
+    `dtype`.
+    """
+
+    def __init__(self, u, dt, dx, dy, nu, scheme='crank-nicolson',
+                 method='adi', dtype=float):
+        _check_scalar(dt=dt, nu=nu)
+        if method not in METHODS_2D:
+            raise ValueError('unknown method %r, expected one of %s'
+                             % (method, METHODS_2D))
+        self.scheme = scheme
+        self.theta = _theta(scheme)
+        self.method = method
+        self.equation = 'diffusion'
+        self.dt, self.dx, self.dy, self.nu = float(dt), dx, dy, float(nu)
+        self.n = 0
+
+        self.fields = (numpy.array(u, dtype=dtype),)
+        self.dtype = self.fields[0].dtype
+        *batch, ny, nx = self.fields[0].shape
+        shape = (*batch, ny - 2, nx - 2)
+        self._lx, self._ly, self._w = (numpy.empty(shape, self.dtype)
+                                       for k in range(3))
+        self._lu = self._factorize(ny - 2, nx - 2) if method == 'sparse' \
+            else None
+
+    @property
+    def u(self):
+        return self.fields[0]
+
+    @property
+    def t(self):
+        return self.n * self.dt
+
+    def _factorize(self, my, mx):
+        from scipy import sparse
+        from scipy.sparse.linalg import splu
+
+        def second_difference(m, r):
+            return sparse.diags([r, -2 * r, r], [-1, 0, 1], shape=(m, m))
+
+        rx = self.nu * self.dt / self.dx**2
+        ry = self.nu * self.dt / self.dy**2
+        A = (sparse.kron(sparse.identity(my), second_difference(mx, rx)) +
+             sparse.kron(second_difference(my, ry), sparse.identity(mx)))
+        return splu(sparse.csc_matrix(sparse.identity(my * mx) -
+                                      self.theta * A))
+
+    def _differences(self, u):
+        """nu dt d2u/dx2 and nu dt d2u/dy2 on the interior, into lx and ly."""
+        c = u[..., 1:-1, 1:-1]
+        for out, fe, fw, r in ((self._lx, u[..., 1:-1, 2:], u[..., 1:-1, :-2],
+                                self.nu * self.dt / self.dx**2),
+                               (self._ly, u[..., 2:, 1:-1], u[..., :-2, 1:-1],
+                                self.nu * self.dt / self.dy**2)):
+            numpy.multiply(c, -2, out=out)
+            out += fe
+            out += fw
+            out *= r
+
+    def _edges(self, w, u, ax, ay):
+        # boundary values of the implicit part, times theta r
+        if ax:
+            w[..., :, 0] += ax * u[..., 1:-1, 0]
+            w[..., :, -1] += ax * u[..., 1:-1, -1]
+        if ay:
+            w[..., 0, :] += ay * u[..., 0, 1:-1]
+            w[..., -1, :] += ay * u[..., -1, 1:-1]
+
+    def step(self, nt=1):
+        """Advance nt time steps and return the tuple of current fields."""
+        u, = self.fields
+        lx, ly, w = self._lx, self._ly, self._w
+        theta = self.theta
+        ax = theta * self.nu * self.dt / self.dx**2
+        ay = theta * self.nu * self.dt / self.dy**2
+        rec = instrument.active
+        for n in range(nt):
+            if rec:
+                t = rec.clock()
+            self._differences(u)
+            if self.method == 'sparse':
+                # (I - theta A) u' = u + (1 - theta) A u
+                numpy.add(lx, ly, out=w)
+                w *= 1 - theta
+                w += u[..., 1:-1, 1:-1]
+                self._edges(w, u, ax, ay)
+                if rec:
+                    t = rec.lap('explicit', t)
+                flat = w.reshape(-1, w.shape[-2] * w.shape[-1])
+                u[..., 1:-1, 1:-1] = self._lu.solve(flat.T).T.reshape(w.shape)
+            else:
+                # Douglas: (I - theta Ax) u* = u + (1 - theta) Ax u + Ay u
+                #          (I - theta Ay) u' = u* - theta Ay u
+                numpy.multiply(lx, 1 - theta, out=w)
+                w += ly
+                w += u[..., 1:-1, 1:-1]
+                self._edges(w, u, ax, 0)
+                if rec:
+                    t = rec.lap('explicit', t)
+                thomas_solve(w, ax, axis=-1)
+                ly *= theta
+                w -= ly
+                self._edges(w, u, 0, ay)
+                thomas_solve(w, ay, axis=-2)
+                u[..., 1:-1, 1:-1] = w
+            if rec:
+                rec.lap('solve', t)
+        if rec:
+            rec.count('steps', nt)
+        self.n += nt
+        return self.fields
@@ -0,0 +1,136 @@
+"""
+Opt-in timers and counters inside the solvers' time loops.
+
+The solvers look at `instrument.active` once per step() call; while it is
+None (the default) the only cost is that attribute check and one `if` per
+phase.  Inside a Recorder block every phase of every step is timed:
+
+    Solver1D, Solver2D     stencil, boundary (tile-pass when time blocked)
+    HighOrder1D/2D         stencil
+    Implicit1D/2D          explicit, solve
+    NavierStokes2D         differences, build_up_b, pressure, momentum,
+                           boundary
+    Relaxation (cases.py)  relaxation
+    render.surface         render
+
+along with counters (steps, poisson.iterations) and sampled values
+(poisson.residual).  With memory=True tracemalloc also reports the peak
+bytes allocated inside each phase, which shows a loop that builds
+temporaries; it slows the run down considerably.  Tracing already on
+stays on afterwards, but its peak is reset with every phase.
+
+    with instrument.Recorder(trace=True) as rec:
+        solver.step(nt)
+    print(rec.summary())
+    rec.write_trace('run.trace.json')   #chrome://tracing or ui.perfetto.dev
+    rec.write_log('run.log.jsonl')
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+active = None   #the Recorder collecting, if any
+
+
+class Recorder:
+    """Collects phase timings, counters and values while it is active.
+
+    `trace` keeps every phase as an event for write_trace(); otherwise only
+    totals are kept and memory use stays constant however long the run.
+    """
+
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self, trace=False, memory=False):
+        self.trace = trace
+        self.memory = memory
+        self.seconds = collections.Counter()
+        self.calls = collections.Counter()
+        self.allocated = collections.Counter()
+        self.counters = collections.Counter()
+        self.values = collections.defaultdict(list)
+        self.events = []
+        self._origin = self.clock()
+        self._previous = None
+        self._base = 0
+        self._started = False
+
+    def __enter__(self):
+        global active
+        self._previous, active = active, self
+        if self.memory:
+            # leave tracing on for a caller that had started it
+            self._started = not tracemalloc.is_tracing()
+            if self._started:
+                tracemalloc.start()
+            self._base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *exc):
+        global active
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+        active = self._previous
+
+    def lap(self, name, start):
+        """Book clock() - start to phase `name` and return the new time."""
+        end = self.clock()
+        self.seconds[name] += end - start
+        self.calls[name] += 1
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            self.allocated[name] += max(0, peak - self._base)
+            tracemalloc.reset_peak()
+            self._base = current
+        if self.trace:
+            self.events.append(dict(name=name, ph='X', pid=os.getpid(),
+                                    tid=threading.get_ident(),
+                                    ts=(start - self._origin) * 1e6,
+                                    dur=(end - start) * 1e6))
+        return end
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def value(self, name, x):
+        """Sample a quantity such as a residual."""
+        x = float(x)
+        self.values[name].append(x)
+        if self.trace:
+            self.events.append(dict(name=name, ph='C', pid=os.getpid(),
+                                    ts=(self.clock() - self._origin) * 1e6,
+                                    args={name: x}))
+
+    def summary(self):
+        """Totals as a JSON-ready dict."""
+        phases = {name: dict(calls=self.calls[name],
+                             seconds=self.seconds[name])
+                  for name in self.seconds}
+        if self.memory:
+            for name in phases:
+                phases[name]['bytes_allocated'] = self.allocated[name]
+        values = {name: dict(count=len(x), last=x[-1], min=min(x),
+                             max=max(x))
+                  for name, x in self.values.items()}
+        return dict(phases=phases, counters=dict(self.counters),
+                    values=values)
+
+    def write_log(self, path):
+        """Structured log: one JSON object per line, events then summary."""
+        with open(path, 'w') as f:
+            for event in self.events:
+                f.write(json.dumps(event) + '\n')
+            f.write(json.dumps(dict(summary=self.summary())) + '\n')
+
+    def write_trace(self, path):
+        """Chrome trace-event JSON of the events (recorded with trace=True)."""
+        with open(path, 'w') as f:
+            json.dump(dict(traceEvents=self.events, displayTimeUnit='ms',
+                           otherData=self.summary()), f)
@@ -0,0 +1,244 @@
+"""
+Navier-Stokes solvers of Steps 11 (cavity flow) and 12 (channel flow).
+
+Per step the lessons difference the same velocities many times: central
+derivatives in build_up_b, then upwind derivatives and Laplacians in the
+momentum update.  Here each velocity is differenced once per direction into
+a preallocated buffer (d[i] = u[i] - u[i-1]); every later term is read from
+those buffers,
+
+    upwind  u[i] - u[i-1]          = d[i]
+    central (u[i+1] - u[i-1]) / 2  = (d[i+1] + d[i]) / 2
+    second  u[i+1] - 2u[i] + u[i-1] = d[i+1] - d[i]
+
+and b, the pressure and the new velocities are written into buffers that are
+reused every step.  The channel is periodic in x, so its fields are stored
+with one ghost column on each side.
+
+    u, v, p = cavity_flow(nt, u, v, dt, dx, dy, p, rho, nu)
+    flow = NavierStokes2D(u, v, p, dt, dx, dy, rho, nu, 'channel', F=1)
+    flow.step(100)
+"""
+
+import numpy
+
+import instrument
+import poisson
+
+
+FLOWS = {
+    'cavity': poisson.CAVITY_BC,
+    'channel': poisson.CHANNEL_BC,
+}
+
+
+class NavierStokes2D:
+    """Incompressible flow in the lid-driven cavity or the periodic channel.
+
+    `pressure` holds keyword arguments for poisson.solve; the default is the
+    lessons' `nit` Jacobi sweeps per step, warm-started from the previous p.
+    Given `tol`, a step's sweeps stop early once the RMS residual is below
+    tol times the RMS of b, tested every `check_every` sweeps; near a steady
+    state the previous p already satisfies it and few or no sweeps are
+    done.  The iterations and final residual of every pressure solve are
+    kept in `pressure_iterations` and `pressure_residuals`.  The velocity
+    and pressure buffers use `dtype`; the pressure solve itself always
+    iterates in float64 (see poisson.solve).
+    """
+
+    def __init__(self, u, v, p, dt, dx, dy, rho=1.0, nu=0.1, flow='cavity',
+                 F=0.0, lid=1.0, nit=50, pressure=None, dtype=float,
+                 tol=None, check_every=10):
+        if flow not in FLOWS:
+            raise ValueError('unknown flow %r, expected one of %s'
+                             % (flow, sorted(FLOWS)))
+        self.flow = flow
+        self.periodic = flow == 'channel'
+        self.dt, self.dx, self.dy = dt, dx, dy
+        self.rho, self.nu, self.F, self.lid = rho, nu, F, lid
+        self.pressure = dict(method='jacobi', maxiter=nit, rtol=0,
+                             check_every=check_every)
+        self.pressure.update(pressure or {})
+        self.tol = tol
+        self.pressure_iterations = []
+        self.pressure_residuals = []
+        self.n = 0
+        self.dtype = dtype = numpy.dtype(dtype)
+
+        ny, nx = numpy.shape(u)
+        shape = (ny, nx + 2) if self.periodic else (ny, nx)
+        self._cols = slice(1, -1) if self.periodic else slice(None)
+        self._U, self._V, self._P = (numpy.zeros(shape, dtype)
+                                     for k in range(3))
+        for buf, f in ((self._U, u), (self._V, v), (self._P, p)):
+            buf[:, self._cols] = f
+            self._wrap(buf)
+        self._Un, self._Vn = (numpy.zeros(shape, dtype) for k in range(2))
+        self._B = numpy.zeros(shape, dtype)
+
+        # one difference per velocity and direction, interior rows/columns
+        m = (shape[0] - 2, shape[1] - 2)
+        self._dux = numpy.empty((m[0], m[1] + 1), dtype)
+        self._dvx = numpy.empty((m[0], m[1] + 1), dtype)
+        self._duy = numpy.empty((m[0] + 1, m[1]), dtype)
+        self._dvy = numpy.empty((m[0] + 1, m[1]), dtype)
+        self._ux, self._uy, self._vx, self._vy = (numpy.empty(m, dtype)
+                                                  for k in range(4))
+        self._w = numpy.empty(m, dtype)
+        self._poisson = poisson.Poisson((ny, nx), dx, dy, FLOWS[flow])
+
+    def _wrap(self, f):
+        if self.periodic:
+            f[:, 0] = f[:, -2]
+            f[:, -1] = f[:, 1]
+
+    @property
+    def u(self):
+        return self._U[:, self._cols]
+
+    @property
+    def v(self):
+        return self._V[:, self._cols]
+
+    @property
+    def p(self):
+        return self._P[:, self._cols]
+
+    @property
+    def fields(self):
+        return (self.u, self.v, self.p)
+
+    @property
+    def t(self):
+        return self.n * self.dt
+
+    def _differences(self, U, V):
+        numpy.subtract(U[1:-1, 1:], U[1:-1, :-1], out=self._dux)
+        numpy.subtract(V[1:-1, 1:], V[1:-1, :-1], out=self._dvx)
+        numpy.subtract(U[1:, 1:-1], U[:-1, 1:-1], out=self._duy)
+        numpy.subtract(V[1:, 1:-1], V[:-1, 1:-1], out=self._dvy)
+        for d, out, h, axis in ((self._dux, self._ux, self.dx, 1),
+                                (self._dvx, self._vx, self.dx, 1),
+                                (self._duy, self._uy, self.dy, 0),
+                                (self._dvy, self._vy, self.dy, 0)):
+            if axis == 1:
+                numpy.add(d[:, 1:], d[:, :-1], out=out)
+            else:
+                numpy.add(d[1:], d[:-1], out=out)
+            out *= 1 / (2 * h)
+
+    def build_up_b(self):
+        """Pressure source from the central derivatives, into the b buffer."""
+        b, w = self._B[1:-1, 1:-1], self._w
+        ux, uy, vx, vy = self._ux, self._uy, self._vx, self._vy
+        numpy.add(ux, vy, out=b)
+        b *= 1 / self.dt
+        numpy.multiply(ux, ux, out=w)
+        b -= w
+        numpy.multiply(uy, vx, out=w)
+        w *= 2
+        b -= w
+        numpy.multiply(vy, vy, out=w)
+        b -= w
+        b *= self.rho
+        return self._B[:, self._cols]
+
+    def _momentum(self, out, f, U, V, dfx, dfy, dp, h, source):
+        """out = f - u df/dx - v df/dy - dp/(2 rho h) + nu lap f + source."""
+        dt, w = self.dt, self._w
+        f0 = f[1:-1, 1:-1]
+        out[...] = f0
+        numpy.multiply(U[1:-1, 1:-1], dfx[:, :-1], out=w)
+        w *= dt / self.dx
+        out -= w
+        numpy.multiply(V[1:-1, 1:-1], dfy[:-1], out=w)
+        w *= dt / self.dy
+        out -= w
+        numpy.subtract(*dp, out=w)
+        w *= dt / (2 * self.rho * h)
+        out -= w
+        numpy.subtract(dfx[:, 1:], dfx[:, :-1], out=w)
+        w *= self.nu * dt / self.dx**2
+        out += w
+        numpy.subtract(dfy[1:], dfy[:-1], out=w)
+        w *= self.nu * dt / self.dy**2
+        out += w
+        if source:
+            out += source * dt
+
+    def _boundaries(self, U, V):
+        if self.periodic:
+            for f in (U, V):
+                f[0, :] = 0
+                f[-1, :] = 0
+                self._wrap(f)
+            return
+        for f in (U, V):
+            f[0, :] = 0
+            f[:, 0] = 0
+            f[:, -1] = 0
+            f[-1, :] = 0
+        U[-1, :] = self.lid   #the cavity lid
+
+    def step(self, nt=1):
+        """Advance nt time steps and return (u, v, p)."""
+        rec = instrument.active
+        for n in range(nt):
+            if rec:
+                t = rec.clock()
+            U, V, P = self._U, self._V, self._P
+            self._differences(U, V)
+            if rec:
+                t = rec.lap('differences', t)
+            b = self.build_up_b()
+            if rec:
+                t = rec.lap('build_up_b', t)
+            options = self.pressure
+            if self.tol:
+                w = numpy.square(self._B[1:-1, 1:-1], out=self._w)
+                scale = numpy.sqrt(numpy.mean(w, dtype=float))
+                # a positive atol even for b = 0, which turns the check on
+                atol = max(self.tol * scale, numpy.finfo(float).tiny)
+                options = dict(options, atol=atol)
+            result = self._poisson.solve(P[:, self._cols], b, **options)
+            self.pressure_iterations.append(result.iterations)
+            self.pressure_residuals.append(result.residuals[-1])
+            self._wrap(P)
+            if rec:
+                t = rec.lap('pressure', t)
+
+            Un, Vn = self._Un, self._Vn
+            self._momentum(Un[1:-1, 1:-1], U, U, V, self._dux, self._duy,
+                           (P[1:-1, 2:], P[1:-1, :-2]), self.dx, self.F)
+            self._momentum(Vn[1:-1, 1:-1], V, U, V, self._dvx, self._dvy,
+                           (P[2:, 1:-1], P[:-2, 1:-1]), self.dy, 0)
+            if rec:
+                t = rec.lap('momentum', t)
+            self._boundaries(Un, Vn)
+            if rec:
+                rec.lap('boundary', t)
+            self._U, self._Un = Un, U
+            self._V, self._Vn = Vn, V
+        if rec:
+            rec.count('steps', nt)
+        self.n += nt
+        return self.fields
+
+
+def _run(flow, nt, u, v, dt, dx, dy, p, rho, nu, **options):
+    solver = NavierStokes2D(u, v, p, dt, dx, dy, rho, nu, flow, **options)
+    solver.step(nt)
+    u[...], v[...], p[...] = solver.fields
+    return u, v, p
+
+
+def cavity_flow(nt, u, v, dt, dx, dy, p, rho, nu, nit=50, **options):
+    """Step 11's cavity_flow: advance u, v, p in place and return them."""
+    return _run('cavity', nt, u, v, dt, dx, dy, p, rho, nu, nit=nit,
+                **options)
+
+
+def channel_flow(nt, u, v, dt, dx, dy, p, rho, nu, F, nit=50, **options):
+    """Step 12's channel flow with body force F, in place like cavity_flow."""
+    return _run('channel', nt, u, v, dt, dx, dy, p, rho, nu, F=F, nit=nit,
+                **options)
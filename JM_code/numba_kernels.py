@@ -0,0 +1,160 @@
+"""
+Numba versions of the solver1d and solver2d kernels.
+
+Each kernel is one fused loop over the grid (the coupled u and v updates are
+done in the same pass) compiled with `cache=True`, so the machine code is
+stored in __pycache__ and later runs skip the JIT.  The loops release the
+GIL (`nogil=True`) so Solver2D can run row blocks on several threads.  Only
+import this module through backends.resolve(); it needs numba.
+"""
+
+import numba
+
+
+jit = numba.njit(cache=True, nogil=True)
+
+
+###1D kernels, same signature as the solver1d ones
+
+@jit
+def linear_convection(out, um, u0, up, dt, dx, c, nu):
+    k = c * dt / dx
+    for i in range(out.shape[0]):
+        out[i] = u0[i] - k * (u0[i] - um[i])
+
+
+@jit
+def nonlinear_convection(out, um, u0, up, dt, dx, c, nu):
+    k = dt / dx
+    for i in range(out.shape[0]):
+        out[i] = u0[i] - u0[i] * k * (u0[i] - um[i])
+
+
+@jit
+def diffusion(out, um, u0, up, dt, dx, c, nu):
+    a = nu * dt / dx**2
+    for i in range(out.shape[0]):
+        out[i] = u0[i] + a * (up[i] - 2 * u0[i] + um[i])
+
+
+@jit
+def burgers(out, um, u0, up, dt, dx, c, nu):
+    k = dt / dx
+    a = nu * dt / dx**2
+    for i in range(out.shape[0]):
+        out[i] = (u0[i] - u0[i] * k * (u0[i] - um[i]) +
+                  a * (up[i] - 2 * u0[i] + um[i]))
+
+
+KERNELS_1D = {
+    'linear': linear_convection,
+    'nonlinear': nonlinear_convection,
+    'diffusion': diffusion,
+    'burgers': burgers,
+}
+
+
+###2D loops
+
+@jit
+def _linear_2d(u, un, cx, cy):
+    ny, nx = un.shape
+    for j in range(1, ny):
+        for i in range(1, nx):
+            u[j, i] = (un[j, i] - cx * (un[j, i] - un[j, i - 1]) -
+                       cy * (un[j, i] - un[j - 1, i]))
+
+
+@jit
+def _convection_2d(u, v, un, vn, cx, cy):
+    ny, nx = un.shape
+    for j in range(1, ny):
+        for i in range(1, nx):
+            uc = un[j, i]
+            vc = vn[j, i]
+            u[j, i] = (uc - uc * cx * (uc - un[j, i - 1]) -
+                       vc * cy * (uc - un[j - 1, i]))
+            v[j, i] = (vc - uc * cx * (vc - vn[j, i - 1]) -
+                       vc * cy * (vc - vn[j - 1, i]))
+
+
+@jit
+def _diffusion_2d(u, un, ax, ay):
+    ny, nx = un.shape
+    for j in range(1, ny - 1):
+        for i in range(1, nx - 1):
+            uc = un[j, i]
+            u[j, i] = (uc + ax * (un[j, i + 1] - 2 * uc + un[j, i - 1]) +
+                       ay * (un[j + 1, i] - 2 * uc + un[j - 1, i]))
+
+
+@jit
+def _burgers_2d(u, v, un, vn, cx, cy, ax, ay):
+    ny, nx = un.shape
+    for j in range(1, ny - 1):
+        for i in range(1, nx - 1):
+            uc = un[j, i]
+            vc = vn[j, i]
+            u[j, i] = (uc - uc * cx * (uc - un[j, i - 1]) -
+                       vc * cy * (uc - un[j - 1, i]) +
+                       ax * (un[j, i + 1] - 2 * uc + un[j, i - 1]) +
+                       ay * (un[j + 1, i] - 2 * uc + un[j - 1, i]))
+            v[j, i] = (vc - uc * cx * (vc - vn[j, i - 1]) -
+                       vc * cy * (vc - vn[j - 1, i]) +
+                       ax * (vn[j, i + 1] - 2 * vc + vn[j, i - 1]) +
+                       ay * (vn[j + 1, i] - 2 * vc + vn[j - 1, i]))
+
+
+###2D kernels, same signature as the solver2d ones (the scratch w is unused)
+
+def linear_convection_2d(new, old, w, dt, dx, dy, c, nu):
+    _linear_2d(new[0], old[0], float(c * dt / dx), float(c * dt / dy))
+
+
+def convection_2d(new, old, w, dt, dx, dy, c, nu):
+    _convection_2d(new[0], new[1], old[0], old[1],
+                   float(c * dt / dx), float(c * dt / dy))
+
+
+def diffusion_2d(new, old, w, dt, dx, dy, c, nu):
+    _diffusion_2d(new[0], old[0], float(nu * dt / dx**2),
+                  float(nu * dt / dy**2))
+
+
+def burgers_2d(new, old, w, dt, dx, dy, c, nu):
+    _burgers_2d(new[0], new[1], old[0], old[1], float(dt / dx),
+                float(dt / dy), float(nu * dt / dx**2), float(nu * dt / dy**2))
+
+
+KERNELS_2D = {
+    'linear': linear_convection_2d,
+    'convection': convection_2d,
+    'diffusion': diffusion_2d,
+    'burgers': burgers_2d,
+}
+
+
+###Tridiagonal sweeps (implicit.py)
+
+@jit
+def thomas(d, a, cprime, inv_m):
+    """implicit.thomas_solve for one system, in place."""
+    d[0] *= inv_m[0]
+    for j in range(1, d.shape[0]):
+        d[j] = (d[j] + a * d[j - 1]) * inv_m[j]
+    for j in range(d.shape[0] - 2, -1, -1):
+        d[j] -= cprime[j] * d[j + 1]
+
+
+###Reductions
+
+@jit
+def min_max(f):
+    """(min, max) of f in one pass; NaN propagates like numpy's."""
+    lo = hi = f.flat[0]
+    for x in f.flat:
+        if x < lo or x != x:
+            lo = x
+        if x > hi or x != x:
+            hi = x
+    return lo, hi
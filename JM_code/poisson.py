@@ -0,0 +1,568 @@
+"""
+Poisson and Laplace solvers for Steps 9 to 12.
+
+Solves  d2p/dx2 + d2p/dy2 = b  on the lessons' vertex grids (p[j, i] at
+x = i dx, y = j dy) with the boundary conditions used there.  Each edge
+('left', 'right', 'bottom', 'top') is one of
+
+    ('dirichlet', value)   p = value on the edge; value None keeps what is
+                           already in p, arrays give one value per point
+    'neumann'              dp/dn = 0, written like the lessons: p[0] = p[1]
+    'periodic'             left and right only; x wraps with period nx
+
+Methods are 'jacobi' (the lessons' iteration), 'gauss-seidel' and 'sor'
+(red-black ordering) and 'multigrid', a geometric V-cycle with red-black
+smoothing.  Multigrid coarsens an axis while it has 2^k + 1 points (2^k when
+periodic), so 33, 65, 129 ... are the sizes to use; the coarsest grid is
+solved with a sparse LU from scipy (smoothed without it), which other sizes
+leave larger.  When x is periodic, 'fft' solves the discrete equations
+directly: an FFT in x decouples the wavenumbers and each one is a
+tridiagonal system in y.
+
+    result = solve(p, b, dx, dy, CAVITY_BC, rtol=1e-6)
+    result.p, result.iterations, result.residuals
+
+Solvers that solve on the same grid every step keep a Poisson, which holds
+the grid levels and work arrays between calls.
+"""
+
+import collections
+import functools
+import math
+
+import numpy
+
+import instrument
+
+
+PoissonResult = collections.namedtuple('PoissonResult',
+                                       'p iterations residuals')
+
+# boundary conditions of the lessons
+POISSON_BC = dict(left=('dirichlet', 0), right=('dirichlet', 0),      #Step 10
+                  bottom=('dirichlet', 0), top=('dirichlet', 0))
+CAVITY_BC = dict(left='neumann', right='neumann',                     #Step 11
+                 bottom='neumann', top=('dirichlet', 0))
+CHANNEL_BC = dict(left='periodic', right='periodic',                  #Step 12
+                  bottom='neumann', top='neumann')
+# Step 9 is dict(left=('dirichlet', 0), right=('dirichlet', y),
+#                bottom='neumann', top='neumann')
+
+EDGES = ('left', 'right', 'bottom', 'top')
+METHODS = ('jacobi', 'gauss-seidel', 'sor', 'multigrid', 'fft')
+
+COARSE_SWEEPS = 50   #coarsest-grid smoothing when scipy is not there
+
+
+def _parse_bc(bc):
+    kinds, values = {}, {}
+    for edge in EDGES:
+        spec = bc[edge]
+        kind, value = (spec, None) if isinstance(spec, str) else spec
+        if kind not in ('dirichlet', 'neumann', 'periodic'):
+            raise ValueError('unknown boundary condition %r on %s'
+                             % (kind, edge))
+        kinds[edge], values[edge] = kind, value
+    periodic = kinds['left'] == 'periodic'
+    if periodic != (kinds['right'] == 'periodic'):
+        raise ValueError('left and right must both be periodic or neither')
+    if 'periodic' in (kinds['bottom'], kinds['top']):
+        raise ValueError('only the x direction can be periodic')
+    return kinds, values, periodic
+
+
+def _singular(kinds):
+    # with no dirichlet edge p is only fixed up to a constant
+    return 'dirichlet' not in kinds.values()
+
+
+def _neumann(kinds, axis):
+    # which ends of an axis (0 for y, 1 for x) are neumann edges
+    low, high = ('bottom', 'top') if axis == 0 else ('left', 'right')
+    return kinds[low] == 'neumann', kinds[high] == 'neumann'
+
+
+###Grid levels
+# Every level stores p and b "padded": the unknowns are always [1:-1, 1:-1].
+# Without periodicity the padding is the boundary itself; with it the first
+# and last columns are ghost copies of the wrapped neighbours.
+
+class _Level:
+
+    def __init__(self, shape, dx, dy, kinds, periodic, weights=None):
+        self.shape = shape
+        self.dx, self.dy = dx, dy
+        self.kinds = kinds
+        self.periodic = periodic
+        # (wy, wx), shapes (ny, 1) and (1, nx), on coarse levels next to
+        # neumann edges: the x second difference of row j is scaled by wy[j]
+        # and the y one of column i by wx[i], see coarser()
+        self.weights = weights
+        self.relax = self._relax()
+        self.p = numpy.zeros(shape)
+        self.b = numpy.zeros(shape)
+        self.r = numpy.zeros(shape)
+        ny, nx = shape
+        # is this level coarsened along y / along x?  Only the finer axis
+        # (both for alike steps), as a point smoother needs levels near
+        # isotropic
+        self.cy = ny % 2 == 1 and ny >= 5 and dy < 1.5 * dx
+        self.cx = ((nx % 2 == 0 and nx >= 6) if periodic else
+                   (nx % 2 == 1 and nx >= 5)) and dx < 1.5 * dy
+
+    def _relax(self):
+        """Gauss-Seidel factors for the points next to neumann edges.
+
+        Their copied neighbour moves with them, so the true diagonal is
+        smaller than the one _red_black divides by; returns d / d_true
+        (None without neumann edges), 1 where the point is undetermined.
+        """
+        kinds = self.kinds
+        if 'neumann' not in kinds.values():
+            return None
+        ny, nx = self.shape
+        wy, wx = self.weights or (numpy.ones((ny, 1)), numpy.ones((1, nx)))
+        ax = numpy.broadcast_to(wy / self.dx**2, self.shape)
+        ay = numpy.broadcast_to(wx / self.dy**2, self.shape)
+        d = 2 * (ax + ay)
+        c = numpy.zeros(self.shape)
+        for edge, index, a in (('left', (slice(None), 1), ax),
+                               ('right', (slice(None), -2), ax),
+                               ('bottom', (1, slice(None)), ay),
+                               ('top', (-2, slice(None)), ay)):
+            if kinds[edge] == 'neumann':
+                c[index] += a[index]
+        return numpy.divide(d, d - c, out=numpy.ones(self.shape),
+                            where=d > c)
+
+    def coarser(self):
+        """The next level, or None.
+
+        The lessons' neumann edge p[0] = p[1] puts the wall half a fine
+        step outside the first unknown; on a coarse grid the same copy would
+        move it.  Coarse rows (columns) next to such an edge keep the fine
+        wall by standing for a wider strip: their x (y) second difference
+        is weighted by the strip's width over the grid step, which is what
+        restricting the fine widths gives (1.25, 1.375, ... towards 1.5).
+        """
+        if not (self.cy or self.cx):
+            return None
+        ny, nx = self.shape
+        kinds = self.kinds
+        wy, wx = self.weights or (numpy.ones((ny, 1)), numpy.ones((1, nx)))
+        if self.cy:
+            ny = (ny + 1) // 2
+            wy = _restrict_axis(wy, 0, True, False, _neumann(kinds, 0))
+        if self.cx:
+            nx = (nx - 2) // 2 + 2 if self.periodic else (nx + 1) // 2
+            wx = _restrict_axis(wx, 1, True, self.periodic,
+                                _neumann(kinds, 1))
+        weights = None
+        if (wy[1:-1] != 1).any() or (wx[:, 1:-1] != 1).any():
+            weights = wy, wx
+        return _Level((ny, nx), self.dx * (2 if self.cx else 1),
+                      self.dy * (2 if self.cy else 1), kinds,
+                      self.periodic, weights)
+
+
+def _fill(p, lv, values=None):
+    """Apply the edge conditions of level lv to p.
+
+    Dirichlet edges are only written when `values` is given (the finest
+    level); on coarse levels they hold the zero of the error equation.
+    """
+    kinds = lv.kinds
+    cols = slice(1, -1) if lv.periodic else slice(None)
+    if not lv.periodic:
+        for edge, col, inner in (('left', 0, 1), ('right', -1, -2)):
+            if kinds[edge] == 'neumann':
+                p[:, col] = p[:, inner]
+            elif values is not None and values[edge] is not None:
+                p[:, col] = values[edge]
+    for edge, row, inner in (('bottom', 0, 1), ('top', -1, -2)):
+        if kinds[edge] == 'neumann':
+            p[row, :] = p[inner, :]
+        elif values is not None and values[edge] is not None:
+            p[row, cols] = values[edge]
+    if lv.periodic:
+        p[:, 0] = p[:, -2]
+        p[:, -1] = p[:, 1]
+
+
+###Kernels
+
+def _residual(p, b, lv, r):
+    """r = b - laplacian(p) on the unknowns; the rest of r is left at 0."""
+    idx2, idy2 = 1 / lv.dx**2, 1 / lv.dy**2
+    c = p[1:-1, 1:-1]
+    out = r[1:-1, 1:-1]
+    if lv.weights is None:
+        numpy.subtract(b[1:-1, 1:-1],
+                       (p[1:-1, 2:] - 2 * c + p[1:-1, :-2]) * idx2 +
+                       (p[2:, 1:-1] - 2 * c + p[:-2, 1:-1]) * idy2, out=out)
+    else:
+        wy, wx = lv.weights
+        numpy.subtract(b[1:-1, 1:-1],
+                       (p[1:-1, 2:] - 2 * c + p[1:-1, :-2]) * idx2
+                       * wy[1:-1] +
+                       (p[2:, 1:-1] - 2 * c + p[:-2, 1:-1]) * idy2
+                       * wx[:, 1:-1], out=out)
+    return math.sqrt(numpy.mean(out**2))
+
+
+def _jacobi(p, b, lv, pn):
+    """One Jacobi sweep, built in place in the interior of pn."""
+    dx2, dy2 = lv.dx**2, lv.dy**2
+    d = 2 * (dx2 + dy2)
+    out = pn[1:-1, 1:-1]
+    numpy.add(p[1:-1, 2:], p[1:-1, :-2], out=out)
+    out *= dy2 / dx2
+    out += p[2:, 1:-1]
+    out += p[:-2, 1:-1]
+    out -= b[1:-1, 1:-1] * dy2
+    out *= dx2 / d
+    p[1:-1, 1:-1] = out
+    _fill(p, lv)
+
+
+def _red_black(p, b, lv, omega, sweeps):
+    """Red-black Gauss-Seidel (omega = 1) or SOR sweeps.
+
+    Points next to a neumann edge are scaled by lv.relax, so that they too
+    solve their own equation rather than lag behind their copied edge.
+    """
+    dx2, dy2 = lv.dx**2, lv.dy**2
+    d = 2 * (dx2 + dy2)
+    ny, nx = p.shape
+    for s in range(sweeps):
+        for color in (0, 1):
+            for j0, i0 in ((1, 1 + color), (2, 2 - color)):
+                J, I = slice(j0, ny - 1, 2), slice(i0, nx - 1, 2)
+                Jm, Jp = slice(j0 - 1, ny - 2, 2), slice(j0 + 1, ny, 2)
+                Im, Ip = slice(i0 - 1, nx - 2, 2), slice(i0 + 1, nx, 2)
+                if lv.weights is None:
+                    gs = (((p[J, Ip] + p[J, Im]) * dy2 +
+                           (p[Jp, I] + p[Jm, I]) * dx2
+                           - b[J, I] * dx2 * dy2) / d)
+                else:
+                    ax = lv.weights[0][J] / dx2
+                    ay = lv.weights[1][:, I] / dy2
+                    gs = (((p[J, Ip] + p[J, Im]) * ax +
+                           (p[Jp, I] + p[Jm, I]) * ay - b[J, I])
+                          / (2 * (ax + ay)))
+                if lv.relax is not None:
+                    p[J, I] += omega * lv.relax[J, I] * (gs - p[J, I])
+                elif omega == 1:
+                    p[J, I] = gs
+                else:
+                    p[J, I] += omega * (gs - p[J, I])
+            _fill(p, lv)
+
+
+###Transfer operators, applied one axis at a time
+
+def _restrict_axis(a, axis, coarsen, periodic, neumann=(False, False)):
+    """Full weighting along one axis.
+
+    On a neumann edge the first fine unknown is prolonged from the coarse
+    edge, which is a copy of the first coarse unknown, so its residual all
+    goes there (`neumann` says which ends are such edges); this is the
+    transpose of prolongation, as on the rest of the grid.
+    """
+    if not coarsen:
+        return a
+    a = numpy.moveaxis(a, axis, 0)
+    n = a.shape[0]
+    s = 1 if periodic else 0
+    c = slice(2 - s, n - 2, 2)
+    m = slice(1 - s, n - 3, 2)
+    p = slice(3 - s, n - 1, 2)
+    out = numpy.zeros((n // 2 + 1 if periodic else (n + 1) // 2,)
+                      + a.shape[1:])
+    out[1:-1] = 0.25 * a[m] + 0.5 * a[c] + 0.25 * a[p]
+    if neumann[0]:
+        out[1] += 0.25 * a[1]
+    if neumann[1]:
+        out[-2] += 0.25 * a[-2]
+    return numpy.moveaxis(out, 0, axis)
+
+
+def _prolong_axis(a, axis, coarsen, periodic):
+    if not coarsen:
+        return a
+    a = numpy.moveaxis(a, axis, 0)
+    nc = a.shape[0]
+    if periodic:
+        out = numpy.zeros((2 * nc - 2,) + a.shape[1:])
+        out[1:-1:2] = a[1:-1]
+        out[2:-1:2] = 0.5 * (a[1:-1] + a[2:])
+    else:
+        out = numpy.zeros((2 * nc - 1,) + a.shape[1:])
+        out[0::2] = a
+        out[1::2] = 0.5 * (a[:-1] + a[1:])
+    return numpy.moveaxis(out, 0, axis)
+
+
+@functools.lru_cache(maxsize=16)
+def _coarse_factor(shape, dx, dy, kinds, periodic, wy, wx):
+    """Sparse LU of the level's operator with homogeneous edges, or None
+    without scipy.  kinds are those of EDGES and wy, wx the level's weights
+    on the unknowns; a singular operator has its first row set to p = 0."""
+    try:
+        from scipy import sparse
+        from scipy.sparse.linalg import splu
+    except ImportError:
+        return None
+    left, right, bottom, top = kinds
+
+    def second_difference(m, low, high, h):
+        d = sparse.diags([1., -2., 1.], [-1, 0, 1], shape=(m, m),
+                         format='lil')
+        d[0, 0] += low == 'neumann'
+        d[-1, -1] += high == 'neumann'
+        if low == 'periodic':
+            d[0, -1] = d[-1, 0] = 1
+        return d / h**2
+
+    my, mx = shape[0] - 2, shape[1] - 2
+    A = (sparse.kron(sparse.diags(wy), second_difference(mx, left, right,
+                                                         dx)) +
+         sparse.kron(second_difference(my, bottom, top, dy),
+                     sparse.diags(wx))).tolil()
+    if 'dirichlet' not in kinds:
+        A[0, :] = 0
+        A[0, 0] = 1
+    return splu(sparse.csc_matrix(A))
+
+
+def _coarse_solve(p, b, lv):
+    """Solve the coarsest level exactly (a correction to p), in place."""
+    wy, wx = lv.weights or (numpy.ones(lv.shape[0]), numpy.ones(lv.shape[1]))
+    lu = _coarse_factor(lv.shape, lv.dx, lv.dy,
+                        tuple(lv.kinds[edge] for edge in EDGES), lv.periodic,
+                        tuple(numpy.ravel(wy)[1:-1]),
+                        tuple(numpy.ravel(wx)[1:-1]))
+    if lu is None:
+        _red_black(p, b, lv, 1, COARSE_SWEEPS)
+        return
+    _residual(p, b, lv, lv.r)
+    r = lv.r[1:-1, 1:-1].ravel()
+    singular = _singular(lv.kinds)
+    if singular:
+        r = r - r.mean()
+        r[0] = 0
+    e = lu.solve(r).reshape(r.size // (lv.shape[1] - 2), -1)
+    if singular:
+        e -= e.mean()
+    p[1:-1, 1:-1] += e
+    _fill(p, lv)
+
+
+def _vcycle(levels, k, p, b, omega, nu1, nu2):
+    lv = levels[k]
+    if k == len(levels) - 1:
+        _coarse_solve(p, b, lv)
+        return
+    _red_black(p, b, lv, omega, nu1)
+    _residual(p, b, lv, lv.r)
+    if lv.periodic:
+        _fill(lv.r, lv)   #ghost columns of the residual for the x weights
+
+    coarse = levels[k + 1]
+    rc = _restrict_axis(lv.r, 0, lv.cy, False, _neumann(lv.kinds, 0))
+    coarse.b[...] = _restrict_axis(rc, 1, lv.cx, lv.periodic,
+                                   _neumann(lv.kinds, 1))
+    if _singular(lv.kinds):   #keep it in the range against round-off
+        coarse.b[1:-1, 1:-1] -= coarse.b[1:-1, 1:-1].mean()
+    coarse.p[...] = 0
+    _vcycle(levels, k + 1, coarse.p, coarse.b, omega, nu1, nu2)
+    _fill(coarse.p, coarse)
+
+    e = _prolong_axis(coarse.p, 1, lv.cx, lv.periodic)
+    e = _prolong_axis(e, 0, lv.cy, False)
+    p[1:-1, 1:-1] += e[1:-1, 1:-1]
+    _fill(p, lv)
+    _red_black(p, b, lv, omega, nu2)
+
+
+###Direct solver for periodic x
+
+@functools.lru_cache(maxsize=16)
+def _fft_factor(ny, nx, dx, dy, bottom, top):
+    """Thomas-algorithm factors for every x wavenumber, cached per grid.
+
+    Returns (cprime, inv_m, singular) for the tridiagonal systems
+    p[j-1] + (lam_k dy^2 - 2) p[j] + p[j+1] = dy^2 rhs[j] in the rows
+    j = 1 .. ny-2, with p[0] = p[1] / p[-1] = p[-2] on neumann edges.  The
+    arrays are read-only, as every solve on the grid shares them.
+    """
+    k = numpy.arange(nx // 2 + 1)
+    lam = (2 * numpy.cos(2 * numpy.pi * k / nx) - 2) * dy**2 / dx**2
+    m = ny - 2
+    diag = numpy.empty((m, k.size))
+    diag[...] = lam - 2
+    if bottom == 'neumann':
+        diag[0] += 1
+    if top == 'neumann':
+        diag[-1] += 1
+    # k = 0 with two neumann edges only fixes p up to a constant
+    singular = bottom == top == 'neumann'
+    cprime = numpy.zeros((m, k.size))
+    inv_m = numpy.empty((m, k.size))
+    inv_m[0] = 1 / diag[0]
+    for j in range(1, m):
+        cprime[j - 1] = inv_m[j - 1]
+        denom = diag[j] - cprime[j - 1]
+        if singular and j == m - 1:
+            denom[0] = numpy.inf   #pins the last row of the k = 0 mode
+        inv_m[j] = 1 / denom
+    cprime.flags.writeable = inv_m.flags.writeable = False
+    return cprime, inv_m, singular
+
+
+def _fft_solve(p, b, lv):
+    """Solve exactly on the padded periodic level, in place."""
+    ny, nx = p.shape[0], p.shape[1] - 2
+    dy2 = lv.dy**2
+    cprime, inv_m, singular = _fft_factor(ny, nx, lv.dx, lv.dy,
+                                          lv.kinds['bottom'], lv.kinds['top'])
+    interior = p[1:-1, 1:-1]
+    mean = interior.mean()
+    rhs = b[1:-1, 1:-1] * dy2
+    if lv.kinds['bottom'] == 'dirichlet':
+        rhs[0] -= p[0, 1:-1]
+    if lv.kinds['top'] == 'dirichlet':
+        rhs[-1] -= p[-1, 1:-1]
+
+    d = numpy.fft.rfft(rhs, axis=1)
+    d[0] *= inv_m[0]
+    for j in range(1, len(d)):
+        d[j] -= d[j - 1]
+        d[j] *= inv_m[j]
+    for j in range(len(d) - 2, -1, -1):
+        d[j] -= cprime[j] * d[j + 1]
+    interior[...] = numpy.fft.irfft(d, n=nx, axis=1)
+    if singular:
+        interior += mean - interior.mean()   #keep the constant of the guess
+    _fill(p, lv)
+
+
+def optimal_omega(shape):
+    """Classical SOR factor for the model problem on a grid of this shape."""
+    return 2 / (1 + math.sin(math.pi / (max(shape) - 1)))
+
+
+class Poisson:
+    """The grids and work arrays of one problem, kept for repeated solves.
+
+        poisson = Poisson(p.shape, dx, dy, CAVITY_BC)
+        result = poisson.solve(p, b, rtol=1e-6)
+
+    The arrays belong to the instance, so solves running at the same time
+    need one each; solve() below builds a new one for every call.
+    """
+
+    def __init__(self, shape, dx, dy, bc):
+        self.kinds, self.values, self.periodic = _parse_bc(bc)
+        ny, nx = self.shape = tuple(shape)
+        padded = (ny, nx + 2) if self.periodic else (ny, nx)
+        # the coarse levels are only built for multigrid
+        self.levels = [_Level(padded, dx, dy, self.kinds, self.periodic)]
+        self._coarsened = False
+
+    def _hierarchy(self):
+        if not self._coarsened:
+            while True:
+                coarse = self.levels[-1].coarser()
+                if coarse is None:
+                    break
+                self.levels.append(coarse)
+            self._coarsened = True
+        return self.levels
+
+    def solve(self, p, b, method='multigrid', rtol=1e-8, atol=0.0,
+              maxiter=None, omega=None, nu1=2, nu2=2, check_every=1):
+        """Like solve() below, for a p of this instance's shape."""
+        if method not in METHODS:
+            raise ValueError('unknown method %r, expected one of %s'
+                             % (method, METHODS))
+        kinds, values, periodic = self.kinds, self.values, self.periodic
+        if method == 'fft' and not periodic:
+            raise ValueError("the 'fft' method needs periodic left/right "
+                             "edges")
+        if p.shape != self.shape:
+            raise ValueError('p has shape %s, expected %s'
+                             % (p.shape, self.shape))
+        levels = self._hierarchy() if method == 'multigrid' else self.levels
+        lv = levels[0]
+        if maxiter is None:
+            maxiter = 100 if method == 'multigrid' else 100000
+        if method == 'gauss-seidel':
+            omega = 1
+        elif omega is None:
+            omega = optimal_omega(lv.shape) if method == 'sor' else 1
+
+        # work on the padded arrays of the finest level
+        cols = slice(1, -1) if periodic else slice(None)
+        lv.p[:, cols] = p
+        lv.b[...] = 0
+        if b is not None:
+            lv.b[:, cols] = b
+        _fill(lv.p, lv, values)
+        if periodic:
+            _fill(lv.b, lv)
+        if method == 'multigrid' and _singular(kinds):
+            lv.b[1:-1, 1:-1] -= lv.b[1:-1, 1:-1].mean()
+
+        # with no tolerance (the lessons' fixed sweep count) the residual,
+        # which costs more than a Jacobi sweep, is only needed at the end
+        check = bool(rtol or atol) or method == 'fft'
+        if method in ('multigrid', 'fft'):
+            check_every = 1
+        residuals = [_residual(lv.p, lv.b, lv, lv.r)]
+        target = max(atol, rtol * residuals[0])
+        iterations = 0
+        while iterations < maxiter and (residuals[-1] > target or not check):
+            if method == 'multigrid':
+                _vcycle(levels, 0, lv.p, lv.b, omega, nu1, nu2)
+            elif method == 'fft':
+                _fft_solve(lv.p, lv.b, lv)
+                maxiter = 1
+            elif method == 'jacobi':
+                _jacobi(lv.p, lv.b, lv, lv.r)
+            else:
+                _red_black(lv.p, lv.b, lv, omega, 1)
+            iterations += 1
+            if (check and iterations % check_every == 0
+                    or iterations == maxiter):
+                residuals.append(_residual(lv.p, lv.b, lv, lv.r))
+
+        p[...] = lv.p[:, cols]
+        rec = instrument.active
+        if rec:
+            rec.count('poisson.solves')
+            rec.count('poisson.iterations', iterations)
+            rec.value('poisson.residual', residuals[-1])
+        return PoissonResult(p, iterations, residuals)
+
+
+def solve(p, b, dx, dy, bc, method='multigrid', rtol=1e-8, atol=0.0,
+          maxiter=None, omega=None, nu1=2, nu2=2, check_every=1):
+    """Solve the Poisson equation for p in place and return a PoissonResult.
+
+    `p` holds the initial guess (and Dirichlet values given as None); `b` may
+    be None for Laplace's equation.  Iteration stops when the RMS residual is
+    below max(atol, rtol * first residual) or after maxiter iterations (sweeps
+    for jacobi/gauss-seidel/sor, V-cycles for multigrid; the direct 'fft'
+    method always does one).  `residuals` holds the RMS residual before the
+    first iteration and after every `check_every`-th one (a residual costs
+    more than a Jacobi sweep, so relaxation may check only every few sweeps)
+    and the last; with rtol = atol = 0 exactly maxiter iterations are done
+    and only the first and last residuals are computed.
+    The work arrays are float64 whatever the dtype of p: a float32 iterate
+    stalls near a relative residual of 1e-5, above usual tolerances.
+    With no dirichlet edge multigrid drops the mean of b (over the
+    unknowns), which no p can match, before the first residual.
+    """
+    return Poisson(p.shape, dx, dy, bc).solve(
+        p, b, method, rtol, atol, maxiter, omega, nu1, nu2, check_every)
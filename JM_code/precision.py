@@ -0,0 +1,101 @@
+"""
+Accuracy of reduced-precision runs against float64.
+
+The 2D stencils are bound by memory bandwidth, so float32 fields move half
+the bytes per step.  compare() runs a case of cases.py in float64 and in the
+reduced dtype from the same initial condition and reports, per field, the
+largest absolute difference and the relative L2 difference (both summed in
+float64), along with the run times.
+
+    python precision.py                      #every case, float32
+    python precision.py step8 step9 --nx 513
+"""
+
+import argparse
+import time
+
+import numpy
+
+from benchmark import BACKENDS
+from cases import CASES
+
+
+FIELD_NAMES = ('u', 'v', 'p')
+
+
+def _run(case, nx, nt, dtype, options):
+    solver = case.build(nx, dtype=dtype, **options)
+    start = time.perf_counter()
+    solver.step(nt)
+    elapsed = time.perf_counter() - start
+    if hasattr(solver, 'close'):
+        solver.close()
+    return solver.fields, elapsed
+
+
+def compare(name, nx=None, nt=None, dtype='float32', **options):
+    """Run case `name` in float64 and in dtype; return a dict of results.
+
+    `errors` maps every field name to (max abs difference, relative L2
+    difference).
+    """
+    case = CASES[name]
+    nx = nx or case.nx
+    nt = nt or case.nt
+    reference, t64 = _run(case, nx, nt, 'float64', options)
+    reduced, t = _run(case, nx, nt, dtype, options)
+    errors = {}
+    for field, ref, f in zip(FIELD_NAMES, reference, reduced):
+        diff = f.astype(float) - ref
+        norm = numpy.sqrt(numpy.sum(numpy.square(ref), dtype=float))
+        errors[field] = (float(numpy.max(numpy.abs(diff))),
+                         float(numpy.sqrt(numpy.sum(numpy.square(diff))))
+                         / (norm or 1.0))
+    return dict(case=name, nx=nx, nt=nt, dtype=numpy.dtype(dtype).name,
+                errors=errors, time=t, time_float64=t64,
+                bytes=sum(f.nbytes for f in reduced),
+                bytes_float64=sum(f.nbytes for f in reference))
+
+
+def report(names=None, nx=None, nt=None, dtype='float32', **options):
+    """Print a table of compare() for the given (default all) cases."""
+    print('%-7s %6s %6s  %-5s %10s %10s  %8s' % ('case', 'nx', 'nt', 'field',
+                                                 'max abs', 'rel L2',
+                                                 'speedup'))
+    results = []
+    for name in names or CASES:
+        # a backend only goes to the cases that have it (see benchmark.py)
+        kept = {key: value for key, value in options.items()
+                if key != 'backend'
+                or value in BACKENDS[CASES[name].kind]}
+        result = compare(name, nx, nt, dtype, **kept)
+        results.append(result)
+        speedup = result['time_float64'] / result['time']
+        for k, (field, (linf, l2)) in enumerate(result['errors'].items()):
+            head = (name, result['nx'], result['nt']) if k == 0 else ('',) * 3
+            tail = '  %7.2fx' % speedup if k == 0 else ''
+            print('%-7s %6s %6s  %-5s %10.2e %10.2e'
+                  % (head + (field, linf, l2)) + tail)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('cases', nargs='*', metavar='case',
+                        help='cases to compare, from %s (default: all)'
+                        % ', '.join(CASES))
+    parser.add_argument('--nx', type=int, help='grid points per axis')
+    parser.add_argument('--nt', type=int, help='time steps')
+    parser.add_argument('--dtype', default='float32')
+    parser.add_argument('--backend', help='numpy or numba (the cases '
+                        'without it run on numpy)')
+    args = parser.parse_args(argv)
+    unknown = set(args.cases) - set(CASES)
+    if unknown:
+        parser.error('unknown cases: %s' % ', '.join(sorted(unknown)))
+    options = dict(backend=args.backend) if args.backend else {}
+    report(args.cases, args.nx, args.nt, args.dtype, **options)
+
+
+if __name__ == '__main__':
+    main()
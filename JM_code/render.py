@@ -0,0 +1,119 @@
+"""
+Plotting for the solvers, kept out of the solver modules.
+
+matplotlib is only imported when something is actually drawn, large fields
+are strided down to at most `max_points` per axis before `plot_surface`
+(which is slow and gains nothing beyond screen resolution), and snapshot
+histories written by snapshots.record can be rendered to PNG files on a
+process pool while the solver keeps running elsewhere.
+
+    import render
+    render.surface(x, y, u)                      #interactive, like pyplot
+    render.surface(x, y, u, path='u.png')        #headless, no pyplot
+    render.render_snapshots('run1', x, y, 'frames/u_%04d.png')
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import instrument
+
+
+def downsample(x, y, field, max_points=100):
+    """Stride x, y and field so that neither axis has more than max_points.
+
+    The last row and column are always kept so the plotted domain does not
+    shrink.
+    """
+    ny, nx = field.shape
+    sy = max(1, math.ceil((ny - 1) / (max_points - 1)))
+    sx = max(1, math.ceil((nx - 1) / (max_points - 1)))
+    rows = list(range(0, ny - 1, sy)) + [ny - 1]
+    cols = list(range(0, nx - 1, sx)) + [nx - 1]
+    return x[cols], y[rows], field[rows][:, cols]
+
+
+def _draw(fig, x, y, field, max_points, zlim, title):
+    import numpy
+    from matplotlib import cm
+
+    x, y, field = downsample(x, y, field, max_points)
+    X, Y = numpy.meshgrid(x, y)
+    ax = fig.add_subplot(projection='3d')
+    ax.plot_surface(X, Y, field, cmap=cm.viridis, rstride=1, cstride=1,
+                    linewidth=0, antialiased=False)
+    if zlim is not None:
+        ax.set_zlim(*zlim)
+    if title:
+        ax.set_title(title)
+    ax.set_xlabel('$x$')
+    ax.set_ylabel('$y$')
+    return ax
+
+
+def surface(x, y, field, path=None, max_points=100, zlim=None, title=None,
+            figsize=(11, 7), dpi=100):
+    """3D surface plot of a 2D field.
+
+    Without `path` the figure is made with pyplot and returned, as the lessons
+    do.  With `path` it is drawn on a bare Agg canvas and saved, which needs
+    no display and never imports pyplot.
+    """
+    rec = instrument.active
+    if rec:
+        t = rec.clock()
+    if path is None:
+        from matplotlib import pyplot
+        fig = pyplot.figure(figsize=figsize, dpi=dpi)
+        _draw(fig, x, y, field, max_points, zlim, title)
+    else:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        _draw(fig, x, y, field, max_points, zlim, title)
+        fig.savefig(path)
+    if rec:
+        rec.lap('render', t)
+    return fig if path is None else path
+
+
+def curve(x, u, path, title=None, figsize=(11, 7), dpi=100):
+    """Line plot of a 1D field saved to path, headless like surface()."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(x, u)
+    if title:
+        ax.set_title(title)
+    ax.set_xlabel('$x$')
+    fig.savefig(path)
+    return path
+
+
+def _render_frame(args):
+    run, name, i, x, y, pattern, options = args
+    import snapshots
+    data = snapshots.load(run, (name,))
+    step = int(data['steps'][i])
+    return surface(x, y, data[name][i], path=pattern % i,
+                   title='%s, step %d' % (name, step), **options)
+
+
+def render_snapshots(run, x, y, pattern, name='u', frames=None,
+                     processes=None, **options):
+    """Render snapshots of `name` from a snapshots.record run to PNG files.
+
+    `pattern` is formatted with the snapshot index.  Each worker process
+    memory-maps the snapshot file itself, so no field data is pickled.
+    Returns the list of written paths.
+    """
+    import snapshots
+    count = len(snapshots.load(run, ())['steps'])
+    frames = range(count) if frames is None else frames
+    jobs = [(run, name, i, x, y, pattern, options) for i in frames]
+    with ProcessPoolExecutor(processes or os.cpu_count()) as pool:
+        return list(pool.map(_render_frame, jobs))
@@ -0,0 +1,124 @@
+"""
+Streaming snapshot output for long runs.
+
+Every k-th step of the solver fields is written into preallocated .npy files
+opened as memory maps (`<path>_u.npy`, `<path>_v.npy`, ... plus
+`<path>_steps.npy`), one row per snapshot.  The solver thread only copies the
+fields into one of a few staging buffers; a background thread moves them into
+the memory maps, so disk I/O overlaps with the next steps and the history
+never has to fit in RAM.
+
+    solver = Solver2D((u, v), dt, dx, dy, 'convection')
+    record(solver, nt=10000, every=10, path='run1')
+    u_history = load('run1')['u']    #memory mapped, shape (1001, ny, nx)
+"""
+
+import os
+import queue
+import threading
+
+import numpy
+from numpy.lib.format import open_memmap
+
+
+FIELD_NAMES = ('u', 'v', 'p')
+
+
+class SnapshotWriter:
+    """Background writer of up to `count` snapshots of fields `names`."""
+
+    def __init__(self, path, names, shape, count, dtype=float, buffers=2):
+        self.path = path
+        self.names = tuple(names)
+        self.count = count
+        self.written = 0
+        self.files = {name: open_memmap('%s_%s.npy' % (path, name), mode='w+',
+                                        dtype=dtype, shape=(count,) + shape)
+                      for name in self.names}
+        self.steps = open_memmap('%s_steps.npy' % path, mode='w+',
+                                 dtype=numpy.int64, shape=(count,))
+
+        # staging buffers cycle between the solver thread (_free) and the
+        # writer thread (_full); when all are in flight write() waits
+        self._free = queue.Queue()
+        for b in range(buffers):
+            self._free.put(tuple(numpy.empty(shape, dtype)
+                                 for name in self.names))
+        self._full = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._full.get()
+            if item is None:
+                return
+            i, step, staging = item
+            try:
+                for name, s in zip(self.names, staging):
+                    self.files[name][i] = s
+                self.steps[i] = step
+            except Exception as e:   #re-raised in the solver thread
+                self._error = e
+            self._free.put(staging)
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+
+    def write(self, step, fields):
+        """Queue a copy of fields (ordered like names) as snapshot `step`."""
+        self._check()
+        if self.written == self.count:
+            raise ValueError('all %d snapshots are already written'
+                             % self.count)
+        staging = self._free.get()
+        for s, f in zip(staging, fields):
+            numpy.copyto(s, f, casting='same_kind')
+        self._full.put((self.written, step, staging))
+        self.written += 1
+
+    def close(self):
+        """Wait for pending snapshots and flush the files."""
+        if self._thread.is_alive():
+            self._full.put(None)
+            self._thread.join()
+        for f in self.files.values():
+            f.flush()
+        self.steps.flush()
+        self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def record(solver, nt, every, path, names=None, dtype=None):
+    """Advance solver nt steps, saving the initial state and every k-th step.
+
+    `solver.fields` is saved under `names` (default u, v, p in order).
+    """
+    fields = solver.fields
+    names = names or FIELD_NAMES[:len(fields)]
+    count = nt // every + 1
+    with SnapshotWriter(path, names, fields[0].shape, count,
+                        dtype or fields[0].dtype) as writer:
+        writer.write(solver.n, fields)
+        for k in range(1, count):
+            solver.step(every)
+            writer.write(solver.n, solver.fields)
+        if nt % every:
+            solver.step(nt % every)
+    return writer
+
+
+def load(path, names=FIELD_NAMES):
+    """Memory-map the snapshot files of a run; missing fields are skipped."""
+    out = {'steps': numpy.load('%s_steps.npy' % path, mmap_mode='r')}
+    for name in names:
+        if os.path.exists('%s_%s.npy' % (path, name)):
+            out[name] = numpy.load('%s_%s.npy' % (path, name), mmap_mode='r')
+    return out
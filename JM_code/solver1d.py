@@ -0,0 +1,156 @@
+"""
+1D stencil solver engine shared by Steps 1 to 5.
+
+Linear convection, nonlinear convection, diffusion and viscous Burgers are
+advanced with vectorized slice kernels.  Two buffers are allocated once and
+swapped every time step instead of doing `un = u.copy()`.
+
+    from solver1d import Solver1D
+    u = Solver1D(u, dt, dx, 'linear', c=1).step(nt)
+
+Pass backend='numba' to run the compiled kernels of numba_kernels instead,
+and dtype='float32' to halve the memory traffic (see precision.py).
+"""
+
+import numpy
+
+import backends
+import instrument
+
+
+###Kernels
+# every kernel writes the new values into `out` from the neighbour views
+# um = u[i-1], u0 = u[i] and up = u[i+1] of the previous time level
+
+def linear_convection(out, um, u0, up, dt, dx, c, nu):
+    out[:] = u0 - c * dt / dx * (u0 - um)
+
+
+def nonlinear_convection(out, um, u0, up, dt, dx, c, nu):
+    out[:] = u0 - u0 * dt / dx * (u0 - um)
+
+
+def diffusion(out, um, u0, up, dt, dx, c, nu):
+    out[:] = u0 + nu * dt / dx**2 * (up - 2 * u0 + um)
+
+
+def burgers(out, um, u0, up, dt, dx, c, nu):
+    out[:] = (u0 - u0 * dt / dx * (u0 - um) +
+              nu * dt / dx**2 * (up - 2 * u0 + um))
+
+
+# name -> (kernel, one_sided).  One-sided (upwind) kernels never read u[i+1],
+# so they also update the last grid point like the original Step 1 loop did.
+KERNELS = {
+    'linear': (linear_convection, True),
+    'nonlinear': (nonlinear_convection, True),
+    'diffusion': (diffusion, False),
+    'burgers': (burgers, False),
+}
+
+
+###Boundary conditions
+# a boundary condition is any callable bc(solver, un, u) run after the interior
+# update; un is the old time level and u the one being built
+
+def dirichlet(solver, un, u):
+    """Hold the end values fixed."""
+    u[..., 0] = un[..., 0]
+    if not solver.one_sided:
+        u[..., -1] = un[..., -1]
+
+
+def periodic(solver, un, u):
+    """Wrap around: u[-1] duplicates u[0], so the left neighbour of 0 is -2."""
+    solver.apply(u[..., :1], un[..., -2:-1], un[..., :1], un[..., 1:2])
+    u[..., -1] = u[..., 0]
+
+
+BOUNDARIES = {
+    'dirichlet': dirichlet,
+    'periodic': periodic,
+}
+
+
+class Solver1D:
+    """Time stepper for one of the 1D model equations.
+
+    `u` is copied into the solver; the current solution is always `self.u`
+    and `t` its time, the sum of the dt of every step taken.
+    Leading axes of `u` are independent runs advanced together (see
+    ensemble.py); dt, c and nu may then be arrays broadcasting against u.
+    The fields are stored in `dtype` and the kernels get dt, c and nu in the
+    same precision, so float32 runs are not promoted back to float64.
+    """
+
+    def __init__(self, u, dt, dx, equation='linear', c=1.0, nu=0.0,
+                 bc='dirichlet', backend='numpy', dtype=float):
+        if equation not in KERNELS:
+            raise ValueError('unknown equation %r, expected one of %s'
+                             % (equation, sorted(KERNELS)))
+        self.kernel, self.one_sided = KERNELS[equation]
+        self.backend = backends.resolve(backend)
+        if self.backend == 'numba':
+            import numba_kernels
+            self.kernel = numba_kernels.KERNELS_1D[equation]
+        self.equation = equation
+        self.bc_spec = bc   #as given, for checkpoints
+        self.bc = BOUNDARIES[bc] if isinstance(bc, str) else bc
+        self.dt = numpy.asarray(dt, dtype=float)[()]
+        self.dx = dx
+        self.c = numpy.asarray(c, dtype=float)[()]
+        self.nu = numpy.asarray(nu, dtype=float)[()]
+        self.n = 0
+        self.t = 0.0   #summed step by step: dt may change between steps
+
+        self.u = numpy.array(u, dtype=dtype)
+        self.dtype = self.u.dtype
+        self._un = numpy.empty_like(self.u)   #second buffer, swapped with u
+        if self.backend == 'numba' and self.u.ndim != 1:
+            raise ValueError('the numba backend advances a single run only')
+
+    @property
+    def fields(self):
+        return (self.u,)
+
+    def params(self):
+        """dt, c and nu in the precision of the fields."""
+        if self.dtype == numpy.float64:
+            return self.dt, self.c, self.nu
+        return tuple(numpy.asarray(x, self.dtype)[()]
+                     for x in (self.dt, self.c, self.nu))
+
+    def apply(self, out, um, u0, up):
+        dt, c, nu = self.params()
+        self.kernel(out, um, u0, up, dt, self.dx, c, nu)
+
+    def step(self, nt=1):
+        """Advance nt time steps and return the current solution."""
+        u, un = self.u, self._un
+        rec = instrument.active
+        for n in range(nt):
+            if rec:
+                t = rec.clock()
+            u, un = un, u   #the old solution becomes un, its buffer is reused
+            if self.one_sided:
+                self.apply(u[..., 1:], un[..., :-1], un[..., 1:], None)
+            else:
+                self.apply(u[..., 1:-1], un[..., :-2], un[..., 1:-1],
+                           un[..., 2:])
+            if rec:
+                t = rec.lap('stencil', t)
+            self.bc(self, un, u)
+            if rec:
+                rec.lap('boundary', t)
+        if rec:
+            rec.count('steps', nt)
+        self.u, self._un = u, un
+        self.n += nt
+        self.t = self.t + nt * self.dt
+        return u
+
+
+def solve(u, nt, dt, dx, equation='linear', c=1.0, nu=0.0, bc='dirichlet',
+          backend='numpy', dtype=float):
+    """One-shot helper: advance a copy of u by nt steps and return it."""
+    return Solver1D(u, dt, dx, equation, c, nu, bc, backend, dtype).step(nt)
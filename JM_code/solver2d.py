@@ -0,0 +1,422 @@
+"""
+Allocation-free 2D time stepping for Steps 7 to 10.
+
+Each field lives in two preallocated buffers that swap roles every step
+(ping-pong), and the stencils are evaluated with in-place ufuncs (`out=`,
+`-=`, `*=`) through a single scratch array.  Once the solver is built,
+stepping does no heap allocation at all.
+
+    from solver2d import Solver2D
+    solver = Solver2D(u, dt, dx, dy, 'linear', c=1)
+    solver.step(nt)
+    u = solver.u
+
+backend='numba' swaps in the fused single-pass loops of numba_kernels,
+threads=N splits the rows into N blocks advanced on a thread pool and
+dtype='float32' halves the bytes every stencil streams through memory.
+
+Each in-place ufunc of a numpy kernel streams its operands through memory
+once, about ten passes per field and step.  tile=R runs the kernel on
+blocks of R rows instead, so the passes of one block hit cache, and
+time_block=T (temporal blocking) advances T steps per block before moving
+on: the block is copied with T halo rows on each side into a private buffer
+pair and stepped there, the halo shrinking by one row per step, so the grid
+itself is read and written once per T steps.  tuning.autotune() picks both
+for the machine.
+
+active=True skips the quiescent part of the grid, such as the background
+of ones around the lessons' hat: only the bounding box of the cells that
+differ from the boundary value is updated, grown every step by how far the
+stencil reaches (east and north for the upwind kernels, all four ways for
+the centred ones).  A cell whose whole stencil holds the background value
+keeps it exactly, so the result is identical to the full update.
+"""
+
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+
+import backends
+import instrument
+
+
+###Kernels
+# kernel(new, old, w, dt, dx, dy, c, nu): `old` holds the fields at time
+# level n, the interior of `new` receives level n+1 and `w` is a scratch
+# array with the shape of the updated region.  The last two axes are (y, x);
+# any leading axes are independent runs of an ensemble.
+
+def linear_convection(new, old, w, dt, dx, dy, c, nu):
+    u, = new
+    un, = old
+    u0, out = un[..., 1:, 1:], u[..., 1:, 1:]
+    numpy.subtract(u0, un[..., 1:, :-1], out=w)
+    w *= c * dt / dx
+    numpy.subtract(u0, w, out=out)
+    numpy.subtract(u0, un[..., :-1, 1:], out=w)
+    w *= c * dt / dy
+    out -= w
+
+
+def _advect(out, f0, fw, fs, u0, v0, w, cx, cy):
+    # out = f - cx * u * (f - f_west) - cy * v * (f - f_south)
+    numpy.subtract(f0, fw, out=w)
+    w *= u0
+    w *= cx
+    numpy.subtract(f0, w, out=out)
+    numpy.subtract(f0, fs, out=w)
+    w *= v0
+    w *= cy
+    out -= w
+
+
+def _laplacian(out, f0, fe, fw, fn, fs, w, ax, ay):
+    # out += ax * (f_east - 2f + f_west) + ay * (f_north - 2f + f_south)
+    numpy.multiply(f0, 2, out=w)
+    numpy.subtract(fe, w, out=w)
+    w += fw
+    w *= ax
+    out += w
+    numpy.multiply(f0, 2, out=w)
+    numpy.subtract(fn, w, out=w)
+    w += fs
+    w *= ay
+    out += w
+
+
+def convection(new, old, w, dt, dx, dy, c, nu):
+    u, v = new
+    un, vn = old
+    u0, v0 = un[..., 1:, 1:], vn[..., 1:, 1:]
+    cx, cy = c * dt / dx, c * dt / dy
+    _advect(u[..., 1:, 1:], u0, un[..., 1:, :-1], un[..., :-1, 1:],
+            u0, v0, w, cx, cy)
+    _advect(v[..., 1:, 1:], v0, vn[..., 1:, :-1], vn[..., :-1, 1:],
+            u0, v0, w, cx, cy)
+
+
+def diffusion(new, old, w, dt, dx, dy, c, nu):
+    u, = new
+    un, = old
+    out = u[..., 1:-1, 1:-1]
+    out[...] = un[..., 1:-1, 1:-1]
+    _laplacian(out, un[..., 1:-1, 1:-1],
+               un[..., 1:-1, 2:], un[..., 1:-1, :-2],
+               un[..., 2:, 1:-1], un[..., :-2, 1:-1], w,
+               nu * dt / dx**2, nu * dt / dy**2)
+
+
+def burgers(new, old, w, dt, dx, dy, c, nu):
+    u, v = new
+    un, vn = old
+    u0, v0 = un[..., 1:-1, 1:-1], vn[..., 1:-1, 1:-1]
+    cx, cy = dt / dx, dt / dy
+    ax, ay = nu * dt / dx**2, nu * dt / dy**2
+    for f, fn in ((u, un), (v, vn)):
+        out, f0 = f[..., 1:-1, 1:-1], fn[..., 1:-1, 1:-1]
+        _advect(out, f0, fn[..., 1:-1, :-2], fn[..., :-2, 1:-1],
+                u0, v0, w, cx, cy)
+        _laplacian(out, f0, fn[..., 1:-1, 2:], fn[..., 1:-1, :-2],
+                   fn[..., 2:, 1:-1], fn[..., :-2, 1:-1], w, ax, ay)
+
+
+# name -> (kernel, number of fields, halo).  halo 1 updates [1:, 1:] with an
+# upwind stencil, halo 2 updates the interior [1:-1, 1:-1].
+KERNELS = {
+    'linear': (linear_convection, 1, 1),
+    'convection': (convection, 2, 1),
+    'diffusion': (diffusion, 1, 2),
+    'burgers': (burgers, 2, 2),
+}
+
+
+###Boundary conditions
+
+def dirichlet(value=1.0):
+    """Boundary condition holding every edge of every field at `value`."""
+    def bc(solver, fields):
+        for f in fields:
+            f[..., 0, :] = value
+            f[..., -1, :] = value
+            f[..., :, 0] = value
+            f[..., :, -1] = value
+    return bc
+
+
+###Domain decomposition
+
+def row_blocks(ny, halo, nblocks):
+    """Split the updated rows into at most nblocks contiguous (j0, j1) ranges.
+
+    The kernels update rows 1 to ny-1 (halo 1) or 1 to ny-2 (halo 2); halo 0
+    splits all rows 0 to ny-1.
+    """
+    first, last = (1, ny - halo + 1) if halo else (0, ny)
+    nblocks = max(1, min(nblocks, last - first))
+    edges = numpy.linspace(first, last, nblocks + 1).astype(int)
+    return [(int(j0), int(j1)) for j0, j1 in zip(edges[:-1], edges[1:])]
+
+
+class Solver2D:
+    """Time stepper for one of the 2D model equations.
+
+    `fields` is u, or (u, v) for the coupled equations; the arrays are copied
+    into the solver.  `bc` is either a constant edge value or a callable
+    bc(solver, fields); edge points a callable leaves alone keep the value
+    they had two steps back, as the two buffers take turns.  With threads > 1 (None means one per CPU) each step
+    runs the kernel on row blocks in parallel; every block reads its own halo
+    rows from the old buffer, so the result is identical to the serial run.
+    `tile` and `time_block` set cache blocking (see tiling()); temporal
+    blocking needs a constant `bc`, as does `active` (update only the box of
+    cells differing from the bc value, kept in `box`; not with time_block).
+    Leading axes of the fields are independent runs (see ensemble.py) and dt,
+    c and nu may then be arrays broadcasting against them.  Fields, scratch
+    and the coefficients handed to the kernels are all in `dtype`.
+    """
+
+    def __init__(self, fields, dt, dx, dy, equation='linear', c=1.0, nu=0.0,
+                 bc=1.0, backend='numpy', threads=1, dtype=float, tile=None,
+                 time_block=1, active=False):
+        if equation not in KERNELS:
+            raise ValueError('unknown equation %r, expected one of %s'
+                             % (equation, sorted(KERNELS)))
+        self.kernel, nfields, self.halo = KERNELS[equation]
+        self.backend = backends.resolve(backend)
+        if self.backend == 'numba':
+            import numba_kernels
+            self.kernel = numba_kernels.KERNELS_2D[equation]
+        if isinstance(fields, numpy.ndarray):
+            fields = (fields,)
+        if len(fields) != nfields:
+            raise ValueError('%r needs %d field(s), got %d'
+                             % (equation, nfields, len(fields)))
+        self.equation = equation
+        self.bc_spec = bc   #as given, for checkpoints
+        self.bc = bc if callable(bc) else dirichlet(bc)
+        self.dt = numpy.asarray(dt, dtype=float)[()]
+        self.dx = dx
+        self.dy = dy
+        self.c = numpy.asarray(c, dtype=float)[()]
+        self.nu = numpy.asarray(nu, dtype=float)[()]
+        self.n = 0
+        self.t = 0.0   #summed step by step: dt may change between steps
+
+        self.fields = tuple(numpy.array(f, dtype=dtype) for f in fields)
+        self.dtype = self.fields[0].dtype
+        # the twins start as copies: points neither the kernel nor the bc
+        # writes keep their values (and the background outside an active box)
+        self._old = tuple(f.copy() for f in self.fields)
+        self.active = active
+        if active:
+            if callable(bc):
+                raise ValueError('active regions need a constant boundary '
+                                 'value, not a callable')
+            self.box = self._activity()
+        if self.backend == 'numba' and self.fields[0].ndim != 2:
+            raise ValueError('the numba backend advances a single run only')
+        *batch, ny, nx = self.fields[0].shape
+        h = self.halo
+        self._work = numpy.empty((*batch, ny - h, nx - h), self.dtype)
+
+        self.threads = threads or os.cpu_count()
+        self._pool = None
+        self.tiling(tile, time_block)
+
+    @property
+    def u(self):
+        return self.fields[0]
+
+    @property
+    def v(self):
+        return self.fields[1]
+
+    def params(self):
+        """dt, c and nu in the precision of the fields."""
+        if self.dtype == numpy.float64:
+            return self.dt, self.c, self.nu
+        return tuple(numpy.asarray(x, self.dtype)[()]
+                     for x in (self.dt, self.c, self.nu))
+
+    def tiling(self, tile=None, time_block=1):
+        """Advance `tile` rows at a time (None: the whole grid, or one block
+        per thread), `time_block` steps per pass over the grid."""
+        if time_block > 1 and callable(self.bc_spec):
+            raise ValueError('temporal blocking needs a constant boundary '
+                             'value, not a callable')
+        if time_block > 1 and self.active:
+            raise ValueError('temporal blocking and active regions do not '
+                             'combine')
+        self.tile, self.time_block = tile, time_block
+        *batch, ny, nx = self.fields[0].shape
+        h = 0 if time_block > 1 else self.halo
+        nblocks = self.threads
+        if tile:
+            nblocks = max(nblocks, -(-(ny - h) // tile))
+        self._blocks = row_blocks(ny, h, nblocks)
+        workers = min(self.threads, len(self._blocks))
+        if workers > 1 and self._pool is None:
+            self._pool = ThreadPoolExecutor(workers)
+
+        # one private buffer set per worker, cycled through a queue
+        self._locals = queue.Queue()
+        if time_block > 1:
+            rows = max(j1 - j0 for j0, j1 in self._blocks) + 2 * time_block
+            rows = min(rows, ny)
+            for k in range(max(workers, 1)):
+                pair = tuple(tuple(numpy.zeros((*batch, rows, nx), self.dtype)
+                                   for f in self.fields) for b in range(2))
+                work = numpy.empty((*batch, rows - self.halo,
+                                    nx - self.halo), self.dtype)
+                self._locals.put(pair + (work,))
+
+    def _activity(self):
+        """Bounding box (j0, j1, i0, i1) of the cells of any field that
+        differ from the background (the bc value), or None."""
+        *batch, ny, nx = self.fields[0].shape
+        differs = numpy.zeros((ny, nx), bool)
+        for f in self.fields:
+            differs |= (f != self.bc_spec).reshape(-1, ny, nx).any(axis=0)
+        rows = numpy.flatnonzero(differs.any(axis=1))
+        cols = numpy.flatnonzero(differs.any(axis=0))
+        if not rows.size:
+            return None
+        return (int(rows[0]), int(rows[-1]) + 1, int(cols[0]),
+                int(cols[-1]) + 1)
+
+    def _grow(self, box):
+        # the cells a step can change, within the updated region
+        j0, j1, i0, i1 = box
+        ny, nx = self.fields[0].shape[-2:]
+        back = self.halo - 1   #upwind stencils only carry values east, north
+        end = 1 - self.halo
+        return (max(1, j0 - back), min(ny + end, j1 + 1),
+                max(1, i0 - back), min(nx + end, i1 + 1))
+
+    def close(self):
+        """Shut down the thread pool, if any."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _advance_block(self, new, old, j0, j1, params):
+        # rows j0-1 .. j1+halo-2 of the old fields are enough to update rows
+        # j0 .. j1-1; work row r belongs to grid row r+1
+        lo, hi = j0 - 1, j1 + self.halo - 1
+        dt, c, nu = params
+        self.kernel(tuple(f[..., lo:hi, :] for f in new),
+                    tuple(f[..., lo:hi, :] for f in old),
+                    self._work[..., lo:j1 - 1, :], dt, self.dx, self.dy, c, nu)
+
+    def _advance_region(self, new, old, j0, j1, i0, i1, params):
+        # like _advance_block, for columns i0 .. i1-1 of rows j0 .. j1-1
+        lo, hi = j0 - 1, j1 + self.halo - 1
+        left, right = i0 - 1, i1 + self.halo - 1
+        dt, c, nu = params
+        self.kernel(tuple(f[..., lo:hi, left:right] for f in new),
+                    tuple(f[..., lo:hi, left:right] for f in old),
+                    self._work[..., j0 - 1:j1 - 1, :i1 - i0], dt, self.dx,
+                    self.dy, c, nu)
+
+    def _advance_tile(self, new, old, j0, j1, nt, params):
+        # rows j0 .. j1-1 advanced nt steps from rows lo .. hi-1 of old in a
+        # private buffer pair; rows beyond the domain edges need no halo
+        T = self.time_block
+        ny = old[0].shape[-2]
+        lo, hi = max(0, j0 - T), min(ny, j1 + T)
+        buffers = self._locals.get()
+        try:
+            m = hi - lo
+            a, b = (tuple(f[..., :m, :] for f in pair) for pair in buffers[:2])
+            w = buffers[2][..., :m - self.halo, :]
+            for f, g, src in zip(a, b, old):
+                f[...] = src[..., lo:hi, :]
+                g[...] = f
+            dt, c, nu = params
+            value = self.bc_spec
+            for n in range(nt):
+                self.kernel(b, a, w, dt, self.dx, self.dy, c, nu)
+                for f in b:
+                    f[..., :, 0] = value
+                    f[..., :, -1] = value
+                    if lo == 0:
+                        f[..., 0, :] = value
+                    if hi == ny:
+                        f[..., -1, :] = value
+                a, b = b, a
+            for dst, f in zip(new, a):
+                dst[..., j0:j1, :] = f[..., j0 - lo:j1 - lo, :]
+        finally:
+            self._locals.put(buffers)
+
+    def _run_blocks(self, task, *args):
+        if self._pool is None:
+            for j0, j1 in self._blocks:
+                task(*args[:2], j0, j1, *args[2:])
+            return
+        futures = [self._pool.submit(task, *args[:2], j0, j1, *args[2:])
+                   for j0, j1 in self._blocks]
+        for future in futures:
+            future.result()
+
+    def _advance(self, new, old):
+        params = self.params()
+        if self.active:
+            if self.box is None:
+                return
+            self.box = j0, j1, i0, i1 = self._grow(self.box)
+            if len(self._blocks) == 1:
+                self._advance_region(new, old, j0, j1, i0, i1, params)
+                return
+            # the row blocks that meet the box, cut down to it
+            blocks = [(max(a, j0), min(b, j1)) for a, b in self._blocks
+                      if a < j1 and b > j0]
+            task = self._advance_region
+            if self._pool is None:
+                for a, b in blocks:
+                    task(new, old, a, b, i0, i1, params)
+                return
+            futures = [self._pool.submit(task, new, old, a, b, i0, i1,
+                                         params) for a, b in blocks]
+            for future in futures:
+                future.result()
+            return
+        if len(self._blocks) == 1:
+            dt, c, nu = params
+            self.kernel(new, old, self._work, dt, self.dx, self.dy, c, nu)
+            return
+        self._run_blocks(self._advance_block, new, old, params)
+
+    def step(self, nt=1):
+        """Advance nt time steps and return the tuple of current fields."""
+        new, old = self.fields, self._old
+        rec = instrument.active
+        if self.time_block > 1:
+            params = self.params()
+            for n in range(0, nt, self.time_block):
+                if rec:
+                    t = rec.clock()
+                new, old = old, new
+                self._run_blocks(self._advance_tile, new, old,
+                                 min(self.time_block, nt - n), params)
+                if rec:
+                    rec.lap('tile-pass', t)
+        else:
+            for n in range(nt):
+                if rec:
+                    t = rec.clock()
+                # last step's result is read, its twin written
+                new, old = old, new
+                self._advance(new, old)
+                if rec:
+                    t = rec.lap('stencil', t)
+                self.bc(self, new)
+                if rec:
+                    rec.lap('boundary', t)
+        if rec:
+            rec.count('steps', nt)
+        self.fields, self._old = new, old
+        self.n += nt
+        self.t = self.t + nt * self.dt
+        return new
@@ -0,0 +1,222 @@
+"""
+Parameter studies of the cases of cases.py on a process pool.
+
+A study is a list of jobs, each a dict of a case name and the keywords of
+its builder (nx, sigma, nu, Re, solver options) plus an optional nt;
+grid() makes the cartesian product of lists of values, each case over the
+keys it takes.  run() hands the jobs to a pool of worker processes, largest
+first (cells times steps) so that the long runs do not start last and leave
+the other cores idle.
+
+Results stay out of the pipes between processes: each worker writes its
+final fields as .npy files in the study directory (memory-mapped, like
+snapshots.py, so any process can read them without a copy) and sends back
+only a small record, which the parent appends to index.jsonl.  Run again on
+the same directory, a study skips the jobs already in the index, so an
+interrupted sweep resumes where it stopped.  A job that fails (unstable
+parameters, say) is recorded with its error and does not stop the others;
+if a worker process dies, the jobs left are reported as not run and kept
+out of the index, so that running the study again does them.
+
+    jobs = grid(case=['step8'], nx=[101, 201, 401], sigma=[.1, .2, .4])
+    records = run(jobs, 'study1', processes=8)
+    u = load('study1')[0]['fields']['u']
+
+    python sweep.py study1 --case step9 --nx 101 201 --nu .01 .05 .1
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy
+from numpy.lib.format import open_memmap
+
+from cases import CASES
+from cfd import case_options
+
+
+FIELD_NAMES = ('u', 'v', 'p')
+INDEX = 'index.jsonl'
+
+
+def _axes(case, axes):
+    # the axes a case takes, and the names of those it has no parameter for
+    options = {key: None for key in axes if key not in ('case', 'nx', 'nt')}
+    dropped = case_options(case, options)[1]
+    return {k: v for k, v in axes.items() if k not in dropped}, dropped
+
+
+def _product(axes):
+    keys = list(axes)
+    return [dict(zip(keys, values))
+            for values in itertools.product(*(axes[k] for k in keys))]
+
+
+def grid(**axes):
+    """Jobs for every combination of the values listed for each key.
+
+    With a `case` axis every case only combines the axes its builder or
+    solver takes; the others are left out of its jobs instead of repeating
+    the same run once per value.
+    """
+    if 'case' not in axes:
+        return _product(axes)
+    cases = axes.pop('case')
+    return [dict(case=case, **job) for case in cases
+            for job in _product(_axes(case, axes)[0])]
+
+
+def job_id(job):
+    """Stable name of a job, used for its files and to resume."""
+    text = json.dumps(job, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def cost(job):
+    """Relative work of a job: grid points times time steps."""
+    case = CASES[job['case']]
+    nx = job.get('nx', case.nx)
+    points = nx if case.kind == '1d' else nx * nx
+    return points * job.get('nt', case.nt)
+
+
+def _run_job(job, directory):
+    options = dict(job)
+    name = options.pop('case')
+    case = CASES[name]
+    nx = options.pop('nx', case.nx)
+    nt = options.pop('nt', case.nt)
+    options = case_options(name, options)[0]
+    record = dict(id=job_id(job), job=job)
+    solver = None
+    try:
+        solver = case.build(nx, **options)
+        start = time.perf_counter()
+        solver.step(nt)
+        record['elapsed'] = time.perf_counter() - start
+        names = FIELD_NAMES[:len(solver.fields)]
+        for name, field in zip(names, solver.fields):
+            path = os.path.join(directory, '%s_%s.npy' % (record['id'], name))
+            tmp = '%s.%d.tmp.npy' % (path[:-4], os.getpid())
+            out = open_memmap(tmp, 'w+', field.dtype, field.shape)
+            out[...] = field
+            out.flush()
+            del out
+            os.replace(tmp, path)
+        record['fields'] = list(names)
+        record['finite'] = all(bool(numpy.isfinite(f).all())
+                               for f in solver.fields)
+    except Exception as error:
+        record['error'] = '%s: %s' % (type(error).__name__, error)
+    finally:
+        if hasattr(solver, 'close'):
+            solver.close()
+    return record
+
+
+def _done(directory):
+    records = {}
+    try:
+        with open(os.path.join(directory, INDEX)) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:   #a line cut short by an interruption
+                    continue
+                records[record['id']] = record
+    except OSError:
+        pass
+    return records
+
+
+def run(jobs, directory, processes=None, resume=True, retry_failed=False):
+    """Run every job not already done in directory; return all records.
+
+    With resume=False the index is started afresh.  Failed jobs count as
+    done unless retry_failed is set.
+    """
+    os.makedirs(directory, exist_ok=True)
+    done = _done(directory) if resume else {}
+    if retry_failed:
+        done = {k: r for k, r in done.items() if 'error' not in r}
+    todo = [job for job in jobs if job_id(job) not in done]
+    todo.sort(key=cost, reverse=True)
+    records = {job_id(job): done[job_id(job)] for job in jobs
+               if job_id(job) in done}
+    mode = 'a' if resume else 'w'
+    with open(os.path.join(directory, INDEX), mode) as index, \
+            ProcessPoolExecutor(processes) as pool:
+        futures = {pool.submit(_run_job, job, directory): job
+                   for job in todo}
+        for k, future in enumerate(as_completed(futures)):
+            try:
+                record = future.result()
+            except BrokenProcessPool as error:
+                # a worker died (killed, out of memory) and took the pool
+                # with it: this job and those still queued did not run
+                job = futures[future]
+                record = dict(id=job_id(job), job=job,
+                              error='not run: %s' % error)
+            else:
+                index.write(json.dumps(record) + '\n')
+                index.flush()
+            records[record['id']] = record
+            status = record.get('error') or '%.3f s' % record['elapsed']
+            print('%5d/%d %s %s' % (k + 1, len(todo), record['id'], status))
+    return [records[job_id(job)] for job in jobs]
+
+
+def load(directory):
+    """The records of a study, each with its fields memory-mapped."""
+    records = list(_done(directory).values())
+    for record in records:
+        record['fields'] = {
+            name: numpy.load(os.path.join(directory, '%s_%s.npy'
+                                          % (record['id'], name)),
+                             mmap_mode='r')
+            for name in record.get('fields', ())}
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('directory', help='study directory')
+    parser.add_argument('--case', nargs='+', required=True,
+                        help='cases, from %s' % ', '.join(CASES))
+    parser.add_argument('--nx', type=int, nargs='+')
+    parser.add_argument('--nt', type=int, nargs='+')
+    parser.add_argument('--sigma', type=float, nargs='+')
+    parser.add_argument('--nu', type=float, nargs='+')
+    parser.add_argument('--Re', type=float, nargs='+')
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--restart', action='store_true',
+                        help='ignore the results already in the directory')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='run the jobs that failed before again')
+    args = parser.parse_args(argv)
+    unknown = set(args.case) - set(CASES)
+    if unknown:
+        parser.error('unknown cases: %s' % ', '.join(sorted(unknown)))
+
+    axes = {key: values for key, values in vars(args).items()
+            if key in ('case', 'nx', 'nt', 'sigma', 'nu', 'Re') and values}
+    for case in args.case:
+        dropped = _axes(case, axes)[1]
+        if dropped:
+            print('%s: ignoring %s, not an option of this case'
+                  % (case, ', '.join(dropped)), file=sys.stderr)
+    records = run(grid(**axes), args.directory, args.processes,
+                  resume=not args.restart, retry_failed=args.retry_failed)
+    failed = [r for r in records if 'error' in r]
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
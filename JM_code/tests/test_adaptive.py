@@ -0,0 +1,30 @@
+import numpy
+
+import adaptive
+import checkpoint
+from solver1d import Solver1D
+
+
+def _burgers():
+    x = numpy.linspace(0, 2, 81)
+    u = 1 + numpy.exp(-20 * (x - 1)**2)
+    return Solver1D(u, 0, x[1], 'burgers', nu=0.01, bc='periodic')
+
+
+def test_time_sums_the_adaptive_steps():
+    stepper = adaptive.Stepper(_burgers())
+    stepper.step(10)
+    assert len(set(stepper.dts)) > 1
+    assert stepper.t == stepper.solver.t
+    assert numpy.isclose(stepper.t, sum(stepper.dts), rtol=1e-14)
+
+
+def test_restored_solver_keeps_its_time(tmp_path):
+    stepper = adaptive.Stepper(_burgers())
+    stepper.step(10)
+    path = str(tmp_path / 'run.ckpt')
+    checkpoint.save(stepper.solver, path)
+    solver = checkpoint.restore(path)
+    assert solver.t == stepper.t
+    adaptive.Stepper(solver).advance(0.5)
+    assert solver.t == 0.5
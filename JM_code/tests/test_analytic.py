@@ -0,0 +1,15 @@
+import numpy
+
+import analytic
+
+
+def test_unwritable_cache_keeps_the_function_in_memory(monkeypatch, tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    monkeypatch.setattr(analytic, 'CACHE_DIR', str(blocker / '__pycache__'))
+    monkeypatch.setattr(analytic, '_loaded', {})
+    x = numpy.linspace(0, 2 * numpy.pi, 11)
+    u = analytic.burgers(0, x, 0.07)
+    assert u.shape == x.shape
+    assert numpy.isfinite(u).all()
+    assert 'burgers' in analytic._loaded
@@ -0,0 +1,10 @@
+import pytest
+
+import checkpoint
+from cases import CASES
+
+
+@pytest.mark.parametrize('case', ['step11', 'step12'])
+def test_flows_are_refused_with_a_type_error(case, tmp_path):
+    with pytest.raises(TypeError, match='NavierStokes2D'):
+        checkpoint.save(CASES[case].build(), str(tmp_path / 'run.ckpt'))
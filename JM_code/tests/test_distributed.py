@@ -0,0 +1,20 @@
+import multiprocessing
+import os
+import signal
+
+import pytest
+
+import distributed
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason='the workers must inherit the patched _rank')
+def test_killed_rank_does_not_hang_the_others(monkeypatch):
+    def _rank(rank, size, barrier, *args):
+        if rank == 1:
+            os.kill(os.getpid(), signal.SIGKILL)
+        barrier.wait()
+
+    monkeypatch.setattr(distributed, '_rank', _rank)
+    with pytest.raises(RuntimeError, match='rank 1 was killed by signal'):
+        distributed.run('step8', nx=21, nt=2, processes=2)
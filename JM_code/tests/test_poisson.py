@@ -0,0 +1,67 @@
+import numpy
+import pytest
+
+import poisson
+
+
+def _problem(ny, nx, periodic=False):
+    y = numpy.linspace(0, 1, ny)
+    x = numpy.arange(nx) / nx if periodic else numpy.linspace(0, 1, nx)
+    X, Y = numpy.meshgrid(x, y)
+    b = (numpy.cos(2 * numpy.pi * X) * numpy.cos(numpy.pi * Y)
+         + numpy.sin(3 * X + Y))
+    dx = 1 / nx if periodic else 1 / (nx - 1)
+    return numpy.zeros_like(b), b, dx, 1 / (ny - 1)
+
+
+def _rate(result):
+    residuals = numpy.array(result.residuals)
+    return numpy.median(residuals[1:] / residuals[:-1])
+
+
+@pytest.mark.parametrize('n', [33, 65, 129])
+def test_multigrid_cavity_rate(n):
+    p, b, dx, dy = _problem(n, n)
+    result = poisson.solve(p, b, dx, dy, poisson.CAVITY_BC, rtol=1e-10)
+    assert result.residuals[-1] <= 1e-10 * result.residuals[0]
+    assert _rate(result) < 0.15
+    assert result.iterations <= 15
+
+
+@pytest.mark.parametrize('ny', [33, 65])
+def test_multigrid_channel_rate(ny):
+    # no dirichlet edge: the mean of b is not in the range and is dropped
+    p, b, dx, dy = _problem(ny, 64, periodic=True)
+    result = poisson.solve(p, b, dx, dy, poisson.CHANNEL_BC, rtol=1e-10)
+    assert result.residuals[-1] <= 1e-10 * result.residuals[0]
+    assert _rate(result) < 0.15
+    assert result.iterations <= 15
+    fft = poisson.solve(numpy.zeros_like(b), b - b[1:-1].mean(), dx, dy,
+                        poisson.CHANNEL_BC, 'fft')
+    assert numpy.allclose(result.p - result.p.mean(),
+                          fft.p - fft.p.mean(), atol=1e-9)
+
+
+@pytest.mark.parametrize('n', [50, 64])
+def test_multigrid_cavity_uncoarsenable_sizes(n):
+    pytest.importorskip('scipy')
+    p, b, dx, dy = _problem(n, n)
+    result = poisson.solve(p, b, dx, dy, poisson.CAVITY_BC, rtol=1e-10)
+    assert result.residuals[-1] <= 1e-10 * result.residuals[0]
+    assert result.iterations <= 2
+
+
+def test_concurrent_solves_do_not_share_buffers():
+    # the same grid in several threads at once, as in a thread pool sweep
+    from concurrent.futures import ThreadPoolExecutor
+
+    def run(k):
+        p, b, dx, dy = _problem(65, 65)
+        return poisson.solve(p, (k + 1) * b, dx, dy, poisson.CAVITY_BC,
+                             rtol=1e-10).p
+
+    serial = [run(k) for k in range(4)]
+    with ThreadPoolExecutor(4) as pool:
+        threaded = list(pool.map(run, range(4)))
+    for a, b in zip(serial, threaded):
+        assert numpy.array_equal(a, b)
@@ -0,0 +1,27 @@
+import numpy
+
+from solver2d import Solver2D
+
+
+def _hat(n=21):
+    u = numpy.ones((n, n))
+    u[5:11, 5:11] = 2
+    return u
+
+
+def test_partial_callable_bc_keeps_untouched_edges():
+    # the bc writes only the bottom row and left column; the top row and
+    # right column are written by nobody and must keep their values
+    def bc(solver, fields):
+        for f in fields:
+            f[0, :] = 1
+            f[:, 0] = 1
+
+    u = _hat()
+    for equation in ('diffusion', 'linear'):
+        solver = Solver2D(u, 0.001, 0.1, 0.1, equation, nu=0.1, bc=bc)
+        solver.step(3)
+        assert numpy.isfinite(solver.u).all()
+        if equation == 'diffusion':
+            assert (solver.u[-1, :] == u[-1, :]).all()
+            assert (solver.u[:, -1] == u[:, -1]).all()
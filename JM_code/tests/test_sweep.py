@@ -0,0 +1,37 @@
+import json
+import multiprocessing
+import os
+import signal
+
+import pytest
+
+import sweep
+
+
+def test_grid_combines_only_the_axes_a_case_takes():
+    jobs = sweep.grid(case=['step5', 'step8'], nx=[21], sigma=[.1, .2])
+    assert jobs == [dict(case='step5', nx=21),
+                    dict(case='step8', nx=21, sigma=.1),
+                    dict(case='step8', nx=21, sigma=.2)]
+
+
+def _killed(job, directory):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason='the workers must inherit the patched _run_job')
+def test_broken_pool_leaves_the_jobs_to_run_again(monkeypatch, tmp_path):
+    jobs = sweep.grid(case=['step1'], nx=[21, 41], nt=[2])
+    directory = str(tmp_path)
+    monkeypatch.setattr(sweep, '_run_job', _killed)
+    records = sweep.run(jobs, directory, processes=1)
+    assert all(r['error'].startswith('not run') for r in records)
+    with open(os.path.join(directory, sweep.INDEX)) as f:
+        assert f.read() == ''
+
+    monkeypatch.undo()
+    records = sweep.run(jobs, directory, processes=1)
+    assert all('error' not in r for r in records)
+    with open(os.path.join(directory, sweep.INDEX)) as f:
+        assert len([json.loads(line) for line in f]) == 2
@@ -0,0 +1,23 @@
+import numpy
+
+import tuning
+from solver2d import Solver2D
+
+
+def test_unwritable_cache_keeps_the_record_in_memory(monkeypatch, tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    monkeypatch.setattr(tuning, 'CACHE_DIR', str(blocker / '__pycache__'))
+    monkeypatch.setattr(tuning, 'CACHE_FILE',
+                        str(blocker / '__pycache__' / 'tiling.json'))
+    monkeypatch.setattr(tuning, '_unsaved', {})
+    solver = Solver2D(numpy.ones((33, 33)), 0.001, 0.1, 0.1, 'diffusion',
+                      nu=0.1, threads=1)
+    best = tuning.autotune(solver, steps=2, tiles=[None, 8],
+                           time_blocks=(1,))
+
+    def measure(*args):
+        raise AssertionError('the record should have been reused')
+
+    monkeypatch.setattr(tuning, 'measure', measure)
+    assert tuning.autotune(solver) == best
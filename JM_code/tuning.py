@@ -0,0 +1,113 @@
+"""
+Per-machine choice of the cache blocking of Solver2D.
+
+The best tile height and time block depend on the cache sizes and memory
+bandwidth of the machine as much as on the problem.  autotune() times a few
+steps of copies of a solver for tile heights whose buffers span 256 KB to
+16 MB and for several time blocks, applies the fastest setting to the solver
+and records it in __pycache__/tiling.json under a key made of the machine,
+equation, grid, dtype, backend and threads.  Later calls with the same key
+reuse the record without timing anything; where the file cannot be written
+the record only lasts for the current process.
+
+    solver = Solver2D((u, v), dt, dx, dy, 'convection', dtype='float32')
+    tile, time_block = autotune(solver)
+    solver.step(nt)
+"""
+
+import json
+import os
+import platform
+import time
+
+from solver2d import Solver2D
+
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         '__pycache__')
+CACHE_FILE = os.path.join(CACHE_DIR, 'tiling.json')
+
+TILE_BYTES = (2**18, 2**20, 2**22, 2**24)
+TIME_BLOCKS = (1, 2, 4, 8)
+
+_unsaved = {}   #records CACHE_FILE could not take, kept for this process
+
+
+def _key(solver):
+    return '|'.join(str(x) for x in (
+        platform.node(), platform.machine(), os.cpu_count(), solver.equation,
+        solver.fields[0].shape, solver.dtype.name, solver.backend,
+        solver.threads, solver.active))
+
+
+def _records():
+    try:
+        with open(CACHE_FILE) as f:
+            records = json.load(f)
+    except (OSError, ValueError):
+        records = {}
+    records.update(_unsaved)
+    return records
+
+
+def _save(key, setting):
+    records = _records()
+    records[key] = setting
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = '%s.%d.tmp' % (CACHE_FILE, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump(records, f, indent=1)
+        os.replace(tmp, CACHE_FILE)
+    except OSError:   #a read-only checkout
+        _unsaved[key] = setting
+
+
+def candidate_tiles(solver):
+    """Tile heights whose field, twin and scratch rows fill TILE_BYTES, and
+    None for no tiling."""
+    row = sum(2 * f[..., 0, :].nbytes for f in solver.fields)
+    row += solver.fields[0][..., 0, :].nbytes
+    ny = solver.fields[0].shape[-2]
+    tiles = sorted({max(4, size // row) for size in TILE_BYTES})
+    return [tile for tile in tiles if tile < ny // 2] + [None]
+
+
+def measure(solver, tile, time_block, steps=8):
+    """Seconds per step of a copy of solver with the given tiling."""
+    trial = Solver2D(solver.fields, solver.dt, solver.dx, solver.dy,
+                     solver.equation, solver.c, solver.nu, solver.bc_spec,
+                     solver.backend, solver.threads, solver.dtype, tile,
+                     time_block, solver.active)
+    try:
+        trial.step(time_block)   #warm up caches and any JIT compilation
+        steps = max(steps, time_block) // time_block * time_block
+        start = time.perf_counter()
+        trial.step(steps)
+        return (time.perf_counter() - start) / steps
+    finally:
+        trial.close()
+
+
+def autotune(solver, steps=8, tiles=None, time_blocks=TIME_BLOCKS,
+             cache=True):
+    """Pick, apply and return the fastest (tile, time_block) for solver."""
+    key = _key(solver)
+    if cache:
+        record = _records().get(key)
+        if record is not None:
+            solver.tiling(*record)
+            return tuple(record)
+
+    if callable(solver.bc_spec) or solver.active:
+        time_blocks = (1,)
+    timings = {}
+    for tile in tiles or candidate_tiles(solver):
+        for time_block in time_blocks:
+            timings[tile, time_block] = measure(solver, tile, time_block,
+                                                steps)
+    best = min(timings, key=timings.get)
+    if cache:
+        _save(key, best)
+    solver.tiling(*best)
+    return best